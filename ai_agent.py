@@ -1,22 +1,18 @@
-import os  # ייבוא מודול לגישה למערכת ההפעלה
-from dotenv import load_dotenv  # ייבוא פונקציה לטעינת משתני סביבה
-import google.generativeai as genai  # ייבוא ספריית גוגל ג'מיני
 from PIL import Image  # ייבוא ספריית Pillow לעבודה עם תמונות
 import cv2  # ייבוא OpenCV להמרת תמונה
 import numpy as np  # ייבוא NumPy לעבודה עם מערכים
-import json  # ייבוא לדיבאג
+import time  # מדידת זמן עד התיאור הראשון
+from model_client import get_model_client  # לקוח מודל משותף: Gemini או השרת המדומה, לפי ההגדרות
+from upload_preparer import UploadPayload, RegionPayload  # תמונה מקודדת מראש, משותפת לכל המנתחים
+from ai_usage import record_usage  # רישום טוקנים ועלות של כל קריאה
+from model_resilience import resilient_call, resilient_call_async  # מפסק, מגביל קצב וניסיונות חוזרים
+from streaming_json import read_stream  # קריאת תשובה בהזרמה עם פירוק JSON הדרגתי
+from ai_results import decode_response, empty_result  # פענוח התשובה פעם אחת לתוצאה מוקלדת
 
 
 class AIAgent:  # הגדרת מחלקה לסוכן הבינה המלאכותית
-    def __init__(self):  # פונקציית אתחול למחלקה
-        load_dotenv()  # טעינת משתני סביבה מקובץ .env
-        api_key = os.getenv("GOOGLE_API_KEY")  # קבלת מפתח ה-API ממשתני הסביבה
-
-        if not api_key:  # בדיקה אם מפתח ה-API נמצא
-            raise ValueError("GOOGLE_API_KEY not found in .env file.")  # זריקת שגיאה אם המפתח חסר
-
-        genai.configure(api_key=api_key)  # הגדרת מפתח ה-API עבור ג'מיני
-        self.model = genai.GenerativeModel('gemini-2.0-flash')  # אתחול מודל ה-Vision החדיש (Flash) של ג'מיני
+    def __init__(self, client=None):  # פונקציית אתחול למחלקה (client - ModelClient, ברירת מחדל: המשותף)
+        self.client = client or get_model_client()  # מודל ה-Vision החדיש (Flash) של ג'מיני דרך החיבור המשותף
 
         # הגדרת ההנחיה (פרומפט) לסוכן הבינה המלאכותית
         self.prompt = """
@@ -185,46 +181,66 @@ IMPORTANT RULES:
         pil_image = Image.fromarray(rgb_frame)  # יצירת אובייקט PIL Image ממערך NumPy
         return pil_image  # החזרת תמונת PIL
 
-    def analyze_frame(self, frame):  # פונקציה לניתוח פריים וידאו
+    def _image_parts(self, frame):  # חלקי התמונה לבקשה: תמונה מוכנה / חיתוכי אנשים כמו שהם, או פריים OpenCV דרך PIL
+        if isinstance(frame, (UploadPayload, RegionPayload)):
+            return frame.to_parts()
+        return [self._convert_opencv_frame_to_pil(frame)]
+
+    def _known_descriptions_part(self, known):  # מה שכבר ידוע על כל אדם - המודל מחזיר רק תוספות והחלפות
+        lines = [f"person_id {person_id}: {summary}" for person_id, summary in known.items()]
+        return ("ALREADY KNOWN about the tracked people (category: items):\n" + "\n".join(lines) + "\n"
+                "Use these person_id values for the same people. Return ONLY descriptions that are NEW, "
+                "or that REPLACE a known item of the same feature with a corrected value. Never repeat a known item. "
+                "If nothing new is visible for a person, return an empty \"descriptions\" array for that person_id.")
+
+    def _request_contents(self, frame, known=None):  # הפרומפט, מה שכבר ידוע (אם יש) וחלקי התמונה
+        contents = [self.prompt]
+        if known:
+            contents.append(self._known_descriptions_part(known))
+        return contents + self._image_parts(frame)
+
+    def analyze_frame(self, frame, timeout=None, priority="normal", known=None):  # פונקציה לניתוח פריים וידאו (timeout - שניות לבקשה)
+        # known - person_id -> סיכום מה שכבר ידוע עליו (DataSaver.get_known_descriptions)
         self.frame_count += 1
         print(f"\n=== AI Analysis Frame #{self.frame_count} ===")
 
         try:
-            pil_image = self._convert_opencv_frame_to_pil(frame)  # המרת הפריים לאובייקט PIL
-            response = self.model.generate_content([self.prompt, pil_image], stream=False)  # שליחת בקשה למודל
+            contents = self._request_contents(frame, known)  # פרומפט, מה שכבר ידוע ותמונה מוכנה / פריים דרך PIL
+            request_options = {"timeout": timeout} if timeout else None  # מגבלת זמן לבקשה בודדת
+            response = resilient_call("visual", lambda: self.client.generate(
+                contents, stream=False, request_options=request_options),
+                priority, timeout)  # שליחת בקשה למודל
             response.resolve()  # המתנה לתשובה מלאה
-
-            json_text = response.text.strip()  # הסרת רווחים מיותרים
-            print(f"Raw AI response length: {len(json_text)} chars")
-
-            # ניסיון לנקות את התשובה כדי לוודא שהיא JSON תקין
-            if json_text.startswith("```json") and json_text.endswith("```"):  # אם יש עטיפת JSON
-                json_text = json_text[len("```json"):-len("```")].strip()  # הסרת העטיפה
-
-            # אם התשובה עדיין לא נראית כמו JSON של מערך
-            if not json_text.startswith("[") or not json_text.endswith("]"):
-                start_index = json_text.find('[')  # חיפוש התחלת מערך
-                end_index = json_text.rfind(']')  # חיפוש סיום מערך
-                if start_index != -1 and end_index != -1 and end_index > start_index:  # אם נמצא מערך תקין
-                    json_text = json_text[start_index: end_index + 1]  # חילוץ המערך
-                else:
-                    print(f"AI response not valid JSON array: {json_text[:200]}...")  # הודעה אם ה-JSON לא תקין
-                    return "[]"  # החזרת מערך JSON ריק במקרה של תקלה
-
-            # בדיקת תוכן ה-JSON לדיבאג
-            try:
-                parsed_json = json.loads(json_text)
-                if parsed_json and len(parsed_json) > 0:
-                    print(f"AI detected {len(parsed_json)} person(s)")
-                    print("Fields detected in this frame:")
-                    for person in parsed_json:
-                        print(f"  - {list(person.keys())}")
-                else:
-                    print("AI detected no people")
-            except Exception as e:
-                print(f"Error parsing JSON for debug: {e}")
-
-            return json_text  # החזרת הטקסט כ-JSON (סטרינג)
+            record_usage("visual", response)  # רישום טוקנים ועלות
+            return self._decode_response(response.text)
         except Exception as e:  # טיפול בשגיאות
             print(f"Error analyzing frame with AI: {e}")  # הדפסת הודעת שגיאה
-            return "[]"  # החזרת מערך JSON ריק במקרה של שגיאה
\ No newline at end of file
+            return empty_result("visual")  # תוצאה ריקה במקרה של שגיאה
+
+    def analyze_frame_async(self, frame, timeout=None, priority="normal", on_partial=None, known=None):  # גרסה אסינכרונית - מחזירה coroutine
+        # on_partial - אם ניתן, התשובה מוזרמת ו-on_partial מקבל כל תיאור שנסגר (באותו מבנה JSON)
+        # ההמרה מתבצעת כבר עכשיו, כל עוד הפריים בהשאלה - ה-coroutine רץ מאוחר יותר ב-thread אחר
+        self.frame_count += 1
+        contents = self._request_contents(frame, known)
+        return self._analyze_image_async(contents, timeout, priority, on_partial)
+
+    async def _analyze_image_async(self, contents, timeout=None, priority="normal", on_partial=None):
+        print(f"\n=== AI Analysis Frame #{self.frame_count} (async) ===")
+        request_options = {"timeout": timeout} if timeout else None
+        stream = on_partial is not None
+        started = time.perf_counter()
+        response = await resilient_call_async("visual", lambda: self.client.generate_async(
+            contents, stream=stream, request_options=request_options),
+            priority, timeout)
+        text = await read_stream("visual", response, on_partial, started) if stream else response.text
+        record_usage("visual", response)
+        return self._decode_response(text)
+
+    def _decode_response(self, text):  # פענוח התשובה פעם אחת ל-VisualResult (אנשים ותיאורים)
+        print(f"Raw AI response length: {len(text)} chars")
+        result = decode_response("visual", text)
+        if result.persons:
+            print(f"AI detected {len(result.persons)} person(s), {result.description_count()} descriptions")
+        else:
+            print("AI detected no people")
+        return result  # VisualResult - עובר כמו שהוא ל-DataSaver
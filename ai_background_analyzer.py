@@ -1,73 +1,166 @@
-import threading
+import itertools
 import queue
+import threading
 import time
+import config
 from ai_agent import AIAgent
 from data_saver import DataSaver
 from face_detector import FaceDetector
 from person_tracker import PersonTracker
 from behavioral_analyzer import BehavioralAnalyzer
 from behavioral_data_saver import BehavioralDataSaver
+from combined_analyzer import CombinedAnalyzer
+from motion_gate import MotionGate
+from analysis_scheduler import AnalysisScheduler, description_change_ratio
+from ai_request_engine import AIRequestEngine
+from upload_preparer import UploadPreparer
+from keyframe_batcher import KeyframeBatcher
+from frame_selector import FrameSelector
+from response_cache import ResponseCache
+from rate_limiter import rate_limiter
+from ai_usage import usage_ledger
+from model_resilience import circuit_breaker, CircuitOpenError
+from model_client import get_model_client
+from ai_results import result_from_document, decode_stats
+from metrics import metrics
 
 
 class AIBackgroundAnalyzer(threading.Thread):
-    def __init__(self, frame_queue, data_saver, behavioral_data_saver, interval_seconds=0.5):
+    def __init__(self, frame_buffer, data_saver, behavioral_data_saver, interval_seconds=0.5, result_listener=None):
         super().__init__()
-        self.frame_queue = frame_queue
+        self.result_listener = result_listener  # פונקציה שמקבלת (kind, payload) אחרי כל עדכון תוצאות
+        self.frame_buffer = frame_buffer  # FrameRingBuffer - שואלים ממנה את הפריים האחרון ללא העתקה
+        self._last_seq = 0  # המספר הסידורי של הפריים האחרון שנותח
         self.data_saver = data_saver
         self.behavioral_data_saver = behavioral_data_saver
-        self.ai_agent = AIAgent()
-        self.behavioral_analyzer = BehavioralAnalyzer()
+        # לקוח מודל אחד לכל המנתחים - חיבור אחד שמחומם מראש ונשמר פתוח
+        self.model_client = get_model_client()
+        self.ai_agent = AIAgent(self.model_client)
+        self.behavioral_analyzer = BehavioralAnalyzer(self.model_client)
+        # מצב משולב - קריאה אחת עם סכמת JSON לשני המאגרים
+        self.combined_analyzer = CombinedAnalyzer(self.model_client) if config.AI_COMBINED_CALL else None
         self.face_detector = FaceDetector()
         self.person_tracker = PersonTracker()
+        # שער תנועה - מדלג על זיהוי וקריאות AI כשהפריים כמעט זהה לפריים האחרון שנותח
+        self.motion_gate = None
+        if config.MOTION_GATE_ENABLED:
+            self.motion_gate = MotionGate(config.MOTION_GATE_ENTER_THRESHOLD, config.MOTION_GATE_EXIT_THRESHOLD,
+                                          config.MOTION_GATE_MAX_SKIP_SECONDS)
+        # קצב ניתוח מסתגל: זיהוי אנשים כל interval_seconds, קריאות AI רק כשהמתזמן מאשר
+        self.scheduler = None
+        if config.AI_CADENCE_ADAPTIVE:
+            self.scheduler = AnalysisScheduler(config.AI_MIN_INTERVAL, config.AI_BASE_INTERVAL,
+                                               config.AI_MAX_INTERVAL, config.AI_RPM_BUDGET,
+                                               calls_per_analysis=1 if self.combined_analyzer else 2)
+        # מנוע בקשות אסינכרוני - הזיהוי והמעקב ממשיכים בזמן שכמה קריאות Gemini פתוחות
+        self.request_timeout = config.AI_REQUEST_TIMEOUT
+        self.upload_preparer = UploadPreparer(config.AI_UPLOAD_LONG_EDGE, config.AI_UPLOAD_JPEG_QUALITY)
+        # מטמון תשובות לפי hash תפיסתי - פריים כמעט זהה של אותם אנשים לא נשלח שוב
+        self.response_cache = None
+        if config.AI_CACHE_ENABLED:
+            self.response_cache = ResponseCache(config.AI_CACHE_MAX_ENTRIES, config.AI_CACHE_TTL_SECONDS,
+                                                config.AI_CACHE_MAX_DISTANCE)
+        self.roi_mode = config.AI_ROI_MODE  # "off" - פריים מלא, "crops" / "mosaic" - רק אזורי האנשים
+        # ניתוח התנהגותי על כמה פריימים מפתח מחלון קצר בבקשה אחת - פחות קריאות, ורואים גם תנועה
+        self.keyframes = None
+        self.keyframe_sheet = config.AI_BEHAVIOR_LAYOUT == "sheet"
+        if config.AI_BEHAVIOR_KEYFRAMES > 1 and self.combined_analyzer is None:
+            self.keyframes = KeyframeBatcher(
+                config.AI_BEHAVIOR_KEYFRAMES, config.AI_BEHAVIOR_WINDOW_SECONDS,
+                self.upload_preparer.keyframe_long_edge(config.AI_BEHAVIOR_KEYFRAMES, self.keyframe_sheet))
+        self.behavioral_calls = {"calls": 0, "frames": 0, "insights": 0}  # להשוואה בין פריים בודד לפריימים מפתח
+        # בחירת הפריים החד ביותר מהחלון האחרון - פחות תשובות ריקות על פריים מטושטש או באמצע מצמוץ
+        self.frame_selector = None
+        if config.AI_FRAME_SELECT:
+            self.frame_selector = FrameSelector(config.AI_FRAME_SELECT_WINDOW_SECONDS, self.upload_preparer.long_edge)
+        self.visual_calls = {"calls": 0, "returned": 0, "useful": 0}  # תיאורים מועילים (חדשים במאגר) לקריאה
+        self._started_at = time.time()
+        self.ai_engine = AIRequestEngine(config.AI_MAX_IN_FLIGHT, self.request_timeout, config.AI_MAX_FRAME_AGE)
+        self._rounds = {}  # round_id -> מצב סבב ניתוח פתוח (זמן התחלה, בקשות שנותרו, תיאורים לפני)
+        self._round_ids = itertools.count(1)
+        # הזרמת תשובות: תיאורים ותובנות מיושמים ברגע שנסגרים, לפני שהתשובה כולה מגיעה
+        self.streaming = config.AI_STREAMING
+        self._partials = queue.Queue()  # (kind, מסמך חלקי, context) - מגיעים מ-thread המנוע
+        self.delta_prompting = config.AI_DELTA_PROMPT
         self.interval_seconds = interval_seconds
         self.running = True
         self.daemon = True
         self.frames_processed = 0
         self.frames_with_faces = 0
+        self._published_ai_state = "closed"  # מצב המפסק האחרון שפורסם לתצוגה
 
     def run(self):
         print("AI background analyzer with behavioral analysis started.")
+        self.ai_engine.start()
+        self.ai_engine.run_background(self.model_client.keep_alive_async(config.AI_PREWARM,
+                                                                         config.AI_KEEPALIVE_SECONDS))
         while self.running:
+            self._apply_completed_requests()
+            self._publish_ai_status()
+            lease = self.frame_buffer.borrow_latest(self._last_seq, timeout=0.1)
+            if lease is None:
+                continue
+
             try:
-                frame = self.frame_queue.get(timeout=0.1)
-                if frame is not None:
+                with lease:
+                    frame = lease.frame
+                    self._last_seq = lease.seq
+
+                    # דילוג על פריים שלא השתנה מאז הניתוח האחרון - רק בסצנה ריקה: כשיש אנשים במעקב
+                    # או סשן פתוח, כל פריים עובר כדי שיציאה מסצנה שקטה תזוהה ותסגור את הסשן
+                    if (self.motion_gate is not None and not self._scene_occupied()
+                            and not self.motion_gate.should_analyze(frame)):
+                        lease.release()
+                        self._wait_for_next_round()
+                        continue
+
                     self.frames_processed += 1
 
                     # זיהוי כל האנשים בפריים
                     detected_persons = self.person_tracker.detect_persons(frame)
+                    self._publish_result("persons", self.person_tracker.get_active_persons())
+                    if self.scheduler is not None:
+                        self.scheduler.note_persons(detected_persons)
+                    if detected_persons and self.keyframes is not None:
+                        self.keyframes.add(frame, lease.capture_time)
+                    candidate = None
+                    if detected_persons and self.frame_selector is not None:
+                        candidate = self.frame_selector.add(frame, lease.capture_time, detected_persons,
+                                                            self._person_boxes(detected_persons))
 
                     if not detected_persons:
                         # אין אנשים בפריים
                         print("No persons detected in frame")
                         self.data_saver.handle_empty_frame()
                         self.behavioral_data_saver.handle_empty_frame()
+                    elif self.scheduler is not None and not self.scheduler.is_due():
+                        # מבקרים קבועים - ממתינים לסבב הבא שהמתזמן קבע
+                        self.frames_with_faces += 1
+                    elif circuit_breaker.is_open():
+                        # מצב מוגבל: השירות לא תקין - לא שולחים בקשות, והמראה ממשיכה להציג את הנתונים האחרונים.
+                        # אנשים חדשים נשארים אצל המתזמן ויקבלו ניתוח כשהשירות יחזור
+                        self.frames_with_faces += 1
+                        metrics.inc("ai.degraded.skipped_rounds")
                     else:
                         self.frames_with_faces += 1
                         print(f"{len(detected_persons)} person(s) in frame")
+                        analysis_frame, capture_time, boxes = frame, lease.capture_time, None
+                        if candidate is not None:
+                            # הפריים החד ביותר מהחלון האחרון, עם האנשים והתיבות כפי שהיו בו
+                            best = self.frame_selector.select(candidate)
+                            new_ids = {person_id for person_id, is_new in detected_persons if is_new}
+                            detected_persons = [(person_id, is_new or person_id in new_ids)
+                                                for person_id, is_new in best.detected_persons]
+                            analysis_frame, capture_time, boxes = best.frame, best.capture_time, dict(best.boxes)
+                        round_start = time.time()
+                        if self.scheduler is not None:
+                            # אנשים שזוהו כחדשים בזמן שהניתוח נדחה עדיין נחשבים חדשים עבור השומרים
+                            new_ids = self.scheduler.start_analysis(round_start)
+                            detected_persons = [(person_id, is_new or person_id in new_ids)
+                                                for person_id, is_new in detected_persons]
 
-                        # שלח ל-AI לניתוח חזותי (המאגר הראשון)
-                        ai_response_json_string = self.ai_agent.analyze_frame(frame)
-
-                        if ai_response_json_string:
-                            print("Visual AI analysis received. Processing...")
-                            self.data_saver.process_multi_person_analysis(
-                                ai_response_json_string,
-                                detected_persons
-                            )
-                        else:
-                            print("Visual AI analysis failed or returned no data.")
-
-                        # שלח ל-AI לניתוח התנהגותי (המאגר השני)
-                        behavioral_response_json_string = self.behavioral_analyzer.analyze_behavior(frame)
-
-                        if behavioral_response_json_string:
-                            print("Behavioral AI analysis received. Processing...")
-                            self.behavioral_data_saver.process_behavioral_analysis(
-                                behavioral_response_json_string,
-                                detected_persons
-                            )
-                        else:
-                            print("Behavioral AI analysis failed or returned no data.")
+                        # שתי הקריאות ל-AI (חזותית והתנהגותית) נשלחות למנוע, והתוצאות מיושמות כשהן מגיעות
+                        self._submit_ai_round(analysis_frame, capture_time, detected_persons, round_start, boxes)
 
                     # סטטיסטיקות דיבאג
                     if self.frames_processed % 20 == 0 and self.frames_processed > 0:
@@ -76,19 +169,370 @@ class AIBackgroundAnalyzer(threading.Thread):
                         print(
                             f"\nStats: {self.frames_with_faces}/{self.frames_processed} frames with faces ({face_ratio:.1f}%)")
                         print(f"Active persons: {active_persons}")
+                        if self.motion_gate is not None:
+                            print(f"Motion gate: {self.motion_gate.get_stats()}")
+                        if self.scheduler is not None:
+                            print(f"Analysis cadence: {self.scheduler.get_stats()}")
+                        print(f"AI requests: {self.ai_engine.get_stats()}")
+                        print(f"Upload: {self.upload_preparer.get_stats()}")
+                        if self.response_cache is not None:
+                            print(f"Response cache: {self.response_cache.get_stats()}")
+                        print(f"Rate limiter: {rate_limiter.get_stats()}")
+                        print(f"Circuit breaker: {circuit_breaker.get_stats()}")
+                        print(f"Model client: {self.model_client.get_stats()}")
+                        print(f"AI responses: {decode_stats.get_stats()}")
+                        print(f"Behavioral calls: {self.get_behavioral_call_stats()}")
+                        print(f"Visual calls: {self.get_visual_call_stats()}")
+                        if self.frame_selector is not None:
+                            print(f"Frame selection: {self.frame_selector.get_stats()}")
+                        if self.keyframes is not None:
+                            print(f"Keyframes: {self.keyframes.get_stats()}")
+                        print(f"AI usage: {usage_ledger.summary()}")
 
-                self.frame_queue.task_done()
-
-            except queue.Empty:
-                pass
             except Exception as e:
                 print(f"Error in AI background analyzer: {e}")
                 import traceback
                 traceback.print_exc()
 
-            time.sleep(self.interval_seconds)
+            self._wait_for_next_round()
 
+        self.ai_engine.stop()
+        print(f"Visual calls: {self.get_visual_call_stats()}")
         print("AI background analyzer stopped.")
 
+    def _submit_ai_round(self, frame, capture_time, detected_persons, round_start, boxes=None):
+        """שולח את הניתוח החזותי וההתנהגותי של הפריים למנוע הבקשות, בלי לחכות לתשובות.
+        boxes - התיבות של האנשים בפריים הזה (פריים שנבחר מהחלון), אחרת האחרונות של PersonTracker"""
+        round_id = next(self._round_ids)
+        if self.combined_analyzer is not None:
+            calls = (("combined", self.combined_analyzer.analyze_frame_async),)
+        elif self.keyframes is not None and not self.keyframes.ready(any(is_new for _, is_new in detected_persons)):
+            # הניתוח ההתנהגותי מחכה שהחלון יתמלא בפריימים מפתח - בסבב הזה רק ניתוח חזותי
+            calls = (("visual", self.ai_agent.analyze_frame_async),)
+        else:
+            calls = (
+                ("visual", self.ai_agent.analyze_frame_async),
+                ("behavioral", self.behavioral_analyzer.analyze_behavior_async),
+            )
+        self._rounds[round_id] = {
+            "start": round_start,
+            "pending": len(calls),
+            "descriptions_before": self._description_snapshot(),
+            "visual_before": self._visual_snapshot(),
+            "visual_calls": 0,
+        }
+        # קידוד JPEG אחד לפריים - אותם בתים לכל המנתחים, ומותר לשחרר את ההשאלה לפני שהבקשות נשלחות
+        payload = self._prepare_payload(frame, detected_persons, boxes)
+        person_ids = payload.person_ids
+        # מפתח המטמון כולל את מזהי האנשים, כדי שמבקר חדש באותו מקום לא יקבל את התיאורים של קודמו
+        cache_ids = tuple(person_ids) if person_ids else tuple(sorted({person_id for person_id, _ in detected_persons}))
+        context = {"round": round_id, "detected_persons": detected_persons, "person_ids": person_ids,
+                   "cache_ids": cache_ids, "hashes": payload.hashes}
+        priority = self._round_priority(detected_persons)
+        # מה שכבר ידוע על האנשים - הניתוח החזותי מחזיר רק תוספות והחלפות
+        known = self.data_saver.get_known_descriptions(cache_ids) if self.delta_prompting else None
+        submitted = 0
+        for kind, analyze in calls:
+            kind_payload = payload
+            keyframed = kind == "behavioral" and self.keyframes is not None
+            if self.response_cache is not None:
+                # בפריימים מפתח - לפי ה-hash של החלון בלי לרוקן אותו; תשובה מהמטמון משאירה את החלון לקריאה הבאה
+                hashes = (self.keyframes.peek_hashes() if keyframed else None) or payload.hashes
+                cached = self.response_cache.get(kind, cache_ids, hashes)
+                if cached is not None:
+                    print(f"{kind.capitalize()} AI result served from cache")
+                    self._apply_ai_result(kind, cached, self._round_persons(kind, context), person_ids)
+                    self._finish_round(round_id, time.time())
+                    continue
+            if keyframed:
+                kind_payload = (self.upload_preparer.prepare_keyframes(self.keyframes.take(), self.keyframe_sheet)
+                                or payload)
+            metrics.inc(f"ai.{kind}.upload_bytes", kind_payload.nbytes)
+            options = {"timeout": self.request_timeout, "priority": priority}
+            if self.streaming:
+                options["on_partial"] = self._partial_listener(kind, context)
+            if kind == "visual" and known:
+                options["known"] = known
+                metrics.inc("ai.visual.known_persons", len(known))
+            if kind == "behavioral":
+                self.behavioral_calls["calls"] += 1
+                self.behavioral_calls["frames"] += getattr(kind_payload, "frame_count", 1)
+                context = {**context, "hashes": kind_payload.hashes}
+            self.ai_engine.submit(kind, analyze(kind_payload, **options), capture_time, context,
+                                  self._job_class(kind, detected_persons))
+            submitted += 1
+        if self.scheduler is not None:
+            self.scheduler.record_calls(submitted, round_start)
+
+    def _partial_listener(self, kind, context):
+        """פונקציה שמקבלת מסמכים חלקיים ב-thread של המנוע ומעבירה אותם ל-thread המנתח"""
+        return lambda document: self._partials.put((kind, document, context))
+
+    def _round_persons(self, kind, context):
+        """אנשים חדשים פותחים סשן רק בעדכון החזותי הראשון של הסבב (חלקי, מהמטמון או מלא)"""
+        detected_persons = context["detected_persons"]
+        if kind not in ("visual", "combined"):
+            return detected_persons
+        if context.get("visual_applied"):
+            return [(person_id, False) for person_id, _ in detected_persons]
+        context["visual_applied"] = True
+        return detected_persons
+
+    def _job_class(self, kind, detected_persons):
+        """סוג העבודה בתור של מנוע הבקשות: אדם חדש, מראה שהשתנה בסבב הקודם, רענון, או התנהגותי בלבד"""
+        if kind == "behavioral":
+            return "behavioral"
+        if any(is_new for _, is_new in detected_persons):
+            return "new_person"
+        if (self.scheduler is not None and self.scheduler.last_change_ratio is not None
+                and self.scheduler.last_change_ratio > self.scheduler.change_threshold):
+            return "changed"
+        return "refresh"
+
+    def _round_priority(self, detected_persons):
+        """עדיפות במגביל הקצב: אדם חדש - גבוהה, רענון של קהל יציב - נמוכה"""
+        if any(is_new for _, is_new in detected_persons):
+            return "high"
+        if self.scheduler is not None and self.scheduler.stable_rounds > 0:
+            return "low"
+        return "normal"
+
+    def _scene_occupied(self):
+        """יש אנשים במעקב, או סשן שעוד לא נסגר (ממתין לפריימים ריקים)"""
+        return bool(self.person_tracker.tracked_persons or self.data_saver.current_session
+                    or self.behavioral_data_saver.current_session)
+
+    def _person_boxes(self, detected_persons):
+        """[(person_id, התיבה הנוכחית ב-PersonTracker)] לכל זיהוי בפריים"""
+        boxes = []
+        for person_id, _ in detected_persons:
+            bbox = self.person_tracker.get_person_bbox(person_id)
+            if bbox is not None:
+                boxes.append((person_id, bbox))
+        return boxes
+
+    def _prepare_payload(self, frame, detected_persons, boxes=None):
+        """הפריים המלא, או חיתוכי האנשים לפי התיבות (MIRROR_AI_ROI_MODE): boxes אם ניתנו, אחרת של PersonTracker"""
+        person_ids = [person_id for person_id, _ in detected_persons]
+        if self.roi_mode in ("crops", "mosaic"):
+            regions = []
+            for person_id in person_ids:
+                bbox = boxes.get(person_id) if boxes is not None else self.person_tracker.get_person_bbox(person_id)
+                if bbox is not None:
+                    regions.append((person_id, bbox))
+            payload = self.upload_preparer.prepare_regions(frame, regions, mosaic=self.roi_mode == "mosaic",
+                                                           padding=config.AI_ROI_PADDING)
+            if payload is not None:
+                return payload
+        return self.upload_preparer.prepare(frame)
+
+    def _apply_completed_requests(self, timeout=0.0):
+        """מיישם את תוצאות הבקשות שהסתיימו (ממתין עד timeout לראשונה)"""
+        requests = self.ai_engine.wait_results(timeout) if timeout > 0 else self.ai_engine.poll_results()
+        self._apply_partial_results()
+        for request in requests:
+            detected_persons = request.context["detected_persons"]
+            try:
+                if request.status == "done":
+                    # בהזרמה רוב התוכן כבר יושם; התשובה המלאה מיושמת שוב (השומרים מאחדים כפילויות)
+                    self._apply_ai_result(request.kind, request.result,
+                                          self._round_persons(request.kind, request.context),
+                                          request.context["person_ids"])
+                    if request.kind == "behavioral":
+                        self.behavioral_calls["insights"] += len(request.result.insights)
+                    else:
+                        visual_result = request.result.visual if request.kind == "combined" else request.result
+                        self.visual_calls["calls"] += 1
+                        self.visual_calls["returned"] += visual_result.description_count()
+                        round_state = self._rounds.get(request.context["round"])
+                        if round_state is not None:
+                            round_state["visual_calls"] += 1
+                    if self.response_cache is not None and not request.result.is_empty():
+                        self.response_cache.put(request.kind, request.context["cache_ids"], request.context["hashes"],
+                                                request.result, request.latency)
+                elif request.status == "cancelled":
+                    print(f"{request.kind.capitalize()} AI request cancelled ({request.cancel_reason})")
+                elif request.status == "timeout":
+                    print(f"{request.kind.capitalize()} AI request timed out after {self.request_timeout:g}s")
+                    # בקשה תקועה היא סימן לשירות לא תקין בדיוק כמו שגיאה
+                    circuit_breaker.record_failure("transient", TimeoutError())
+                elif isinstance(request.error, CircuitOpenError):
+                    pass  # המפסק כבר הודיע על המעבר למצב מוגבל - לא מציפים את הלוג
+                else:
+                    print(f"{request.kind.capitalize()} AI request failed: {request.error}")
+            except Exception as e:
+                print(f"Error applying {request.kind} AI result: {e}")
+                import traceback
+                traceback.print_exc()
+            if (request.kind in ("visual", "combined") and request.status != "done"
+                    and not request.context.get("visual_applied") and self.scheduler is not None):
+                # אנשים חדשים שהניתוח החזותי שלהם לא הושלם חוזרים לתור - אחרת לא ייפתח להם סשן חדש
+                self.scheduler.note_persons([(person_id, True) for person_id, is_new in detected_persons if is_new])
+            self._finish_round(request.context["round"], request.finished_at)
+        if requests:
+            self._publish_result("usage", usage_ledger.summary())
+
+    def _apply_partial_results(self):
+        """מיישם את החלקים שהגיעו מתשובות בהזרמה - השומרים והתצוגה מתעדכנים תוך כדי יצירת התשובה"""
+        while True:
+            try:
+                kind, document, context = self._partials.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                # המסמך החלקי כבר פורק בזמן ההזרמה - רק ממירים לתוצאה מוקלדת, בלי JSON נוסף
+                self._apply_ai_result(kind, result_from_document(kind, document),
+                                      self._round_persons(kind, context), context["person_ids"])
+                metrics.inc(f"ai.{kind}.partial_updates")
+            except Exception as e:
+                print(f"Error applying partial {kind} AI result: {e}")
+
+    def _finish_round(self, round_id, finished_at):
+        """סבב מסתיים כשכל הבקשות שלו הסתיימו - עדכון המתזמן בזמן הסבב וביציבות התיאורים"""
+        round_state = self._rounds.get(round_id)
+        if round_state is None:
+            return
+        round_state["pending"] -= 1
+        if round_state["pending"] > 0:
+            return
+        del self._rounds[round_id]
+        if round_state["visual_calls"]:
+            # תיאורים מועילים: מה שנוסף או השתנה במאגר החזותי בעקבות הסבב
+            useful = len(self._visual_snapshot() - round_state["visual_before"])
+            self.visual_calls["useful"] += useful
+            metrics.inc("ai.visual.useful_descriptions", useful)
+        if self.scheduler is not None:
+            change_ratio = description_change_ratio(round_state["descriptions_before"], self._description_snapshot())
+            self.scheduler.finish_analysis(finished_at - round_state["start"], change_ratio)
+
+    def _apply_ai_result(self, kind, result, detected_persons, person_ids=None):
+        """מעדכן את המאגר המתאים לסוג הניתוח ומפרסם את התוצאה (result - תוצאה מוקלדת מ-ai_results)"""
+        if kind == "combined":
+            # תשובה משולבת - מפצלים לשני המאגרים (בחיתוכי אנשים - האינדקס ממופה למזהה)
+            visual_result, behavioral_result = result.split(person_ids)
+            self._apply_ai_result("visual", visual_result, detected_persons)
+            self._apply_ai_result("behavioral", behavioral_result, detected_persons)
+        elif kind == "visual":
+            if result.persons:
+                print("Visual AI analysis received. Processing...")
+                self.data_saver.process_multi_person_analysis(
+                    result,
+                    detected_persons
+                )
+                self._publish_result("visual", self.data_saver.current_session)
+            else:
+                print("Visual AI analysis failed or returned no data.")
+        elif kind == "behavioral":
+            if result.insights:
+                print("Behavioral AI analysis received. Processing...")
+                self.behavioral_data_saver.process_behavioral_analysis(
+                    result,
+                    detected_persons
+                )
+                self._publish_result("behavioral", self.behavioral_data_saver.current_session)
+            else:
+                print("Behavioral AI analysis failed or returned no data.")
+
+    def _wait_for_next_round(self):
+        """המתנה עד לזיהוי הבא - או עד לסבב ה-AI הבא, אם הוא מוקדם יותר"""
+        wait = self.interval_seconds
+        if self.scheduler is not None:
+            wait = min(wait, self.scheduler.seconds_until_due())
+        # בזמן ההמתנה מיישמים תשובות שמגיעות מהמנוע
+        deadline = time.time() + wait
+        while self.running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            # בהזרמה מתעוררים לעתים קרובות, כדי שחלקי תשובה יוצגו מיד
+            self._apply_completed_requests(min(remaining, 0.1) if self.streaming else remaining)
+
+    def _visual_snapshot(self):
+        """כל התיאורים החזותיים הנוכחיים כקבוצה של person_id|category|item"""
+        snapshot = set()
+        visual_session = self.data_saver.current_session
+        if visual_session:
+            for person in visual_session.get("session", []):
+                for category, items in person.get("categories", {}).items():
+                    for item in items:
+                        snapshot.add(f"{person['person_id']}|{category}|{item}")
+        return snapshot
+
+    def _description_snapshot(self):
+        """כל התיאורים הנוכחיים (חזותיים והתנהגותיים) כקבוצה, למדידת יציבות בין סבבים"""
+        snapshot = self._visual_snapshot()
+        behavioral_session = self.behavioral_data_saver.current_session
+        if behavioral_session:
+            for insight in behavioral_session.get("behavioral_analysis", []):
+                snapshot.add(f"behavior|{insight}")
+        return snapshot
+
+    def _publish_result(self, kind, payload):
+        """מעביר תוצאה למאזין (למשל ערוץ התוצאות של תהליך הניתוח)"""
+        if self.result_listener is not None:
+            try:
+                self.result_listener(kind, payload)
+            except Exception as e:
+                print(f"Error publishing {kind} result: {e}")
+
+    def start_new_scene(self):
+        """סצנה חדשה: סגירת הסשנים הנוכחיים ואיפוס המעקב אחרי אנשים"""
+        self.data_saver.start_new_scene()
+        self.behavioral_data_saver.start_new_scene()
+        self.person_tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        if self.keyframes is not None:
+            self.keyframes.reset()
+        if self.frame_selector is not None:
+            self.frame_selector.reset()
+        usage_ledger.start_new_scene()
+        self._publish_result("usage", usage_ledger.summary())
+
+    def _publish_ai_status(self):
+        """מפרסם את מצב שירות ה-AI כשהמפסק משנה מצב"""
+        state = circuit_breaker.state
+        if state != self._published_ai_state:
+            self._published_ai_state = state
+            self._publish_result("status", circuit_breaker.get_status())
+
+    def get_ai_status(self):
+        """מצב שירות ה-AI לתצוגה: closed (תקין) / open (מוגבל) / half_open (בודקים שוב)"""
+        return circuit_breaker.get_status()
+
+    def get_behavioral_call_stats(self):
+        """קריאות התנהגותיות לדקה, פריימים ותובנות לקריאה - להשוואה בין פריים בודד לפריימים מפתח"""
+        calls = self.behavioral_calls["calls"]
+        minutes = max(1e-6, (time.time() - self._started_at) / 60.0)
+        return {
+            "mode": (f"{self.keyframes.count} keyframes ({'sheet' if self.keyframe_sheet else 'sequence'})"
+                     if self.keyframes is not None else "single frame"),
+            "calls_per_min": calls / minutes,
+            "frames_per_call": self.behavioral_calls["frames"] / calls if calls else 0.0,
+            "insights_per_call": self.behavioral_calls["insights"] / calls if calls else 0.0,
+        }
+
+    def get_visual_call_stats(self):
+        """תיאורים שהוחזרו ותיאורים מועילים (חדשים במאגר) לכל קריאה חזותית שנענתה"""
+        calls = self.visual_calls["calls"]
+        return {
+            "frame_selection": self.frame_selector is not None,
+            "calls": calls,
+            "returned_per_call": self.visual_calls["returned"] / calls if calls else 0.0,
+            "useful_per_call": self.visual_calls["useful"] / calls if calls else 0.0,
+        }
+
+    def get_usage_summary(self):
+        """בקשות, טוקנים ועלות - לסצנה הנוכחית ולשעה הנוכחית (לתצוגה)"""
+        return usage_ledger.summary()
+
+    def clean_behavioral_data(self):
+        """איחוד סשנים התנהגותיים כפולים"""
+        self.behavioral_data_saver.clean_duplicate_sessions()
+
     def stop(self):
         self.running = False
\ No newline at end of file
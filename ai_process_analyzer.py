@@ -0,0 +1,194 @@
+import multiprocessing as mp
+import queue
+import threading
+import time
+
+
+def _analysis_worker_main(ring_args, result_queue, command_queue, stop_event, interval_seconds):
+    """נקודת הכניסה של תהליך הניתוח: מריץ את AIBackgroundAnalyzer הרגיל על טבעת משותפת"""
+    # ייבוא בתוך התהליך - Gemini, Haar ו-PIL נטענים רק כאן
+    from shared_frame_buffer import SharedFrameRingBuffer
+    from ai_background_analyzer import AIBackgroundAnalyzer
+    from data_saver import DataSaver
+    from behavioral_data_saver import BehavioralDataSaver
+
+    ring = SharedFrameRingBuffer.attach(*ring_args)
+
+    def send_result(kind, payload):
+        try:
+            result_queue.put_nowait((kind, payload))
+        except queue.Full:
+            pass  # התצוגה מקבלת עדכון חדש בהמשך, אין טעם לחסום את הניתוח
+
+    analyzer = AIBackgroundAnalyzer(ring, DataSaver(), BehavioralDataSaver(),
+                                    interval_seconds=interval_seconds, result_listener=send_result)
+    analyzer.start()
+
+    # הלולאה הראשית של התהליך מטפלת בפקודות מהתהליך הראשי
+    while not stop_event.is_set():
+        try:
+            command = command_queue.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        if command == "new_scene":
+            analyzer.start_new_scene()
+            send_result("persons", analyzer.person_tracker.get_active_persons())
+        elif command == "clean_behavioral":
+            analyzer.clean_behavioral_data()
+        elif command == "reset_tracker":
+            analyzer.person_tracker.reset()
+        elif command == "stop":
+            break
+
+    analyzer.stop()
+    analyzer.join(timeout=5.0)
+    try:
+        ring.close()
+    except BufferError:
+        pass  # עדיין קיימת השאלה פעילה - מערכת ההפעלה תשחרר ביציאה
+
+
+class _PersonTrackerProxy:
+    """מחקה את PersonTracker בתהליך הראשי לפי התוצאות שמגיעות מתהליך הניתוח"""
+
+    def __init__(self, owner):
+        self._owner = owner
+        self.active_persons = []
+
+    def get_active_persons(self):
+        return list(self.active_persons)
+
+    def reset(self):
+        self.active_persons = []
+        self._owner.send_command("reset_tracker")
+
+
+class AIProcessAnalyzer:
+    """מריץ את צינור הניתוח בתהליך נפרד, כך שזיהוי הפנים, PIL, פענוח JSON ומיזוג הקטגוריות
+    לא מתחרים עם לולאת הרינדור על ה-GIL.
+
+    הפריימים עוברים דרך SharedFrameRingBuffer (shared_memory): thread מזין בתהליך הראשי
+    מעתיק את הפריים האחרון לטבעת המשותפת רק כשהתהליך מבקש פריים. התוצאות
+    (אנשים פעילים, סשן חזותי מקוטגר ותובנות התנהגותיות) חוזרות בתור קל."""
+
+    def __init__(self, frame_buffer, data_saver, behavioral_data_saver, interval_seconds=0.5, shared_slots=3):
+        self.frame_buffer = frame_buffer  # הטבעת המקומית שהמצלמה כותבת אליה
+        self.data_saver = data_saver  # רק לנתיבי הקבצים - הכתיבה נעשית בתהליך הניתוח
+        self.behavioral_data_saver = behavioral_data_saver
+        self.interval_seconds = interval_seconds
+        self.shared_slots = shared_slots
+        self.person_tracker = _PersonTrackerProxy(self)
+        self.latest_visual_session = None
+        self.latest_behavioral_session = None
+        self.latest_usage = None  # בקשות, טוקנים ועלות - מחושבים בתהליך הניתוח
+        self.latest_ai_status = None  # מצב המפסק של שירות ה-AI בתהליך הניתוח
+        self.results_received = 0
+
+        self._ctx = mp.get_context("spawn")  # זהה ב-Windows, Linux ו-macOS
+        self._result_queue = self._ctx.Queue(maxsize=100)
+        self._command_queue = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._process = None
+        self._shared_ring = None
+        self._running = False
+        self._feeder_thread = None
+        self._results_thread = None
+
+    def start(self):
+        self._running = True
+        self._feeder_thread = threading.Thread(target=self._feed_frames, name="AnalysisFeeder", daemon=True)
+        self._results_thread = threading.Thread(target=self._receive_results, name="AnalysisResults", daemon=True)
+        self._feeder_thread.start()
+        self._results_thread.start()
+        print("AI analysis process mode: waiting for the first frame to start the worker.")
+
+    def _start_worker(self, shape, dtype):
+        """יצירת הטבעת המשותפת לפי גודל הפריים והפעלת התהליך"""
+        from shared_frame_buffer import SharedFrameRingBuffer
+        self._shared_ring = SharedFrameRingBuffer(shape, dtype, num_slots=self.shared_slots, context=self._ctx)
+        process = self._ctx.Process(
+            target=_analysis_worker_main,
+            args=(self._shared_ring.attach_args(), self._result_queue, self._command_queue,
+                  self._stop_event, self.interval_seconds),
+            name="AIAnalysisWorker",
+            daemon=True,
+        )
+        process.start()
+        self._process = process
+        print(f"AI analysis worker process started (pid {self._process.pid}, frames {shape})")
+
+    def _feed_frames(self):
+        """מעביר לתהליך הניתוח את הפריים האחרון - רק כשהוא מבקש אחד"""
+        last_seq = 0
+        while self._running:
+            if self._shared_ring is not None and not self._shared_ring.wanted.wait(timeout=0.1):
+                continue
+            lease = self.frame_buffer.borrow_latest(last_seq, timeout=0.1)
+            if lease is None:
+                continue
+            with lease:
+                if self._shared_ring is None:
+                    self._start_worker(lease.frame.shape, lease.frame.dtype)
+                elif lease.frame.shape != self._shared_ring.shape:
+                    continue  # שינוי רזולוציה באמצע ריצה אינו נתמך במצב תהליך
+                if self._shared_ring.publish(lease.frame, lease.capture_time) is not None:
+                    last_seq = lease.seq
+
+    def _receive_results(self):
+        """קורא תוצאות מהתהליך ומעדכן את המצב המקומי"""
+        while self._running or not self._result_queue.empty():
+            try:
+                kind, payload = self._result_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self.results_received += 1
+            if kind == "persons":
+                self.person_tracker.active_persons = payload
+            elif kind == "visual":
+                self.latest_visual_session = payload
+            elif kind == "behavioral":
+                self.latest_behavioral_session = payload
+            elif kind == "usage":
+                self.latest_usage = payload
+            elif kind == "status":
+                self.latest_ai_status = payload
+
+    def send_command(self, command):
+        self._command_queue.put(command)
+
+    def start_new_scene(self):
+        self.send_command("new_scene")
+
+    def get_usage_summary(self):
+        return self.latest_usage
+
+    def get_ai_status(self):
+        return self.latest_ai_status
+
+    def clean_behavioral_data(self):
+        self.send_command("clean_behavioral")
+
+    def stop(self):
+        self._running = False
+        self._stop_event.set()
+        self.send_command("stop")
+
+    def join(self, timeout=None):
+        deadline = time.time() + (timeout if timeout is not None else 1e9)
+        for thread in (self._feeder_thread, self._results_thread):
+            if thread is not None:
+                thread.join(timeout=max(0.0, deadline - time.time()))
+        if self._process is not None:
+            self._process.join(timeout=max(0.0, deadline - time.time()))
+            if self._process.is_alive():
+                print("AI analysis worker did not stop in time - terminating it.")
+                self._process.terminate()
+                self._process.join(timeout=1.0)
+        if self._shared_ring is not None:
+            self._shared_ring.close()
+            self._shared_ring = None
+
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
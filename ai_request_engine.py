@@ -0,0 +1,258 @@
+import asyncio
+import heapq
+import itertools
+import queue
+import threading
+import time
+from metrics import metrics
+
+
+# סוגי עבודות לפי ערך, מהחשובה ביותר: אדם חדש, מראה שהשתנה, רענון תקופתי, ניתוח התנהגותי בלבד
+JOB_CLASSES = ("new_person", "changed", "refresh", "behavioral")
+_JOB_RANK = {job_class: rank for rank, job_class in enumerate(JOB_CLASSES)}
+
+
+class AIRequest:
+    """בקשת AI אחת במנוע: סוג, סוג העבודה (עדיפות), זמן לכידת הפריים, מצב ותוצאה"""
+
+    def __init__(self, request_id, kind, capture_time, context=None, job_class="refresh"):
+        self.request_id = request_id
+        self.kind = kind  # "visual" / "behavioral"
+        self.job_class = job_class  # אחד מ-JOB_CLASSES
+        self.capture_time = capture_time
+        self.context = context  # נתונים של השולח (למשל האנשים שזוהו בפריים)
+        self.submitted_at = time.time()
+        self.started_at = None  # רגע הכניסה לאחד ממקומות הבקשה המקבילית
+        self.finished_at = None
+        self.status = "queued"  # queued / running / done / timeout / cancelled / error
+        self.cancel_reason = None
+        self.result = None
+        self.error = None
+        self._task = None
+        self._coroutine = None
+
+    @property
+    def rank(self):
+        return _JOB_RANK.get(self.job_class, len(JOB_CLASSES))
+
+    @property
+    def queue_wait(self):
+        """זמן ההמתנה בתור עד שהבקשה קיבלה מקום"""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    @property
+    def latency(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class AIRequestEngine:
+    """מנוע בקשות AI אסינכרוני: לולאת asyncio ב-thread משלה.
+
+    - לכל היותר max_in_flight בקשות פתוחות במקביל. השאר ממתינות בתור עדיפויות: כשמתפנה
+      מקום רצה העבודה החשובה ביותר (לפי JOB_CLASSES), ובתוך אותו סוג - זו שהפריים שלה חדש יותר.
+    - לכל בקשה מגבלת זמן משלה (request_timeout).
+    - בקשה שהפריים שלה ישן מ-max_frame_age מבוטלת (ואם עוד בתור - נזרקת), וכך גם בקשה
+      שעוד ממתינה בתור כשנשלחת בקשה חדשה מאותו סוג שחשובה לפחות כמוה.
+    התוצאות נאספות בתור, והמנתח מיישם אותן ב-thread שלו (poll_results / wait_results)."""
+
+    def __init__(self, max_in_flight=4, request_timeout=20.0, max_frame_age=10.0):
+        self.max_in_flight = max_in_flight
+        self.request_timeout = request_timeout
+        self.max_frame_age = max_frame_age  # 0 = ללא ביטול לפי גיל הפריים
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="AIRequestEngine", daemon=True)
+        self._ready = threading.Event()
+        self._waiting = []  # heap של (דירוג, -זמן לכידה, מזהה, AIRequest) - רק בתוך הלולאה
+        self._running = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._requests = {}  # request_id -> AIRequest (בקשות פתוחות)
+        self._completed = queue.Queue()
+        self._background = []  # משימות רקע (למשל שמירה על חיבור המודל) - מבוטלות ב-stop
+
+        # מונים
+        self.submitted = 0
+        self.status_counts = {}
+        self.class_stats = {}  # job_class -> started / dropped / wait_seconds
+        for job_class in JOB_CLASSES:
+            self._class_stats(job_class)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._background.append(self._loop.create_task(self._watch_stale_requests()))
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit(self, kind, coroutine, capture_time=None, context=None, job_class="refresh"):
+        """שולח coroutine לביצוע ומחזיר AIRequest. בקשה קודמת מאותו סוג שעוד בתור ואינה חשובה
+        יותר מהחדשה - מבוטלת"""
+        request = AIRequest(next(self._ids), kind, capture_time or time.time(), context, job_class)
+        with self._lock:
+            superseded = [r for r in self._requests.values()
+                          if r.kind == kind and r.status == "queued" and r.rank >= request.rank]
+            self._requests[request.request_id] = request
+            self.submitted += 1
+        for old_request in superseded:
+            self._loop.call_soon_threadsafe(self._cancel, old_request, "superseded")
+        self._loop.call_soon_threadsafe(self._enqueue, request, coroutine)
+        metrics.inc(f"ai.engine.{kind}.submitted")
+        return request
+
+    def run_background(self, coroutine):
+        """מריץ coroutine ברקע בלולאת המנוע, מחוץ למגבלת הבקשות המקביליות"""
+        self._loop.call_soon_threadsafe(lambda: self._background.append(self._loop.create_task(coroutine)))
+
+    def _class_stats(self, job_class):
+        return self.class_stats.setdefault(job_class, {"started": 0, "dropped": 0, "wait_seconds": 0.0})
+
+    def _enqueue(self, request, coroutine):
+        request._coroutine = coroutine
+        if request.status != "queued":  # בוטלה עוד לפני שהגיעה ללולאה
+            self._finish(request)
+            return
+        heapq.heappush(self._waiting, (request.rank, -request.capture_time, request.request_id, request))
+        self._dispatch()
+
+    def _dispatch(self):
+        """מתחיל את העבודות החשובות ביותר בתור כל עוד יש מקום; עבודה שהפריים שלה התיישן נזרקת"""
+        while self._waiting and self._running < self.max_in_flight:
+            request = heapq.heappop(self._waiting)[-1]
+            if request.status != "queued":
+                continue  # בוטלה בזמן ההמתנה
+            now = time.time()
+            if self.max_frame_age and now - request.capture_time > self.max_frame_age:
+                request.status = "cancelled"
+                request.cancel_reason = "stale"
+                self._finish(request)
+                continue
+            self._running += 1
+            request.status = "running"
+            request.started_at = now
+            with self._lock:
+                stats = self._class_stats(request.job_class)
+                stats["started"] += 1
+                stats["wait_seconds"] += request.queue_wait
+            metrics.observe(f"ai.queue.{request.job_class}.wait", request.queue_wait)
+            metrics.set_gauge("ai.engine.in_flight", self._running)
+            request._task = self._loop.create_task(self._run_request(request))
+            request._task.add_done_callback(lambda task, request=request: self._finish(request))
+        metrics.set_gauge("ai.queue.waiting", len(self._waiting))
+
+    async def _run_request(self, request):
+        try:
+            request.result = await asyncio.wait_for(request._coroutine, timeout=self.request_timeout)
+            request.status = "done"
+        except asyncio.TimeoutError:
+            request.status = "timeout"
+        except Exception as e:
+            request.status = "error"
+            request.error = e
+
+    def _finish(self, request):
+        started = request._task is not None
+        if started and request._task.cancelled():
+            request.status = "cancelled"
+        if request._coroutine is not None:
+            request._coroutine.close()  # בקשה שבוטלה עוד בתור - ה-coroutine מעולם לא רץ
+        request.finished_at = time.time()
+        if request.started_at is None:
+            request.started_at = request.finished_at
+        with self._lock:
+            self._requests.pop(request.request_id, None)
+            self.status_counts[request.status] = self.status_counts.get(request.status, 0) + 1
+            if not started:
+                self._class_stats(request.job_class)["dropped"] += 1
+        metrics.inc(f"ai.engine.{request.kind}.{request.status}")
+        if not started:
+            metrics.inc(f"ai.queue.{request.job_class}.dropped.{request.cancel_reason}")
+        if request.status == "done":
+            metrics.observe(f"ai.engine.{request.kind}", request.latency)
+        self._completed.put(request)
+        if started:
+            self._running -= 1
+            metrics.set_gauge("ai.engine.in_flight", self._running)
+            self._dispatch()
+
+    def _cancel(self, request, reason):
+        if request.status == "queued":
+            # עוד בתור: מסמנים, והיא נזרקת כשתגיע לראש התור (או מיד, אם עוד לא הגיעה ללולאה)
+            request.status = "cancelled"
+            request.cancel_reason = reason
+            if request._coroutine is not None:
+                self._finish(request)
+        elif request._task is not None and not request._task.done():
+            request.cancel_reason = reason
+            request._task.cancel()
+
+    async def _watch_stale_requests(self):
+        """מבטל בקשות שהפריים שלהן כבר לא רלוונטי"""
+        while True:
+            await asyncio.sleep(0.25)
+            if not self.max_frame_age:
+                continue
+            now = time.time()
+            with self._lock:
+                stale = [r for r in self._requests.values() if now - r.capture_time > self.max_frame_age]
+            for request in stale:
+                self._cancel(request, "stale")
+
+    def poll_results(self):
+        """כל הבקשות שהסתיימו מאז הקריאה הקודמת (ללא המתנה)"""
+        results = []
+        while True:
+            try:
+                results.append(self._completed.get_nowait())
+            except queue.Empty:
+                return results
+
+    def wait_results(self, timeout):
+        """ממתין עד timeout לבקשה שהסתיימה, ומחזיר את כל מה שהסתיים"""
+        try:
+            first = self._completed.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            return []
+        return [first] + self.poll_results()
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for r in self._requests.values() if r.status == "running")
+
+    def pending(self):
+        with self._lock:
+            return len(self._requests)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "open": len(self._requests),
+                "in_flight": sum(1 for r in self._requests.values() if r.status == "running"),
+                "max_in_flight": self.max_in_flight,
+                **self.status_counts,
+                "queue": {job_class: {"started": stats["started"], "dropped": stats["dropped"],
+                                      "avg_wait_ms": stats["wait_seconds"] / stats["started"] * 1000
+                                      if stats["started"] else 0.0}
+                          for job_class, stats in self.class_stats.items()},
+            }
+
+    def stop(self, timeout=2.0):
+        """ביטול כל הבקשות הפתוחות ועצירת הלולאה"""
+        if not self._thread.is_alive():
+            return
+        with self._lock:
+            open_requests = list(self._requests.values())
+        for request in open_requests:
+            self._loop.call_soon_threadsafe(self._cancel, request, "shutdown")
+        for task in self._background:
+            self._loop.call_soon_threadsafe(task.cancel)
+        # עצירה בסבב הבא של הלולאה, כדי שהמשימות שבוטלו יספיקו לסיים
+        self._loop.call_soon_threadsafe(self._loop.call_soon, self._loop.stop)
+        self._thread.join(timeout=timeout)
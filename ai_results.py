@@ -0,0 +1,224 @@
+import json
+import re
+import threading
+import time
+from metrics import metrics
+from streaming_json import StreamingDocument
+
+
+class PersonDescriptions:
+    """התיאורים החזותיים של אדם אחד בתשובה (person_id - None אם המודל לא החזיר מספר תקין)"""
+
+    __slots__ = ("person_id", "descriptions")
+
+    def __init__(self, person_id, descriptions):
+        self.person_id = person_id
+        self.descriptions = descriptions
+
+    def __repr__(self):
+        return f"PersonDescriptions({self.person_id!r}, {len(self.descriptions)} descriptions)"
+
+
+class VisualResult:
+    """תשובה חזותית מפוענחת: רשימת אנשים ותיאוריהם"""
+
+    def __init__(self, persons=None, session_id=None):
+        self.persons = persons or []
+        self.session_id = session_id
+
+    def is_empty(self):
+        return not any(person.descriptions for person in self.persons)
+
+    def description_count(self):
+        return sum(len(person.descriptions) for person in self.persons)
+
+    def __repr__(self):
+        return f"VisualResult({len(self.persons)} person(s), {self.description_count()} descriptions)"
+
+
+class BehavioralResult:
+    """תשובה התנהגותית מפוענחת: רשימת התובנות"""
+
+    def __init__(self, insights=None, session_id=None):
+        self.insights = insights or []
+        self.session_id = session_id
+
+    def is_empty(self):
+        return not self.insights
+
+    def __repr__(self):
+        return f"BehavioralResult({len(self.insights)} insights)"
+
+
+class CombinedResult:
+    """תשובה משולבת מפוענחת: חלק חזותי (person_id הוא person_index) וחלק התנהגותי"""
+
+    def __init__(self, visual=None, behavioral=None):
+        self.visual = visual or VisualResult()
+        self.behavioral = behavioral or BehavioralResult()
+
+    def is_empty(self):
+        return self.visual.is_empty() and self.behavioral.is_empty()
+
+    def split(self, person_ids=None):
+        """(VisualResult, BehavioralResult) לשומרים. person_ids - מזהי האנשים לפי סדר החיתוכים
+        (מצב ROI): person_index ממופה למזהה לפי הבנייה"""
+        persons = []
+        for i, person in enumerate(sorted(self.visual.persons, key=lambda p: p.person_id or 0)):
+            person_id = person.person_id if person.person_id is not None else i
+            if person_ids and person_id not in person_ids and 0 <= person_id < len(person_ids):
+                person_id = person_ids[person_id]
+            persons.append(PersonDescriptions(person_id, person.descriptions))
+        return VisualResult(persons, self.visual.session_id), self.behavioral
+
+    def __repr__(self):
+        return f"CombinedResult({self.visual!r}, {self.behavioral!r})"
+
+
+class ResponseDecodeStats:
+    """מונים לפענוח תשובות לכל סוג קריאה: ok - JSON נקי, extracted - היה טקסט מסביב
+    (```json, הסבר), repaired - פסיק מיותר תוקן, salvaged - JSON קטוע ונשמר רק מה שנסגר,
+    malformed - לא נמצא בתשובה שום דבר שמיש"""
+
+    OUTCOMES = ("ok", "extracted", "repaired", "salvaged", "malformed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}  # kind -> outcome -> count
+        self.last_malformed = {}  # kind -> תחילת התשובה הפגומה האחרונה, לדיבאג
+
+    def record(self, kind, outcome, text=None):
+        with self._lock:
+            by_kind = self.counts.setdefault(kind, dict.fromkeys(self.OUTCOMES, 0))
+            by_kind[outcome] += 1
+            if outcome == "malformed" and text is not None:
+                self.last_malformed[kind] = text[:200]
+        metrics.inc(f"ai.{kind}.decode.{outcome}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = {}
+            for kind, by_kind in self.counts.items():
+                total = sum(by_kind.values())
+                stats[kind] = {**by_kind, "malformed_rate": by_kind["malformed"] / total if total else 0.0}
+            return stats
+
+
+# מונים משותפים לכל המנתחים בתהליך
+decode_stats = ResponseDecodeStats()
+
+_TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+_DECODER = json.JSONDecoder()
+
+
+def _strip_fence(text):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[text.find("\n") + 1:] if "\n" in text else text[3:]
+        if text.rstrip().endswith("```"):
+            text = text.rstrip()[:-3]
+    return text.strip()
+
+
+def _decode_json(text):
+    """מחלץ את ערך ה-JSON הראשון בטקסט. מחזיר (value, outcome) או (None, "malformed")"""
+    stripped = _strip_fence(text)
+    start = min((i for i in (stripped.find("{"), stripped.find("[")) if i != -1), default=-1)
+    if start == -1:
+        return None, "malformed"
+    try:
+        value, end = _DECODER.raw_decode(stripped, start)
+        clean = start == 0 and end == len(stripped) and stripped == text.strip()
+        return value, "ok" if clean else "extracted"
+    except json.JSONDecodeError:
+        pass
+    try:
+        value, _ = _DECODER.raw_decode(_TRAILING_COMMA.sub(r"\1", stripped), start)
+        return value, "repaired"
+    except json.JSONDecodeError:
+        pass
+    # JSON קטוע - המפרק ההדרגתי מחזיר את מה שכבר נסגר, כמו בהזרמה
+    value = StreamingDocument().feed(stripped[start:])
+    return (value, "salvaged") if value else (None, "malformed")
+
+
+def _strings(items):
+    if not isinstance(items, list):
+        return []
+    stripped = [item.strip() for item in items if isinstance(item, str)]
+    return [item for item in stripped if item] if "" in stripped else stripped
+
+
+def _person_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _persons(items, id_key):
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        return []
+    return [PersonDescriptions(_person_id(item.get(id_key)), _strings(item.get("descriptions")))
+            for item in items if isinstance(item, dict)]
+
+
+def visual_from_document(document):
+    """VisualResult ממסמך שכבר פוענח: {"session": [...]}, רשימת אנשים, או אדם בודד"""
+    if isinstance(document, dict):
+        if "session" in document:
+            return VisualResult(_persons(document["session"], "person_id"), document.get("session_id"))
+        if "person_id" in document:
+            return VisualResult(_persons(document, "person_id"))
+        return VisualResult(session_id=document.get("session_id"))
+    return VisualResult(_persons(document, "person_id"))
+
+
+def behavioral_from_document(document):
+    if not isinstance(document, dict):
+        return BehavioralResult()
+    return BehavioralResult(_strings(document.get("behavioral_analysis")), document.get("session_id"))
+
+
+def combined_from_document(document):
+    if not isinstance(document, dict):
+        return CombinedResult()
+    return CombinedResult(VisualResult(_persons(document.get("people"), "person_index")),
+                          behavioral_from_document(document))
+
+
+_FROM_DOCUMENT = {
+    "visual": visual_from_document,
+    "behavioral": behavioral_from_document,
+    "combined": combined_from_document,
+}
+
+
+def result_from_document(kind, document):
+    """תוצאה מוקלדת ממסמך JSON שכבר פורק (למשל חלק מתשובה בהזרמה)"""
+    return _FROM_DOCUMENT[kind](document)
+
+
+def empty_result(kind):
+    return _FROM_DOCUMENT[kind](None)
+
+
+def decode_response(kind, text):
+    """מפענח את טקסט התשובה פעם אחת לתוצאה מוקלדת (VisualResult / BehavioralResult /
+    CombinedResult), סופר את איכות התשובה ב-decode_stats ומודד את זמן ה-CPU של הפענוח"""
+    started = time.thread_time()
+    if not text or not text.strip():
+        document, outcome = None, "malformed"
+    elif text.strip() in ("None", "null"):
+        document, outcome = None, "ok"  # הפרומפט החזותי מבקש None כשאין אנשים בפריים
+    else:
+        document, outcome = _decode_json(text)
+    result = _FROM_DOCUMENT[kind](document)
+    metrics.observe(f"ai.{kind}.decode", time.thread_time() - started)
+    decode_stats.record(kind, outcome, text)
+    if outcome not in ("ok", "extracted"):
+        print(f"{kind.capitalize()} AI response {outcome}" +
+              (f": {text[:200]!r}" if outcome == "malformed" and text else ""))
+    return result
@@ -0,0 +1,81 @@
+import threading
+import time
+import config
+from metrics import metrics
+from rate_limiter import rate_limiter
+
+
+def estimate_cost(prompt_tokens, output_tokens):
+    """עלות משוערת בדולרים לפי מחירי המודל שבהגדרות"""
+    return (prompt_tokens * config.AI_PRICE_INPUT_PER_MTOK
+            + output_tokens * config.AI_PRICE_OUTPUT_PER_MTOK) / 1_000_000
+
+
+def _empty_totals():
+    return {"requests": 0, "prompt_tokens": 0, "output_tokens": 0, "cost_usd": 0.0}
+
+
+class UsageLedger:
+    """מונים רצים של בקשות, טוקנים ועלות - לסצנה הנוכחית ולכל שעה"""
+
+    def __init__(self, keep_hours=48):
+        self.keep_hours = keep_hours
+        self._lock = threading.Lock()
+        self.scene = _empty_totals()
+        self.hours = {}  # "YYYY-MM-DD HH:00" -> totals
+        self.total = _empty_totals()
+
+    @staticmethod
+    def _hour_key(timestamp):
+        return time.strftime("%Y-%m-%d %H:00", time.localtime(timestamp))
+
+    def record(self, prompt_tokens, output_tokens, cost, timestamp=None):
+        hour_key = self._hour_key(timestamp if timestamp is not None else time.time())
+        with self._lock:
+            if hour_key not in self.hours:
+                self.hours[hour_key] = _empty_totals()
+                for old_key in sorted(self.hours)[:-self.keep_hours]:
+                    del self.hours[old_key]
+            for totals in (self.scene, self.hours[hour_key], self.total):
+                totals["requests"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["output_tokens"] += output_tokens
+                totals["cost_usd"] += cost
+            metrics.set_gauge("ai.usage.scene_cost_usd", self.scene["cost_usd"])
+            metrics.set_gauge("ai.usage.hour_cost_usd", self.hours[hour_key]["cost_usd"])
+
+    def start_new_scene(self):
+        with self._lock:
+            self.scene = _empty_totals()
+
+    def summary(self):
+        """תמונת מצב: הסצנה הנוכחית, השעה הנוכחית וסך הכול"""
+        with self._lock:
+            return {
+                "scene": dict(self.scene),
+                "hour": dict(self.hours.get(self._hour_key(time.time()), _empty_totals())),
+                "total": dict(self.total),
+            }
+
+
+# ספר השימוש של התהליך - משותף לכל המנתחים
+usage_ledger = UsageLedger()
+
+
+def record_usage(kind, response):
+    """רישום טוקנים ועלות של תשובת Gemini במאגר המדדים, בספר השימוש ובמגביל הקצב.
+    מחזיר (prompt, output, cost)"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0, 0.0
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    cost = estimate_cost(prompt_tokens, output_tokens)
+    metrics.inc(f"ai.{kind}.calls")
+    metrics.inc(f"ai.{kind}.prompt_tokens", prompt_tokens)
+    metrics.inc(f"ai.{kind}.output_tokens", output_tokens)
+    metrics.inc(f"ai.{kind}.cost_usd", cost)
+    metrics.inc("ai.cost_usd", cost)
+    usage_ledger.record(prompt_tokens, output_tokens, cost)
+    rate_limiter.record(kind, prompt_tokens + output_tokens)
+    return prompt_tokens, output_tokens, cost
@@ -0,0 +1,143 @@
+import time
+from collections import deque
+from metrics import metrics
+
+
+class AnalysisScheduler:
+    """קובע מתי לשלוח את הפריים הבא לניתוח AI, במקום המתנה קבועה אחרי כל סבב.
+
+    - אדם חדש בפריים: ניתוח כמעט מיידי (min_interval).
+    - מבקרים קבועים: המרווח מתחיל מ-max(base_interval, זמן תגובה ממוצע של ה-AI)
+      ומוכפל בכל סבב שבו התיאורים כמעט לא השתנו, עד max_interval.
+    - תקציב בקשות לדקה (rpm_budget): חלון נע של 60 שניות על הקריאות שנשלחו בפועל (record_calls).
+      סבב מתחיל רק אם יש מקום ל-calls_per_analysis קריאות (או לכל התקציב, אם הוא קטן מזה).
+    המרווח נמדד מתחילת הסבב הקודם, כך שזמן התגובה של Gemini נספר בתוכו ולא מתווסף אליו."""
+
+    def __init__(self, min_interval=0.2, base_interval=2.0, max_interval=30.0, rpm_budget=15,
+                 calls_per_analysis=2, change_threshold=0.1, latency_smoothing=0.3):
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.rpm_budget = rpm_budget  # 0 = ללא הגבלה
+        self.calls_per_analysis = calls_per_analysis  # קריאות בסבב מלא - לבדיקת התקציב לפני הסבב
+        if rpm_budget and rpm_budget < calls_per_analysis:
+            print(f"Warning: AI RPM budget {rpm_budget} is below {calls_per_analysis} calls per round - "
+                  f"rounds will wait for the whole budget")
+        self.change_threshold = change_threshold  # שיעור שינוי בתיאורים שמתחתיו הסבב נחשב "יציב"
+        self.latency_smoothing = latency_smoothing
+
+        self.latency_avg = None  # ממוצע נע של זמן סבב ה-AI (שניות)
+        self.stable_rounds = 0  # סבבים רצופים ללא שינוי משמעותי בתיאורים
+        self.last_change_ratio = None
+        self.last_analysis_start = None
+        self.pending_new_ids = set()  # אנשים חדשים שעוד לא נותחו
+        self._call_times = deque()  # זמני קריאות ב-60 השניות האחרונות
+
+        # מונים
+        self.analyses = 0
+        self.deferred = 0
+        self.budget_waits = 0
+
+    def note_persons(self, detected_persons):
+        """רישום תוצאת זיהוי האנשים. אדם חדש מקדים את הניתוח הבא ומאפס את היציבות"""
+        new_ids = [person_id for person_id, is_new in detected_persons if is_new]
+        if new_ids:
+            self.pending_new_ids.update(new_ids)
+            self.stable_rounds = 0
+
+    def current_interval(self):
+        """המרווח הרצוי בין תחילת סבב לתחילת הסבב הבא"""
+        if self.pending_new_ids:
+            return self.min_interval
+        base = max(self.base_interval, self.latency_avg or 0.0)
+        return min(self.max_interval, base * (2 ** self.stable_rounds))
+
+    def _budget_ready_time(self, now):
+        """הזמן המוקדם ביותר שבו אפשר לשלוח סבב נוסף בלי לחרוג מתקציב הבקשות"""
+        while self._call_times and now - self._call_times[0] >= 60.0:
+            self._call_times.popleft()
+        if not self.rpm_budget:
+            return now
+        # עלות סבב לא גדולה מהתקציב - אחרת הסבב לא היה מתחיל לעולם
+        cost = min(self.calls_per_analysis, self.rpm_budget)
+        excess = len(self._call_times) + cost - self.rpm_budget
+        if excess <= 0:
+            return now
+        return self._call_times[excess - 1] + 60.0
+
+    def next_analysis_time(self, now=None):
+        now = now if now is not None else time.time()
+        due = now if self.last_analysis_start is None else self.last_analysis_start + self.current_interval()
+        return max(due, self._budget_ready_time(now))
+
+    def is_due(self, now=None):
+        """האם הגיע הזמן לסבב AI. אם לא - הסבב נדחה ונספר"""
+        now = now if now is not None else time.time()
+        if self.next_analysis_time(now) <= now:
+            return True
+        self.deferred += 1
+        metrics.inc("ai.cadence.deferred")
+        if self.pending_new_ids and self._budget_ready_time(now) > now:
+            self.budget_waits += 1
+            metrics.inc("ai.cadence.budget_waits")
+        return False
+
+    def seconds_until_due(self, now=None):
+        now = now if now is not None else time.time()
+        return max(0.0, self.next_analysis_time(now) - now)
+
+    def start_analysis(self, now=None):
+        """תחילת סבב: מחזיר את האנשים החדשים שממתינים (הקריאות נרשמות בתקציב ב-record_calls)"""
+        now = now if now is not None else time.time()
+        self.last_analysis_start = now
+        new_ids = self.pending_new_ids
+        self.pending_new_ids = set()
+        return new_ids
+
+    def record_calls(self, count, now=None):
+        """רושם בתקציב את הקריאות שנשלחו בפועל (בלי תשובות מהמטמון)"""
+        now = now if now is not None else time.time()
+        for _ in range(count):
+            self._call_times.append(now)
+
+    def finish_analysis(self, latency, change_ratio):
+        """סוף סבב: עדכון זמן התגובה הממוצע ומידת היציבות של התיאורים"""
+        self.analyses += 1
+        if self.latency_avg is None:
+            self.latency_avg = latency
+        else:
+            self.latency_avg += self.latency_smoothing * (latency - self.latency_avg)
+        self.last_change_ratio = change_ratio
+        if change_ratio <= self.change_threshold:
+            self.stable_rounds += 1
+        else:
+            self.stable_rounds = 0
+        metrics.observe("ai.cadence.round", latency)
+        metrics.set_gauge("ai.cadence.interval", self.current_interval())
+
+    def reset(self):
+        """איפוס (למשל בסצנה חדשה) - הניתוח הבא יתבצע מיד"""
+        self.stable_rounds = 0
+        self.last_change_ratio = None
+        self.last_analysis_start = None
+        self.pending_new_ids = set()
+
+    def get_stats(self):
+        return {
+            "analyses": self.analyses,
+            "deferred": self.deferred,
+            "budget_waits": self.budget_waits,
+            "interval_s": self.current_interval(),
+            "latency_avg_s": self.latency_avg or 0.0,
+            "stable_rounds": self.stable_rounds,
+            "last_change_ratio": self.last_change_ratio,
+            "calls_last_minute": len(self._call_times),
+        }
+
+
+def description_change_ratio(before, after):
+    """שיעור השינוי בין שתי קבוצות תיאורים (0 = זהות, 1 = שונות לגמרי)"""
+    union = before | after
+    if not union:
+        return 0.0
+    return len(before ^ after) / len(union)
@@ -1,25 +1,20 @@
-import os
-import json
 import time
-from dotenv import load_dotenv
-import google.generativeai as genai
 from PIL import Image
 import cv2
 import numpy as np
+from ai_usage import record_usage
+from model_client import get_model_client
+from upload_preparer import UploadPayload, RegionPayload, KeyframeBatch
+from model_resilience import resilient_call, resilient_call_async
+from streaming_json import read_stream
+from ai_results import decode_response, empty_result
 
 
 class BehavioralAnalyzer:
     """מחלקה לניתוח התנהגותי ופרשנות של אנשים במצלמה"""
 
-    def __init__(self):
-        load_dotenv()
-        api_key = os.getenv("GOOGLE_API_KEY")
-
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in .env file.")
-
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, client=None):
+        self.client = client or get_model_client()  # לקוח המודל המשותף לכל המנתחים
 
         # הגדרת הפרומפט לניתוח התנהגותי
         self.prompt = """
@@ -86,45 +81,56 @@ class BehavioralAnalyzer:
         pil_image = Image.fromarray(rgb_frame)
         return pil_image
 
-    def analyze_behavior(self, frame):
-        """ניתוח התנהגותי של פריים"""
+    def _image_parts(self, frame):
+        """חלקי התמונה לבקשה: תמונה מוכנה / חיתוכי אנשים / פריימים מפתח כמו שהם, או פריים OpenCV דרך PIL"""
+        if isinstance(frame, (UploadPayload, RegionPayload, KeyframeBatch)):
+            return frame.to_parts()
+        return [self._convert_opencv_frame_to_pil(frame)]
+
+    def analyze_behavior(self, frame, timeout=None, priority="normal"):
+        """ניתוח התנהגותי של פריים (timeout - מגבלת זמן לבקשה, בשניות)"""
         self.frame_count += 1
         print(f"\n=== Behavioral Analysis Frame #{self.frame_count} ===")
 
         try:
-            pil_image = self._convert_opencv_frame_to_pil(frame)
-            response = self.model.generate_content([self.prompt, pil_image], stream=False)
+            image_parts = self._image_parts(frame)
+            request_options = {"timeout": timeout} if timeout else None
+            response = resilient_call("behavioral", lambda: self.client.generate(
+                [self.prompt, *image_parts], stream=False, request_options=request_options),
+                priority, timeout)
             response.resolve()
-
-            json_text = response.text.strip()
-            print(f"Raw behavioral analysis response length: {len(json_text)} chars")
-
-            # ניקוי התשובה
-            if json_text.startswith("```json") and json_text.endswith("```"):
-                json_text = json_text[len("```json"):-len("```")].strip()
-
-            # חיפוש JSON תקין
-            start_index = json_text.find('{')
-            end_index = json_text.rfind('}')
-            if start_index != -1 and end_index != -1 and end_index > start_index:
-                json_text = json_text[start_index: end_index + 1]
-            else:
-                print(f"Behavioral analysis not valid JSON: {json_text[:200]}...")
-                return "{}"
-
-            # בדיקת תוכן ה-JSON לדיבאג
-            try:
-                parsed_json = json.loads(json_text)
-                behavioral_items = parsed_json.get("behavioral_analysis", [])
-                if behavioral_items and len(behavioral_items) > 0:
-                    print(f"Behavioral analysis detected {len(behavioral_items)} insights")
-                else:
-                    print("No behavioral insights detected")
-            except Exception as e:
-                print(f"Error parsing behavioral JSON for debug: {e}")
-
-            return json_text
+            record_usage("behavioral", response)
+            return self._decode_response(response.text)
 
         except Exception as e:
             print(f"Error analyzing behavior: {e}")
-            return "{}"
\ No newline at end of file
+            return empty_result("behavioral")
+
+    def analyze_behavior_async(self, frame, timeout=None, priority="normal", on_partial=None):
+        """גרסה אסינכרונית - מכינה את התמונה מיד ומחזירה coroutine.
+        on_partial - אם ניתן, התשובה מוזרמת ו-on_partial מקבל כל מה שנסגר בה (באותו מבנה JSON)"""
+        self.frame_count += 1
+        image_parts = self._image_parts(frame)
+        return self._analyze_image_async(image_parts, timeout, priority, on_partial)
+
+    async def _analyze_image_async(self, image_parts, timeout=None, priority="normal", on_partial=None):
+        print(f"\n=== Behavioral Analysis Frame #{self.frame_count} (async) ===")
+        request_options = {"timeout": timeout} if timeout else None
+        stream = on_partial is not None
+        started = time.perf_counter()
+        response = await resilient_call_async("behavioral", lambda: self.client.generate_async(
+            [self.prompt, *image_parts], stream=stream, request_options=request_options),
+            priority, timeout)
+        text = await read_stream("behavioral", response, on_partial, started) if stream else response.text
+        record_usage("behavioral", response)
+        return self._decode_response(text)
+
+    def _decode_response(self, text):
+        """פענוח התשובה פעם אחת ל-BehavioralResult"""
+        print(f"Raw behavioral analysis response length: {len(text)} chars")
+        result = decode_response("behavioral", text)
+        if result.insights:
+            print(f"Behavioral analysis detected {len(result.insights)} insights")
+        else:
+            print("No behavioral insights detected")
+        return result
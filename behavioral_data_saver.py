@@ -41,25 +41,17 @@ class BehavioralDataSaver:
         except Exception as e:
             print(f"❌ Error saving behavioral file: {e}")
 
-    def process_behavioral_analysis(self, ai_response_json_string, detected_persons):
-        """מעבד ניתוח התנהגותי"""
+    def process_behavioral_analysis(self, behavioral_result, detected_persons):
+        """מעבד ניתוח התנהגותי (behavioral_result - BehavioralResult מפוענח)"""
         print(f"\n=== BehavioralDataSaver Analysis ===")
         print(f"Detected persons: {[(pid, is_new) for pid, is_new in detected_persons]}")
 
         # איפוס מונה הפריימים ללא אדם
         self.frames_without_person = 0
 
-        # ניקוי התגובה
-        clean_text = self._extract_valid_json(ai_response_json_string)
-        if not clean_text:
-            print("❌ No valid JSON found in behavioral response")
-            return
-
         try:
-            parsed = json.loads(clean_text)
-
-            # חילוץ הניתוחים ההתנהגותיים
-            behavioral_insights = parsed.get("behavioral_analysis", [])
+            # הניתוחים ההתנהגותיים
+            behavioral_insights = behavioral_result.insights
 
             if not behavioral_insights:
                 print("No behavioral insights received")
@@ -77,8 +69,6 @@ class BehavioralDataSaver:
             # עדכן את רשימת המשפטים הזמינים להצגה
             self._update_available_insights()
 
-        except json.JSONDecodeError as e:
-            print(f"❌ Behavioral JSON decode error: {e}")
         except Exception as e:
             print(f"❌ Error processing behavioral data: {e}")
             import traceback
@@ -178,23 +168,6 @@ class BehavioralDataSaver:
         next_id = max(existing_ids, default=0) + 1
         return f"{next_id:03d}"
 
-    def _extract_valid_json(self, text):
-        """מחלץ JSON תקין מהטקסט"""
-        text = text.strip()
-
-        if text.startswith("```json") and text.endswith("```"):
-            text = text[7:-3].strip()
-        elif text.startswith("```") and text.endswith("```"):
-            text = text[3:-3].strip()
-
-        start = text.find('{')
-        end = text.rfind('}')
-
-        if start != -1 and end != -1 and end > start:
-            return text[start:end + 1]
-
-        return None
-
     def _update_available_insights(self):
         """מעדכן את רשימת המשפטים הזמינים להצגה"""
         data = self._load_data()
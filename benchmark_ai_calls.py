@@ -0,0 +1,224 @@
+# השוואת הנתיב הרגיל (קריאה חזותית + קריאה התנהגותית במקביל) מול קריאה משולבת אחת:
+# זמן תגובה, טוקנים ועלות לפריים. דורש GOOGLE_API_KEY אמיתי - כל פריים עולה כסף! (MIRROR_AI_BACKEND=fake - בלי רשת ובלי עלות)
+# הרצה: python benchmark_ai_calls.py [--source images:samples] [--frames 5] [--mode both] [--long-edge 1024] [--quality 85]
+# עם --keyframes K: גם השוואה של הניתוח ההתנהגותי - קריאה לכל פריים מול קריאה אחת לכל K פריימים מפתח
+import argparse
+import asyncio
+import time
+from ai_agent import AIAgent
+from ai_results import decode_stats
+from ai_usage import estimate_cost
+from behavioral_analyzer import BehavioralAnalyzer
+from combined_analyzer import CombinedAnalyzer
+from frame_sources import create_frame_source
+from keyframe_batcher import KeyframeBatcher
+from metrics import metrics, TimingStats
+from person_tracker import PersonTracker
+from upload_preparer import UploadPreparer
+
+
+def read_frames_with_persons(spec, count, max_reads=2000, stride=1):
+    """קורא מהמקור עד count פריימים שיש בהם לפחות אדם אחד (stride - רק כל פריים N-י מהמקור)"""
+    source = create_frame_source(spec, realtime=False)
+    if not source.open():
+        return []
+    tracker = PersonTracker()
+    frames = []
+    reads = 0
+    while len(frames) < count and reads < max_reads:
+        ret, frame = source.read()
+        reads += 1
+        if not ret:
+            break
+        if (reads - 1) % stride:
+            continue
+        if tracker.detect_persons(frame):
+            frames.append(frame.copy())
+    source.release()
+    return frames
+
+
+def count_items(visual_result, behavioral_result):
+    """מספר התיאורים והתובנות בתשובה - מדד גס לאיכות"""
+    return visual_result.description_count(), len(behavioral_result.insights)
+
+
+async def run_two_calls(frame, agent, behavioral, timeout):
+    return await asyncio.gather(agent.analyze_frame_async(frame, timeout),
+                                behavioral.analyze_behavior_async(frame, timeout))
+
+
+async def run_combined(frame, combined, timeout):
+    return (await combined.analyze_frame_async(frame, timeout)).split()
+
+
+async def benchmark_mode(mode, frames, runner, timeout):
+    """מריץ את כל הפריימים במצב אחד ומחזיר שורת סיכום"""
+    counter_prefixes = ("visual", "behavioral") if mode == "two-call" else ("combined",)
+    before = metrics.snapshot()["counters"]
+    latency = TimingStats()
+    descriptions = 0
+    insights = 0
+    failures = 0
+    for frame in frames:
+        start = time.perf_counter()
+        try:
+            visual_result, behavioral_result = await asyncio.wait_for(runner(frame), timeout + 5.0)
+        except Exception as e:
+            print(f"{mode}: request failed: {type(e).__name__}: {e}")
+            failures += 1
+            continue
+        latency.add(time.perf_counter() - start)
+        frame_descriptions, frame_insights = count_items(visual_result, behavioral_result)
+        descriptions += frame_descriptions
+        insights += frame_insights
+    after = metrics.snapshot()["counters"]
+
+    def delta(suffix):
+        return sum(after.get(f"ai.{p}.{suffix}", 0) - before.get(f"ai.{p}.{suffix}", 0) for p in counter_prefixes)
+
+    done = max(1, latency.count)
+    prompt_tokens = delta("prompt_tokens")
+    output_tokens = delta("output_tokens")
+    return {
+        "mode": mode,
+        "frames": latency.count,
+        "failures": failures,
+        "calls": delta("calls"),
+        "latency": latency.to_dict(),
+        "prompt_tokens_per_frame": prompt_tokens / done,
+        "output_tokens_per_frame": output_tokens / done,
+        "cost_per_frame_usd": estimate_cost(prompt_tokens, output_tokens) / done,
+        "descriptions_per_frame": descriptions / done,
+        "insights_per_frame": insights / done,
+    }
+
+
+async def run_benchmarks(args, frames):
+    """כל המצבים רצים באותה לולאת asyncio (הלקוח האסינכרוני של Gemini קשור ללולאה)"""
+    results = []
+    if args.mode in ("both", "two-call"):
+        agent = AIAgent()
+        behavioral = BehavioralAnalyzer()
+        results.append(await benchmark_mode("two-call", frames,
+                                            lambda frame: run_two_calls(frame, agent, behavioral, args.timeout),
+                                            args.timeout))
+    if args.mode in ("both", "combined"):
+        combined = CombinedAnalyzer()
+        results.append(await benchmark_mode("combined", frames,
+                                            lambda frame: run_combined(frame, combined, args.timeout),
+                                            args.timeout))
+    return results
+
+
+async def benchmark_behavioral(label, payloads, behavioral, timeout):
+    """ניתוח התנהגותי בלבד, קריאה אחת לכל payload (פריים בודד או KeyframeBatch)"""
+    before = metrics.snapshot()["counters"]
+    latency = TimingStats()
+    frames = 0
+    insights = 0
+    unique_insights = set()
+    failures = 0
+    for payload in payloads:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(behavioral.analyze_behavior_async(payload, timeout), timeout + 5.0)
+        except Exception as e:
+            print(f"{label}: request failed: {type(e).__name__}: {e}")
+            failures += 1
+            continue
+        latency.add(time.perf_counter() - start)
+        frames += getattr(payload, "frame_count", 1)
+        insights += len(result.insights)
+        unique_insights.update(result.insights)
+    after = metrics.snapshot()["counters"]
+
+    def delta(suffix):
+        return after.get(f"ai.behavioral.{suffix}", 0) - before.get(f"ai.behavioral.{suffix}", 0)
+
+    calls = max(1, latency.count)
+    return {
+        "mode": label,
+        "frames": frames,
+        "calls": delta("calls"),
+        "failures": failures,
+        "latency": latency.to_dict(),
+        "tokens_per_call": (delta("prompt_tokens") + delta("output_tokens")) / calls,
+        "insights_per_call": insights / calls,
+        "unique_insights": len(unique_insights),
+    }
+
+
+async def run_keyframe_comparison(args, payloads, raw_frames, preparer):
+    """אותם פריימים: קריאה התנהגותית לכל פריים מול קריאה אחת לכל קבוצה של K פריימים מפתח"""
+    behavioral = BehavioralAnalyzer()
+    sheet = args.keyframe_layout == "sheet"
+    batcher = KeyframeBatcher(args.keyframes, args.window, preparer.keyframe_long_edge(args.keyframes, sheet))
+    batches = []
+    for i, frame in enumerate(raw_frames):
+        batcher.add(frame, i * batcher.spacing)  # זמני לכידה מוערכים - פריימים במרווחים שווים לאורך החלון
+        if batcher.ready() or i == len(raw_frames) - 1:
+            batches.append(preparer.prepare_keyframes(batcher.take(), sheet))
+    return [await benchmark_behavioral("single", payloads, behavioral, args.timeout),
+            await benchmark_behavioral(f"{args.keyframes}x {args.keyframe_layout}", batches, behavioral, args.timeout)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two Gemini calls vs one combined call: latency, tokens, cost")
+    parser.add_argument("--source", default="synthetic:1", help='frame source spec, e.g. "images:samples"')
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--mode", choices=("both", "two-call", "combined"), default="both")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--long-edge", type=int, default=1024, help="upload long edge in pixels (0 = full frame)")
+    parser.add_argument("--quality", type=int, default=85, help="upload JPEG quality")
+    parser.add_argument("--keyframes", type=int, default=0,
+                        help="also compare behavioral calls: one per frame vs one per K keyframes (0 = skip)")
+    parser.add_argument("--keyframe-layout", choices=("sequence", "sheet"), default="sequence")
+    parser.add_argument("--window", type=float, default=4.0, help="seconds covered by each keyframe batch")
+    parser.add_argument("--stride", type=int, default=1, help="use every Nth source frame (spreads keyframes in time)")
+    args = parser.parse_args()
+
+    raw_frames = read_frames_with_persons(args.source, args.frames, stride=args.stride)
+    frames = raw_frames
+    if not frames:
+        print("No frames with persons found in the source.")
+        return
+    print(f"Benchmarking on {len(frames)} frame(s) from {args.source}")
+
+    # כמו במנתח: כל פריים מקודד פעם אחת, והבתים משותפים לכל הקריאות
+    preparer = UploadPreparer(args.long_edge, args.quality)
+    frames = [preparer.prepare(frame) for frame in frames]
+    upload_stats = preparer.get_stats()
+    print(f"Upload payload: {frames[0].width}x{frames[0].height} JPEG q{args.quality}, "
+          f"{upload_stats['avg_bytes'] / 1024:.1f} KB, encode {upload_stats['avg_encode_ms']:.2f} ms per frame")
+
+    results = asyncio.run(run_benchmarks(args, frames))
+
+    print(f"\n{'mode':<10} {'frames':>6} {'calls':>5} {'mean ms':>9} {'p95 ms':>9} {'in tok':>8} "
+          f"{'out tok':>8} {'$/frame':>10} {'desc':>6} {'insights':>8}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['frames']:>6} {r['calls']:>5} {r['latency']['mean_ms']:>9.0f} "
+              f"{r['latency']['p95_ms']:>9.0f} {r['prompt_tokens_per_frame']:>8.0f} "
+              f"{r['output_tokens_per_frame']:>8.0f} {r['cost_per_frame_usd']:>10.6f} "
+              f"{r['descriptions_per_frame']:>6.1f} {r['insights_per_frame']:>8.1f}")
+        if r["failures"]:
+            print(f"  {r['mode']}: {r['failures']} failed frame(s)")
+    # הקריאה הראשונה פותחת את החיבור (cold), השאר עוברות בחיבור הקיים (warm)
+    print(f"\nModel client calls (time to response):\n{metrics.format_timings('ai.client')}")
+    decode_timings = [metrics.format_timings(f"ai.{kind}.decode") for kind in ("visual", "behavioral", "combined")]
+    print("\nResponse decoding (CPU time per response):\n" + "\n".join(line for line in decode_timings if line))
+    print(f"Response quality: {decode_stats.get_stats()}")
+
+    if args.keyframes > 1:
+        comparison = asyncio.run(run_keyframe_comparison(args, frames, raw_frames, preparer))
+        print(f"\nBehavioral: one call per frame vs one call per {args.keyframes} keyframes")
+        print(f"{'mode':<14} {'frames':>6} {'calls':>5} {'mean ms':>9} {'tok/call':>9} {'insights/call':>13} {'unique':>7}")
+        for r in comparison:
+            print(f"{r['mode']:<14} {r['frames']:>6} {r['calls']:>5} {r['latency']['mean_ms']:>9.0f} "
+                  f"{r['tokens_per_call']:>9.0f} {r['insights_per_call']:>13.1f} {r['unique_insights']:>7}")
+            if r["failures"]:
+                print(f"  {r['mode']}: {r['failures']} failed call(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# השוואת הקצאות והעתקות לכל פריים: תור עם frame.copy() מול טבעת פריימים מוקצית מראש
+# הרצה: python benchmark_frame_buffer.py [--frames 300] [--width 1920] [--height 1080]
+import argparse
+import queue
+import time
+import tracemalloc
+import numpy as np
+from frame_buffer import FrameRingBuffer
+
+
+class FakeCapture:
+    """מחקה את cv2.VideoCapture.read: מקצה פריים חדש, או כותב לתוך מערך שהועבר"""
+
+    def __init__(self, width, height):
+        self.shape = (height, width, 3)
+        self.allocated_bytes = 0
+        self._value = 0
+
+    def read(self, image=None):
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, dtype=np.uint8)
+            self.allocated_bytes += image.nbytes
+        self._value = (self._value + 1) % 256
+        image[0, 0, 0] = self._value  # "פענוח" זול - הבנצ'מרק מודד את תנועת הזיכרון בלבד
+        return True, image
+
+
+def run_queue_path(num_frames, width, height, analyzer_every):
+    """המסלול הישן: cap.read() ואז frame_queue.put_nowait(frame.copy())"""
+    cap = FakeCapture(width, height)
+    frame_queue = queue.Queue(maxsize=10)
+    copy_allocated = 0
+    copied = 0
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(num_frames):
+        ret, frame = cap.read()
+        try:
+            frame_copy = frame.copy()
+            copy_allocated += frame_copy.nbytes
+            copied += frame.nbytes
+            frame_queue.put_nowait(frame_copy)
+        except queue.Full:
+            pass
+        if i % analyzer_every == 0:  # המנתח מתעורר ולוקח פריים אחד (הישן ביותר)
+            try:
+                frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "allocated_per_frame": (cap.allocated_bytes + copy_allocated) / num_frames,
+        "copied_per_frame": copied / num_frames,
+        "peak_traced_mb": peak / 1e6,
+        "ms_per_frame": elapsed * 1000 / num_frames,
+    }
+
+
+def run_ring_path(num_frames, width, height, analyzer_every, slots):
+    """המסלול החדש: לכידה ישירות לתא בטבעת, המנתח שואל את האחרון ללא העתקה"""
+    cap = FakeCapture(width, height)
+    ring = FrameRingBuffer(num_slots=slots)
+    lease = None
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(num_frames):
+        if ring.shape is None:
+            ret, frame = cap.read()
+            ring.publish(frame)
+        else:
+            slot = ring.begin_write(ring.shape, ring.dtype)
+            if slot is not None:
+                cap.read(slot.array)
+                ring.commit(slot)
+        if i % analyzer_every == 0:  # המנתח משחרר את הפריים הקודם ושואל את האחרון
+            if lease is not None:
+                lease.release()
+            lease = ring.borrow_latest(0)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if lease is not None:
+        lease.release()
+
+    stats = ring.get_stats()
+    return {
+        "allocated_per_frame": (cap.allocated_bytes + stats["allocated_bytes"]) / num_frames,
+        "copied_per_frame": stats["copied_bytes"] / num_frames,
+        "peak_traced_mb": peak / 1e6,
+        "ms_per_frame": elapsed * 1000 / num_frames,
+        "steady_state_allocations": stats["allocations"] - slots,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame queue vs. ring buffer memory traffic")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--analyzer-every", type=int, default=15, help="frames between analyzer wake-ups")
+    parser.add_argument("--slots", type=int, default=5)
+    args = parser.parse_args()
+
+    frame_mb = args.width * args.height * 3 / 1e6
+    print(f"Frames: {args.frames} at {args.width}x{args.height} ({frame_mb:.2f} MB each)")
+
+    results = {
+        "queue + copy": run_queue_path(args.frames, args.width, args.height, args.analyzer_every),
+        "ring buffer": run_ring_path(args.frames, args.width, args.height, args.analyzer_every, args.slots),
+    }
+    for name, result in results.items():
+        print(f"\n{name}:")
+        print(f"  allocated per frame: {result['allocated_per_frame'] / 1e6:8.3f} MB")
+        print(f"  copied per frame:    {result['copied_per_frame'] / 1e6:8.3f} MB")
+        print(f"  peak traced memory:  {result['peak_traced_mb']:8.1f} MB")
+        print(f"  time per frame:      {result['ms_per_frame']:8.3f} ms")
+        if "steady_state_allocations" in result:
+            print(f"  steady-state allocations: {result['steady_state_allocations']}")
+
+
+if __name__ == "__main__":
+    main()
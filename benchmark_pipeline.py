@@ -0,0 +1,58 @@
+# מדידת תפוקה של צינור הלכידה והזיהוי ללא מצלמה (מתאים לשרתי CI)
+# הרצה: python benchmark_pipeline.py [--source synthetic:2] [--frames 300] [--realtime]
+import argparse
+import time
+from camera_utils import Camera
+from frame_buffer import FrameRingBuffer
+from frame_sources import create_frame_source
+from person_tracker import PersonTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture + person detection throughput")
+    parser.add_argument("--source", default="synthetic:1", help='frame source spec, e.g. "video:clip.mp4"')
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--realtime", action="store_true", help="pace files/synthetic frames at their native FPS")
+    parser.add_argument("--threaded", action="store_true", help="use the threaded capture reader")
+    args = parser.parse_args()
+
+    frame_buffer = FrameRingBuffer()
+    source = create_frame_source(args.source, realtime=args.realtime)
+    camera = Camera(threaded=args.threaded, frame_buffer=frame_buffer, source=source)
+    if not camera.open():
+        return
+    tracker = PersonTracker()
+
+    capture_time = 0.0
+    detect_time = 0.0
+    frames = 0
+    frames_with_persons = 0
+    start = time.perf_counter()
+    while frames < args.frames:
+        t0 = time.perf_counter()
+        ret, frame = camera.read_frame()
+        t1 = time.perf_counter()
+        if not ret:
+            break
+        if tracker.detect_persons(frame):
+            frames_with_persons += 1
+        t2 = time.perf_counter()
+        capture_time += t1 - t0
+        detect_time += t2 - t1
+        frames += 1
+    elapsed = time.perf_counter() - start
+    camera.release()
+
+    if frames == 0:
+        print("No frames read.")
+        return
+    print(f"\nSource: {source}")
+    print(f"Frames: {frames} in {elapsed:.2f}s -> {frames / elapsed:.1f} fps")
+    print(f"Capture: {capture_time * 1000 / frames:.2f} ms/frame")
+    print(f"Detection: {detect_time * 1000 / frames:.2f} ms/frame")
+    print(f"Frames with persons: {frames_with_persons}/{frames}")
+    print(f"Camera stats: {camera.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
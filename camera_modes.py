@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import time
+import cv2
+
+
+class CameraMode:
+    """מצב עבודה של מצלמה: רזולוציה, קצב פריימים ופורמט (FOURCC)"""
+
+    def __init__(self, width, height, fps, fourcc):
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.fourcc = fourcc
+
+    def to_dict(self):
+        return {"width": self.width, "height": self.height, "fps": self.fps, "fourcc": self.fourcc}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["width"], data["height"], data["fps"], data["fourcc"])
+
+    def __str__(self):
+        return f"{self.width}x{self.height}@{self.fps:g} {self.fourcc}"
+
+
+class CameraTarget:
+    """יעד ביצועים, למשל "30fps@720p" = לפחות 30 פריימים בשנייה בגובה 720 לפחות"""
+
+    def __init__(self, min_fps=30.0, min_height=720):
+        self.min_fps = min_fps
+        self.min_height = min_height
+
+    @classmethod
+    def parse(cls, text):
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*(?:fps)?\s*@\s*(\d+)\s*p?\s*", text or "", re.IGNORECASE)
+        if not match:
+            raise ValueError(f"Invalid camera target {text!r}, expected e.g. '30fps@720p'")
+        return cls(float(match.group(1)), int(match.group(2)))
+
+    def __str__(self):
+        return f"{self.min_fps:g}fps@{self.min_height}p"
+
+
+class CameraModeNegotiator:
+    """בוחר מצב מצלמה לפי מדידה בפועל של קצב הפריימים ועלות הפענוח, ושומר את הבחירה לכל התקן"""
+
+    RESOLUTIONS = [(1920, 1080), (1280, 720), (640, 480)]
+    FRAME_RATES = [60, 30]
+    FOURCCS = ["MJPG", "YUYV"]
+    WARMUP_FRAMES = 5  # פריימים ראשונים אחרי החלפת מצב איטיים ולא מייצגים
+    FPS_TOLERANCE = 0.9  # מצב נחשב עומד ביעד אם הגיע ל-90% מהקצב הנדרש
+
+    def __init__(self, target, cache_path='data/camera_modes.json', probe_frames=30, force_probe=False):
+        self.target = target
+        self.cache_path = cache_path
+        self.probe_frames = probe_frames
+        self.force_probe = force_probe
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=4, ensure_ascii=False)
+        except Exception as e:
+            print(f"Error saving camera mode cache: {e}")
+
+    def _cache_key(self, device_index):
+        return f"device:{device_index}|target:{self.target}"
+
+    def candidate_modes(self):
+        """כל הצירופים של רזולוציה, קצב ופורמט - מהאיכותי ביותר לפשוט ביותר"""
+        return [CameraMode(w, h, fps, fourcc)
+                for (w, h) in self.RESOLUTIONS
+                for fps in self.FRAME_RATES
+                for fourcc in self.FOURCCS]
+
+    def apply_mode(self, cap, mode):
+        """מגדיר את המצב במצלמה ומחזיר את המצב שהמצלמה באמת קיבלה"""
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode.fourcc))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode.height)
+        cap.set(cv2.CAP_PROP_FPS, mode.fps)
+        fourcc_code = int(cap.get(cv2.CAP_PROP_FOURCC))
+        actual_fourcc = "".join(chr((fourcc_code >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00") or mode.fourcc
+        return CameraMode(cap.get(cv2.CAP_PROP_FRAME_WIDTH), cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+                          cap.get(cv2.CAP_PROP_FPS), actual_fourcc)
+
+    def probe(self, cap, mode):
+        """מודד קצב פריימים אמיתי ועלות פענוח (retrieve) עבור מצב נתון"""
+        actual = self.apply_mode(cap, mode)
+        if (actual.width, actual.height) != (mode.width, mode.height) or actual.fourcc != mode.fourcc:
+            return None  # המצלמה לא תומכת במצב הזה
+
+        for _ in range(self.WARMUP_FRAMES):
+            cap.read()
+
+        decode_time = 0.0
+        frames = 0
+        start = time.perf_counter()
+        for _ in range(self.probe_frames):
+            if not cap.grab():  # המתנה לפריים מהדרייבר
+                break
+            t0 = time.perf_counter()
+            ret, _ = cap.retrieve()  # פענוח הפריים
+            decode_time += time.perf_counter() - t0
+            if ret:
+                frames += 1
+        elapsed = time.perf_counter() - start
+        if frames == 0 or elapsed <= 0:
+            return None
+
+        return {
+            "mode": actual,
+            "measured_fps": frames / elapsed,
+            "decode_ms": decode_time * 1000 / frames,
+        }
+
+    def _meets_target(self, result):
+        return (result["mode"].height >= self.target.min_height and
+                result["measured_fps"] >= self.target.min_fps * self.FPS_TOLERANCE)
+
+    def choose(self, results):
+        """מבין המצבים שעומדים ביעד - הרזולוציה הנמוכה ביותר שעומדת ביעד עם הפענוח הזול ביותר.
+        אם אף מצב לא עומד ביעד - המצב עם תפוקת הפיקסלים הגבוהה ביותר"""
+        if not results:
+            return None
+        meeting = [r for r in results if self._meets_target(r)]
+        if meeting:
+            return min(meeting, key=lambda r: (r["mode"].width * r["mode"].height, r["decode_ms"]))
+        return max(results, key=lambda r: r["measured_fps"] * r["mode"].width * r["mode"].height)
+
+    def negotiate(self, cap, device_index):
+        """מחיל את המצב השמור להתקן, או סורק את כל המצבים ושומר את הטוב ביותר"""
+        cache = self._load_cache()
+        key = self._cache_key(device_index)
+
+        if not self.force_probe and key in cache:
+            cached_mode = CameraMode.from_dict(cache[key]["mode"])
+            actual = self.apply_mode(cap, cached_mode)
+            if (actual.width, actual.height, actual.fourcc) == (cached_mode.width, cached_mode.height, cached_mode.fourcc):
+                print(f"Camera {device_index}: using cached mode {cached_mode} "
+                      f"(measured {cache[key]['measured_fps']:.1f} fps, decode {cache[key]['decode_ms']:.1f} ms)")
+                return cached_mode
+            print(f"Camera {device_index}: cached mode {cached_mode} rejected by driver, probing again")
+
+        print(f"Camera {device_index}: probing modes for target {self.target}...")
+        results = []
+        for mode in self.candidate_modes():
+            result = self.probe(cap, mode)
+            if result is None:
+                print(f"  {mode}: not supported")
+                continue
+            print(f"  {result['mode']}: {result['measured_fps']:.1f} fps, decode {result['decode_ms']:.2f} ms")
+            results.append(result)
+
+        best = self.choose(results)
+        if best is None:
+            print(f"Camera {device_index}: no mode could be probed, keeping driver default")
+            return None
+
+        self.apply_mode(cap, best["mode"])
+        met = "meets" if self._meets_target(best) else "does NOT meet"
+        print(f"Camera {device_index}: selected {best['mode']} ({best['measured_fps']:.1f} fps, "
+              f"decode {best['decode_ms']:.2f} ms) - {met} target {self.target}")
+
+        cache[key] = {
+            "mode": best["mode"].to_dict(),
+            "measured_fps": best["measured_fps"],
+            "decode_ms": best["decode_ms"],
+            "probed_at": time.time(),
+        }
+        self._save_cache(cache)
+        return best["mode"]
@@ -1,26 +1,212 @@
-import cv2 # ייבוא ספריית OpenCV לטיפול במצלמה
+import threading # ייבוא threading עבור קורא הפריימים ברקע
+import time # ייבוא time למדידת זמנים
+from frame_sources import LiveDeviceSource # מקור ברירת המחדל - מצלמה חיה
+
+
+class LatestFrameMailbox:
+    """תיבת דואר בעלת מקום אחד - שומרת רק את הפריים האחרון, פריימים ישנים נזרקים"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0  # מספר סידורי של הפריים האחרון (0 = עדיין אין פריים)
+        self._taken = True  # האם מישהו כבר קרא את הפריים שבתיבה
+
+        # מונים לניטור
+        self.captured = 0  # פריימים שנכנסו לתיבה
+        self.dropped = 0  # פריימים שנדרסו לפני שמישהו קרא אותם
+        self.consumed = 0  # קריאות שהחזירו פריים חדש לצרכן
+
+    def put(self, frame):
+        """מכניס פריים חדש ודורס את הקודם"""
+        with self._condition:
+            if not self._taken:
+                self.dropped += 1
+            self._frame = frame
+            self._seq += 1
+            self._taken = False
+            self.captured += 1
+            self._condition.notify_all()
+
+    def get(self, last_seq=0, timeout=None):
+        """מחזיר (seq, frame) של הפריים האחרון.
+        אם timeout אינו None - ממתין עד timeout שניות לפריים חדש מ-last_seq"""
+        with self._condition:
+            if timeout is not None and self._seq <= last_seq:
+                self._condition.wait_for(lambda: self._seq > last_seq, timeout)
+            if self._seq > last_seq:
+                self._taken = True
+                self.consumed += 1
+            return self._seq, self._frame
+
+    def get_stats(self):
+        """מחזיר את מוני התיבה"""
+        with self._condition:
+            return {
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "consumed": self.consumed,
+                "latest_seq": self._seq,
+            }
+
 
 class Camera: # הגדרת מחלקה לטיפול במצלמה
-    def __init__(self, camera_index=0): # פונקציית אתחול למחלקה
+    FIRST_FRAME_TIMEOUT = 5.0 # זמן המתנה מקסימלי לפריים הראשון במצב threaded
+    MAX_CONSECUTIVE_FAILURES = 50 # מספר כשלונות קריאה רצופים לפני שהקורא מוותר
+
+    def __init__(self, camera_index=0, threaded=False, frame_buffer=None, source=None): # פונקציית אתחול למחלקה
         self.camera_index = camera_index # שמירת אינדקס המצלמה (ברירת מחדל: 0)
-        self.cap = None # אתחול משתנה ללכידת וידאו כ-None
+        self.source = source if source is not None else LiveDeviceSource(camera_index) # מקור הפריימים
+        self.cap = None # המקור הפתוח (None כל עוד לא נפתח)
+        self.threaded = threaded # האם לקרוא פריימים ב-thread נפרד
+        self.mailbox = LatestFrameMailbox() # תיבה לפריים האחרון (במצב threaded ללא טבעת)
+        self.frame_buffer = frame_buffer # טבעת פריימים - אם קיימת, הלכידה נכתבת ישירות לתוכה
+        self._lease = None # ההשאלה שמחזיק הצרכן הראשי (התצוגה) מהטבעת
+        self.last_frame_is_new = False # האם הפריים האחרון שהוחזר הוא חדש
+        self._last_seq = 0 # המספר הסידורי של הפריים האחרון שהוחזר
+        self._reader_thread = None
+        self._reader_running = False
+        self._reader_failed = False
+        self.read_failures = 0 # מונה כשלונות קריאה מהדרייבר
 
     def open(self): # פונקציה לפתיחת המצלמה
-        self.cap = cv2.VideoCapture(self.camera_index) # אתחול לכידת וידאו מהמצלמה
-        if not self.cap.isOpened(): # בדיקה אם המצלמה נפתחה
-            print(f"Error: Could not open camera {self.camera_index}.") # הדפסת הודעת שגיאה
+        if not self.source.open(): # פתיחת מקור הפריימים
+            print(f"Error: Could not open {self.source}.") # הדפסת הודעת שגיאה
+            self.source.release()
             return False # החזרת שקר אם נכשלה הפתיחה
+        self.cap = self.source
+        print(f"Frame source opened: {self.source}")
+        if self.threaded: # הפעלת קורא הרקע
+            self._start_reader()
         return True # החזרת אמת אם נפתחה בהצלחה
 
+    def _start_reader(self):
+        """מפעיל thread שקורא פריימים ברציפות לתוך התיבה"""
+        self._reader_running = True
+        self._reader_failed = False
+        self._reader_thread = threading.Thread(target=self._reader_loop, name="CameraReader", daemon=True)
+        self._reader_thread.start()
+        print(f"{self.source}: threaded capture started")
+
+    def _reader_loop(self):
+        """לולאת הקורא - תמיד מחזיקה בתיבה את הפריים הטרי ביותר"""
+        consecutive_failures = 0
+        while self._reader_running:
+            if self.frame_buffer is not None:
+                ret, frame = self._capture_into_buffer()
+                if ret and frame is None: # הפריים נזרק כי אין תא פנוי - זה לא כשלון
+                    consecutive_failures = 0
+                    continue
+            else:
+                ret, frame = self.cap.read()
+            if not ret or frame is None:
+                self.read_failures += 1
+                consecutive_failures += 1
+                if consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES:
+                    print("Error: Camera reader giving up after repeated read failures.")
+                    self._reader_failed = True
+                    break
+                time.sleep(0.01)
+                continue
+            consecutive_failures = 0
+            if self.frame_buffer is None:
+                self.mailbox.put(frame)
+
+    def _capture_into_buffer(self):
+        """לוכד פריים ישירות לתוך תא פנוי בטבעת - ללא הקצאה וללא העתקה"""
+        if self.frame_buffer.shape is None: # פריים ראשון - עדיין לא ידוע הגודל
+            ret, frame = self.cap.read()
+            if ret and frame is not None:
+                self.frame_buffer.publish(frame)
+            return ret, frame
+        slot = self.frame_buffer.begin_write(self.frame_buffer.shape, self.frame_buffer.dtype)
+        if slot is None: # כל התאים מושאלים - מרוקנים את הדרייבר בלי לפענח
+            return self.cap.grab(), None
+        ret, frame = self.cap.read(slot.array)
+        if not ret or frame is None:
+            self.frame_buffer.abort(slot)
+            return False, None
+        if frame is not slot.array: # הרזולוציה השתנתה - OpenCV הקצה מערך חדש
+            self.frame_buffer.abort(slot)
+            self.frame_buffer.publish(frame)
+            return ret, frame
+        self.frame_buffer.commit(slot)
+        return ret, frame
+
     def read_frame(self): # פונקציה לקריאת פריים מהמצלמה
         if self.cap is None: # בדיקה אם המצלמה פתוחה
             return False, None # החזרת שקר ו-None אם לא פתוחה
+        if self.frame_buffer is not None:
+            return self._read_from_buffer()
+        if self.threaded:
+            return self._read_latest_frame()
         ret, frame = self.cap.read() # קריאת פריים
         if not ret: # בדיקה אם קריאת הפריים הצליחה
             print("Error: Could not read frame.") # הדפסת הודעת שגיאה
+        self.last_frame_is_new = ret
         return ret, frame # החזרת הצלחה והפריים
 
+    def _read_latest_frame(self):
+        """מחזיר מיד את הפריים האחרון מהתיבה (ממתין רק לפריים הראשון)"""
+        if self._reader_failed:
+            print("Error: Could not read frame.")
+            return False, None
+        timeout = self.FIRST_FRAME_TIMEOUT if self._last_seq == 0 else None
+        seq, frame = self.mailbox.get(self._last_seq, timeout=timeout)
+        if frame is None:
+            print("Error: Could not read frame.")
+            return False, None
+        self.last_frame_is_new = seq > self._last_seq
+        self._last_seq = seq
+        return True, frame
+
+    def _read_from_buffer(self):
+        """מחזיר את הפריים האחרון מהטבעת כהשאלה שמוחזקת עד הקריאה הבאה"""
+        if not self.threaded: # לכידה סינכרונית ישירות לטבעת
+            ret, _ = self._capture_into_buffer()
+            if not ret:
+                print("Error: Could not read frame.")
+                return False, None
+        elif self._reader_failed:
+            print("Error: Could not read frame.")
+            return False, None
+
+        timeout = self.FIRST_FRAME_TIMEOUT if self._last_seq == 0 else None
+        lease = self.frame_buffer.borrow_latest(0, timeout=timeout)
+        if lease is None:
+            print("Error: Could not read frame.")
+            return False, None
+        if self._lease is not None: # שחרור הפריים הקודם רק אחרי שיש חדש
+            self._lease.release()
+        self._lease = lease
+        self.last_frame_is_new = lease.seq > self._last_seq
+        self._last_seq = lease.seq
+        return True, lease.frame
+
+    def get_stats(self):
+        """מחזיר מונים של הלכידה: פריימים שנלכדו, נזרקו ונצרכו"""
+        if self.frame_buffer is not None:
+            buffer_stats = self.frame_buffer.get_stats()
+            stats = {
+                "captured": buffer_stats["published"],
+                "dropped": buffer_stats["dropped"],
+                "consumed": buffer_stats["borrowed"],
+                "latest_seq": buffer_stats["published"],
+            }
+        else:
+            stats = self.mailbox.get_stats()
+        stats["read_failures"] = self.read_failures
+        stats["behind"] = stats["latest_seq"] - self._last_seq # כמה פריימים הצרכן הראשי מאחור
+        return stats
+
     def release(self): # פונקציה לשחרור משאבי המצלמה
+        if self._reader_thread is not None: # עצירת קורא הרקע
+            self._reader_running = False
+            self._reader_thread.join(timeout=1.0)
+            self._reader_thread = None
+        if self._lease is not None:
+            self._lease.release()
+            self._lease = None
         if self.cap: # בדיקה אם אובייקט הלכידה קיים
             self.cap.release() # שחרור המצלמה
-            self.cap = None # איפוס האובייקט ל-None
\ No newline at end of file
+            self.cap = None # איפוס האובייקט ל-None
@@ -176,4 +176,11 @@ class PersonCategories:
             if category_data["items"]:  # רק אם יש פריטים
                 display_data[category_name] = category_data["items"]
 
-        return display_data
\ No newline at end of file
+        return display_data
+
+    def get_known_summary(self, person_id):
+        """סיכום קומפקטי של מה שכבר ידוע על האדם, לשליחה למודל: "קטגוריה: פריט | פריט; ..." """
+        parts = []
+        for category_name, items in self.get_display_ready_data(person_id).items():
+            parts.append(f"{category_name}: {' | '.join(items)}")
+        return "; ".join(parts)
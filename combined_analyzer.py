@@ -0,0 +1,119 @@
+import time
+from PIL import Image
+import cv2
+from ai_usage import record_usage
+from model_client import get_model_client
+from upload_preparer import UploadPayload, RegionPayload
+from model_resilience import resilient_call, resilient_call_async
+from streaming_json import read_stream
+from ai_results import decode_response, empty_result
+
+
+# סכמת התשובה המשולבת - Gemini מחויב להחזיר JSON במבנה הזה בדיוק
+COMBINED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "people": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "person_index": {"type": "integer"},
+                    "descriptions": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["person_index", "descriptions"],
+            },
+        },
+        "behavioral_analysis": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["people", "behavioral_analysis"],
+}
+
+
+class CombinedAnalyzer:
+    """ניתוח חזותי והתנהגותי בקריאה אחת: תמונה אחת, פרומפט אחד קצר ותשובה בסכמת JSON קשיחה.
+    התשובה מפוענחת ל-CombinedResult, ו-CombinedResult.split מפצל אותה לתוצאות של DataSaver ו-BehavioralDataSaver."""
+
+    def __init__(self, client=None):
+        self.client = client or get_model_client()  # לקוח המודל המשותף לכל המנתחים
+        self.generation_config = {
+            "response_mime_type": "application/json",
+            "response_schema": COMBINED_RESPONSE_SCHEMA,
+        }
+
+        self.prompt = """
+        Analyze the people in this image. Ignore the background, the room, the lighting and any object that is not on a person.
+        All text values must be in Hebrew only.
+
+        "people": one entry per visible person, ordered from left to right, with "person_index" starting at 0.
+        "descriptions": short descriptions of PERMANENT visual features and STATIC objects only:
+        estimated age range, gender, estimated height, body structure, skin tone, scars or marks, facial hair,
+        hair color/length/style, eye color, glasses, each clothing item with its color, jewelry, watches,
+        and items held in the hands. Never describe temporary gestures, movements or poses.
+        Example descriptions: "בערך בגיל שבין 20 ל-30", "זכר", "שיער חום כהה, גלי, באורך בינוני עד הכתפיים", "עונד שעון חכם על יד שמאל".
+
+        "behavioral_analysis": 15 to 40 short sentences (up to 8 words each) about the people only:
+        behavior and gaze, facial movements, body and hand movements, conclusions from clothing and accessories,
+        interactions between people, and inferences about emotional, economic or social state.
+        Example sentences: "מבט מסוקרן לכיוון המצלמה", "עמידה זקופה מעידה על ביטחון עצמי", "עונד טבעת זהובה על האצבע, ככל הנראה נשוי".
+
+        If there are no people in the image, return empty "people" and "behavioral_analysis" arrays.
+        """
+
+        self.frame_count = 0  # מונה פריימים לדיבאג
+
+    def _convert_opencv_frame_to_pil(self, frame):
+        """המרת פריים מ-OpenCV ל-PIL"""
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(rgb_frame)
+
+    def _image_parts(self, frame):
+        """חלקי התמונה לבקשה: תמונה מוכנה / חיתוכי אנשים כמו שהם, או פריים OpenCV דרך PIL"""
+        if isinstance(frame, (UploadPayload, RegionPayload)):
+            return frame.to_parts()
+        return [self._convert_opencv_frame_to_pil(frame)]
+
+    def analyze_frame(self, frame, timeout=None, priority="normal"):
+        """ניתוח משולב של פריים - מחזיר CombinedResult"""
+        self.frame_count += 1
+        print(f"\n=== Combined Analysis Frame #{self.frame_count} ===")
+
+        try:
+            image_parts = self._image_parts(frame)
+            request_options = {"timeout": timeout} if timeout else None
+            response = resilient_call("combined", lambda: self.client.generate(
+                [self.prompt, *image_parts], stream=False, generation_config=self.generation_config,
+                request_options=request_options), priority, timeout)
+            response.resolve()
+            record_usage("combined", response)
+            return self._decode_response(response.text)
+        except Exception as e:
+            print(f"Error in combined analysis: {e}")
+            return empty_result("combined")
+
+    def analyze_frame_async(self, frame, timeout=None, priority="normal", on_partial=None):
+        """גרסה אסינכרונית - מכינה את התמונה מיד ומחזירה coroutine.
+        on_partial - אם ניתן, התשובה מוזרמת ו-on_partial מקבל כל מה שנסגר בה (באותו מבנה JSON)"""
+        self.frame_count += 1
+        image_parts = self._image_parts(frame)
+        return self._analyze_image_async(image_parts, timeout, priority, on_partial)
+
+    async def _analyze_image_async(self, image_parts, timeout=None, priority="normal", on_partial=None):
+        print(f"\n=== Combined Analysis Frame #{self.frame_count} (async) ===")
+        request_options = {"timeout": timeout} if timeout else None
+        stream = on_partial is not None
+        started = time.perf_counter()
+        response = await resilient_call_async("combined", lambda: self.client.generate_async(
+            [self.prompt, *image_parts], stream=stream, generation_config=self.generation_config,
+            request_options=request_options), priority, timeout)
+        text = await read_stream("combined", response, on_partial, started) if stream else response.text
+        record_usage("combined", response)
+        return self._decode_response(text)
+
+    def _decode_response(self, text):
+        """פענוח התשובה פעם אחת ל-CombinedResult"""
+        print(f"Raw combined response length: {len(text)} chars")
+        result = decode_response("combined", text)
+        print(f"Combined analysis: {len(result.visual.persons)} person(s), "
+              f"{len(result.behavioral.insights)} behavioral insights")
+        return result
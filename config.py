@@ -0,0 +1,135 @@
+# קובץ config.py - הגדרות ריצה של המראה, נקראות ממשתני סביבה (או מקובץ .env)
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_str(name, default):
+    """קריאת מחרוזת ממשתנה סביבה"""
+    value = os.getenv(name)
+    return value if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    """קריאת ערך בוליאני ממשתנה סביבה (1/true/yes/on)"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name, default):
+    """קריאת מספר שלם ממשתנה סביבה"""
+    value = os.getenv(name)
+    try:
+        return int(value) if value not in (None, "") else default
+    except ValueError:
+        print(f"Warning: invalid integer for {name}: {value!r}, using {default}")
+        return default
+
+
+def _env_float(name, default):
+    """קריאת מספר עשרוני ממשתנה סביבה"""
+    value = os.getenv(name)
+    try:
+        return float(value) if value not in (None, "") else default
+    except ValueError:
+        print(f"Warning: invalid number for {name}: {value!r}, using {default}")
+        return default
+
+
+# === מצלמה ===
+CAMERA_INDEX = _env_int("MIRROR_CAMERA_INDEX", 0)
+# מקור פריימים: ריק = מצלמה CAMERA_INDEX, או "video:file.mp4" / "images:dir" / "synthetic:2"
+FRAME_SOURCE = _env_str("MIRROR_FRAME_SOURCE", "")
+FRAME_SOURCE_REALTIME = _env_bool("MIRROR_FRAME_SOURCE_REALTIME", True)  # False = מהר ככל האפשר
+CAMERA_THREADED = _env_bool("MIRROR_CAMERA_THREADED", True)  # קריאת פריימים ב-thread נפרד
+# בחירת מצב מצלמה לפי מדידה (נשמר ב-data/camera_modes.json, ריק = ברירת המחדל של הדרייבר)
+CAMERA_TARGET = _env_str("MIRROR_CAMERA_TARGET", "30fps@720p")
+CAMERA_REPROBE = _env_bool("MIRROR_CAMERA_REPROBE", False)  # התעלמות מהמצב השמור וסריקה מחדש
+FRAME_BUFFER_SLOTS = _env_int("MIRROR_FRAME_BUFFER_SLOTS", 5)  # תאים בטבעת הפריימים המשותפת
+
+# === תצוגה ===
+RENDER_FPS = _env_float("MIRROR_RENDER_FPS", 30.0)  # קצב רינדור יעד, בלתי תלוי בקצב המצלמה (0 = ללא הגבלה)
+RENDER_STATS_INTERVAL = _env_float("MIRROR_RENDER_STATS_INTERVAL", 10.0)  # שניות בין הדפסות סטטיסטיקה (0 = כבוי)
+
+# מצב ללא מסך (headless): מסך וירטואלי ויעד "null" (זריקת פריימים) או "video:out.mp4"
+HEADLESS = _env_bool("MIRROR_HEADLESS", False)
+VIRTUAL_SCREEN_SIZE = tuple(int(v) for v in _env_str("MIRROR_VIRTUAL_SCREEN", "1920x1080").lower().split("x"))
+FRAME_SINK = _env_str("MIRROR_FRAME_SINK", "null")
+
+# ריצה מוגבלת (לבנצ'מרקים): יציאה אחרי N פריימים או N שניות, 0 = ללא הגבלה
+RUN_MAX_FRAMES = _env_int("MIRROR_RUN_MAX_FRAMES", 0)
+RUN_MAX_SECONDS = _env_float("MIRROR_RUN_MAX_SECONDS", 0.0)
+
+# === ניתוח AI ===
+# "thread" - ניתוח ב-thread של התהליך הראשי, "process" - בתהליך נפרד עם פריימים בזיכרון משותף
+ANALYZER_MODE = _env_str("MIRROR_ANALYZER_MODE", "thread")
+
+# שער תנועה לפני זיהוי אנשים וקריאות AI (ממוצע הפרש פיקסלים 0-255 בתמונה מוקטנת)
+MOTION_GATE_ENABLED = _env_bool("MIRROR_MOTION_GATE", True)
+MOTION_GATE_ENTER_THRESHOLD = _env_float("MIRROR_MOTION_GATE_ENTER", 4.0)
+MOTION_GATE_EXIT_THRESHOLD = _env_float("MIRROR_MOTION_GATE_EXIT", 2.0)
+MOTION_GATE_MAX_SKIP_SECONDS = _env_float("MIRROR_MOTION_GATE_MAX_SKIP", 15.0)  # ניתוח כפוי גם בלי שינוי
+
+# קצב ניתוח מסתגל: אדם חדש מנותח כמעט מיד, מבקרים קבועים לעתים רחוקות (שניות)
+AI_CADENCE_ADAPTIVE = _env_bool("MIRROR_AI_CADENCE_ADAPTIVE", True)  # False = המתנה קבועה אחרי כל סבב
+AI_MIN_INTERVAL = _env_float("MIRROR_AI_MIN_INTERVAL", 0.2)  # מרווח מינימלי כשיש אדם חדש
+AI_BASE_INTERVAL = _env_float("MIRROR_AI_BASE_INTERVAL", 2.0)  # מרווח התחלתי למבקרים קבועים
+AI_MAX_INTERVAL = _env_float("MIRROR_AI_MAX_INTERVAL", 30.0)  # מרווח מקסימלי כשהתיאורים יציבים
+# קריאות Gemini לדקה (0 = ללא הגבלה) - הגדרה אחת למתזמן ולמגביל הקצב. MIRROR_AI_LIMIT_RPM - שם חלופי
+AI_RPM_BUDGET = _env_int("MIRROR_AI_RPM_BUDGET", _env_int("MIRROR_AI_LIMIT_RPM", 15))
+AI_REQUEST_TIMEOUT = _env_float("MIRROR_AI_REQUEST_TIMEOUT", 20.0)  # מגבלת זמן לכל קריאת Gemini בנפרד
+AI_MAX_IN_FLIGHT = _env_int("MIRROR_AI_MAX_IN_FLIGHT", 4)  # בקשות Gemini פתוחות במקביל לכל היותר
+AI_MAX_FRAME_AGE = _env_float("MIRROR_AI_MAX_FRAME_AGE", 10.0)  # ביטול בקשה (או זריקתה מהתור) כשהפריים שלה ישן מזה (0 = ללא)
+# קריאה משולבת אחת (תיאורים חזותיים + תובנות התנהגותיות) עם סכמת JSON, במקום שתי קריאות לכל פריים
+AI_COMBINED_CALL = _env_bool("MIRROR_AI_COMBINED_CALL", False)
+# מחירי gemini-2.0-flash בדולרים למיליון טוקנים - לחישוב עלות לפריים
+AI_PRICE_INPUT_PER_MTOK = _env_float("MIRROR_AI_PRICE_INPUT_PER_MTOK", 0.10)
+AI_PRICE_OUTPUT_PER_MTOK = _env_float("MIRROR_AI_PRICE_OUTPUT_PER_MTOK", 0.40)
+# הכנת התמונה להעלאה: הקטנה לצלע ארוכה (פיקסלים, 0 = ללא) וקידוד JPEG אחד לכל המנתחים
+AI_UPLOAD_LONG_EDGE = _env_int("MIRROR_AI_UPLOAD_LONG_EDGE", 1024)
+AI_UPLOAD_JPEG_QUALITY = _env_int("MIRROR_AI_UPLOAD_JPEG_QUALITY", 85)
+# חיתוכי אנשים (ROI) לפי התיבות של PersonTracker: "off" (פריים מלא), "crops" (תמונה לכל אדם) או "mosaic"
+AI_ROI_MODE = _env_str("MIRROR_AI_ROI_MODE", "off")
+AI_ROI_PADDING = _env_float("MIRROR_AI_ROI_PADDING", 0.15)  # שוליים סביב התיבה, כחלק מגודלה
+# בחירת הפריים החד ביותר (חדות, גודל ומספר פנים) מתוך הפריימים האחרונים, במקום הפריים הנוכחי
+AI_FRAME_SELECT = _env_bool("MIRROR_AI_FRAME_SELECT", True)
+AI_FRAME_SELECT_WINDOW_SECONDS = _env_float("MIRROR_AI_FRAME_SELECT_WINDOW_SECONDS", 1.5)
+# ניתוח התנהגותי על כמה פריימים מפתח מחלון זמן קצר בבקשה אחת (1 = פריים בודד בכל סבב, כמו קודם)
+AI_BEHAVIOR_KEYFRAMES = _env_int("MIRROR_AI_BEHAVIOR_KEYFRAMES", 1)
+AI_BEHAVIOR_WINDOW_SECONDS = _env_float("MIRROR_AI_BEHAVIOR_WINDOW_SECONDS", 4.0)  # משך החלון שממנו נאספים הפריימים
+AI_BEHAVIOR_LAYOUT = _env_str("MIRROR_AI_BEHAVIOR_LAYOUT", "sequence")  # "sequence" (תמונה לכל פריים) או "sheet" (גיליון אחד)
+# מטמון תשובות AI לפי hash תפיסתי (dHash) של הפריים או של חיתוכי האנשים
+AI_CACHE_ENABLED = _env_bool("MIRROR_AI_CACHE", True)
+AI_CACHE_MAX_ENTRIES = _env_int("MIRROR_AI_CACHE_MAX_ENTRIES", 64)
+AI_CACHE_TTL_SECONDS = _env_float("MIRROR_AI_CACHE_TTL", 60.0)
+AI_CACHE_MAX_DISTANCE = _env_int("MIRROR_AI_CACHE_MAX_DISTANCE", 6)  # ביטים שונים מתוך 64
+# מגביל קצב משותף לכל הקריאות ל-Gemini (מכסת gemini-2.0-flash בחינם: 15 בקשות ומיליון טוקנים לדקה, 0 = ללא)
+# הבקשות לדקה - AI_RPM_BUDGET, אותו תקציב שהמתזמן מתכנן לפיו
+AI_LIMIT_TPM = _env_int("MIRROR_AI_LIMIT_TPM", 1_000_000)
+# עמידות לתקלות ב-Gemini: ניסיונות חוזרים עם השהיה אקספוננציאלית ומפסק שעוצר בקשות כשהשירות לא תקין
+AI_RETRY_MAX_ATTEMPTS = _env_int("MIRROR_AI_RETRY_MAX_ATTEMPTS", 3)
+AI_RETRY_BASE_DELAY = _env_float("MIRROR_AI_RETRY_BASE_DELAY", 1.0)
+AI_RETRY_MAX_DELAY = _env_float("MIRROR_AI_RETRY_MAX_DELAY", 15.0)
+AI_BREAKER_FAILURE_THRESHOLD = _env_int("MIRROR_AI_BREAKER_FAILURES", 5)
+AI_BREAKER_RESET_SECONDS = _env_float("MIRROR_AI_BREAKER_RESET_SECONDS", 30.0)
+# הזרמת תשובות Gemini: כל תיאור / תובנה מוצגים ברגע שנסגרו, בלי לחכות לתשובה המלאה
+AI_STREAMING = _env_bool("MIRROR_AI_STREAMING", False)
+# הניתוח החזותי מקבל את מה שכבר ידוע על כל אדם ומחזיר רק תוספות והחלפות (תשובות קצרות יותר)
+AI_DELTA_PROMPT = _env_bool("MIRROR_AI_DELTA_PROMPT", True)
+# שרת המודל: "gemini" - השירות האמיתי, "fake" - שרת מדומה מקומי (בלי רשת, בלי מפתח ובלי עלות)
+AI_BACKEND = _env_str("MIRROR_AI_BACKEND", "gemini")
+# פרופיל השרת המדומה: חציון ופיזור זמן התשובה, שיעור שגיאות (וכמה מהן 429), שיעור JSON שבור וגודל חתיכה בהזרמה
+FAKE_AI_LATENCY_MS = _env_float("MIRROR_FAKE_AI_LATENCY_MS", 1200.0)
+FAKE_AI_LATENCY_SIGMA = _env_float("MIRROR_FAKE_AI_LATENCY_SIGMA", 0.4)
+FAKE_AI_ERROR_RATE = _env_float("MIRROR_FAKE_AI_ERROR_RATE", 0.0)
+FAKE_AI_QUOTA_ERROR_SHARE = _env_float("MIRROR_FAKE_AI_QUOTA_ERROR_SHARE", 0.3)
+FAKE_AI_MALFORMED_RATE = _env_float("MIRROR_FAKE_AI_MALFORMED_RATE", 0.0)
+FAKE_AI_CHUNK_CHARS = _env_int("MIRROR_FAKE_AI_CHUNK_CHARS", 40)
+FAKE_AI_CONNECT_MS = _env_float("MIRROR_FAKE_AI_CONNECT_MS", 150.0)  # עלות פתיחת חיבור בשרת המדומה
+FAKE_AI_SEED = _env_int("MIRROR_FAKE_AI_SEED", 0)  # 0 = אקראי בכל הרצה
+# חיבור למודל: חימום (DNS + TLS) בהפעלה, ושמירה על החיבור אחרי כך וכך שניות בלי קריאות (0 = ללא)
+AI_PREWARM = _env_bool("MIRROR_AI_PREWARM", True)
+AI_KEEPALIVE_SECONDS = _env_float("MIRROR_AI_KEEPALIVE_SECONDS", 120.0)
@@ -39,35 +39,16 @@ class DataSaver:
         except Exception as e:
             print(f"❌ Error saving file: {e}")
 
-    def process_multi_person_analysis(self, ai_response_json_string, detected_persons):
-        """מעבד ניתוח AI עבור מספר אנשים"""
+    def process_multi_person_analysis(self, visual_result, detected_persons):
+        """מעבד ניתוח AI עבור מספר אנשים (visual_result - VisualResult מפוענח)"""
         print(f"\n=== DataSaver Multi-Person Analysis ===")
         print(f"Detected persons: {[(pid, is_new) for pid, is_new in detected_persons]}")
 
         # איפוס מונה הפריימים ללא אדם
         self.frames_without_person = 0
 
-        # ניקוי התגובה מ-Gemini
-        clean_text = self._extract_valid_json(ai_response_json_string)
-        if not clean_text:
-            print("❌ No valid JSON found in response")
-            return
-
         try:
-            # פרסור ה-JSON
-            parsed = json.loads(clean_text)
-
-            # חילוץ רשימת האנשים מהתגובה
-            ai_persons = []
-            if isinstance(parsed, dict):
-                if "session" in parsed and isinstance(parsed["session"], list):
-                    ai_persons = parsed["session"]
-                elif "person_id" in parsed and "descriptions" in parsed:
-                    # אדם בודד
-                    ai_persons = [parsed]
-            elif isinstance(parsed, list):
-                ai_persons = parsed
-
+            ai_persons = visual_result.persons
             print(f"AI returned {len(ai_persons)} person(s)")
 
             # התאם בין האנשים שה-AI זיהה לאנשים שאנחנו עוקבים אחריהם
@@ -93,8 +74,6 @@ class DataSaver:
                     # עדכן סשן קיים
                     self._update_current_session(matched_persons)
 
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON decode error: {e}")
         except Exception as e:
             print(f"❌ Error processing data: {e}")
             import traceback
@@ -104,33 +83,37 @@ class DataSaver:
         """מתאים בין אנשים שה-AI זיהה לאנשים שאנחנו עוקבים אחריהם"""
         matched = []
 
-        # אם יש אותו מספר אנשים, נתאים לפי סדר
-        if len(ai_persons) == len(detected_persons):
-            for i, ai_person in enumerate(ai_persons):
-                tracked_id = detected_persons[i][0]
-                is_new = detected_persons[i][1]
-                descriptions = ai_person.get("descriptions", [])
-
-                matched.append({
-                    "person_id": tracked_id,
-                    "descriptions": descriptions,
-                    "is_new": is_new
-                })
-            else:
-                # אם המספרים לא תואמים, ניקח את המינימום
-                print(f"Warning: AI detected {len(ai_persons)} but tracker detected {len(detected_persons)}")
-                for i in range(min(len(ai_persons), len(detected_persons))):
-                    tracked_id = detected_persons[i][0]
-                    is_new = detected_persons[i][1]
-                    descriptions = ai_persons[i].get("descriptions", [])
+        # כל אדם במעקב פעם אחת בלבד, לפי סדר הזיהוי
+        remaining = []
+        for person_id, is_new in detected_persons:
+            if person_id not in [tracked_id for tracked_id, _ in remaining]:
+                remaining.append((person_id, is_new))
+
+        # קודם לפי person_id - בחיתוכי אנשים (ROI) ה-AI מקבל את המזהים שלנו
+        unmatched_ai = []
+        for ai_person in ai_persons:
+            tracked = next((entry for entry in remaining if entry[0] == ai_person.person_id), None)
+            if tracked is None:
+                unmatched_ai.append(ai_person)
+                continue
+            remaining.remove(tracked)
+            matched.append({
+                "person_id": tracked[0],
+                "descriptions": ai_person.descriptions,
+                "is_new": tracked[1]
+            })
 
-                    matched.append({
-                        "person_id": tracked_id,
-                        "descriptions": descriptions,
-                        "is_new": is_new
-                    })
+        # השאר לפי סדר; אם המספרים לא תואמים, ניקח את המינימום
+        if unmatched_ai and len(unmatched_ai) != len(remaining):
+            print(f"Warning: AI detected {len(unmatched_ai)} unmatched but tracker has {len(remaining)} unmatched")
+        for ai_person, (tracked_id, is_new) in zip(unmatched_ai, remaining):
+            matched.append({
+                "person_id": tracked_id,
+                "descriptions": ai_person.descriptions,
+                "is_new": is_new
+            })
 
-            return matched
+        return matched
 
     def _check_need_new_session(self, detected_persons):
         """בודק אם צריך סשן חדש"""
@@ -295,25 +278,17 @@ class DataSaver:
                 print("No persons detected for extended time - finalizing session")
                 self._finalize_current_session()
 
-        # בקובץ data_saver.py
-        # הוסף את הפונקציות הבאות בסוף הקובץ (אחרי שורה 415):
-
-    def _extract_valid_json(self, text):
-        """מחלץ JSON תקין מהטקסט"""
-        text = text.strip()
-
-        if text.startswith("```json") and text.endswith("```"):
-            text = text[7:-3].strip()
-        elif text.startswith("```") and text.endswith("```"):
-            text = text[3:-3].strip()
-
-        start = text.find('{')
-        end = text.rfind('}')
-
-        if start != -1 and end != -1 and end > start:
-            return text[start:end + 1]
-
-        return None
+    def get_known_descriptions(self, person_ids):
+        """מה שכבר ידוע על כל אחד מהאנשים (person_id -> סיכום קומפקטי), רק למי שיש עליו תיאורים"""
+        known = {}
+        for person_id in person_ids:
+            categories = self.person_categories.get(person_id)
+            if categories is None:
+                continue
+            summary = categories.get_known_summary(person_id)
+            if summary:
+                known[person_id] = summary
+        return known
 
     def clear_data(self):
         """מנקה את כל הנתונים"""
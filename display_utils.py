@@ -9,6 +9,8 @@ import os
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 from bidi.algorithm import get_display
+from frame_sinks import WindowSink
+from metrics import metrics
 
 
 class DisplayManager:
@@ -43,11 +45,15 @@ class DisplayManager:
     GRID_COLS = 4
     GRID_ROWS = 4
 
-    def __init__(self, window_name='Mirror on the Wall'):
+    # גודל מסך ברירת מחדל כשאין מסך (מצב headless או כשל של screeninfo)
+    DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+    def __init__(self, window_name='Mirror on the Wall', sink=None, screen_size=None):
         self.window_name = window_name
+        self.sink = sink if sink is not None else WindowSink(window_name)  # לאן נשלחים הפריימים המורכבים
         self.screen_width = 0
         self.screen_height = 0
-        self._setup_screen_dimensions()
+        self._setup_screen_dimensions(screen_size)
         self.show_json_overlay = False
         self.last_json_data = None
         self.frame_count = 0
@@ -284,21 +290,43 @@ class DisplayManager:
                 self.behavioral_cell_last_used[cell] = current_time
             del self.behavioral_text_positions[key]
 
-    def _setup_screen_dimensions(self):
-        monitor = get_monitors()[0]
-        self.screen_width = monitor.width
-        self.screen_height = monitor.height
+    def _setup_screen_dimensions(self, screen_size=None):
+        if screen_size:  # מסך וירטואלי בגודל מוגדר
+            self.screen_width, self.screen_height = screen_size
+            return
+        try:
+            monitor = get_monitors()[0]
+            self.screen_width = monitor.width
+            self.screen_height = monitor.height
+        except Exception as e:
+            self.screen_width, self.screen_height = self.DEFAULT_SCREEN_SIZE
+            print(f"No monitor found ({e}), using virtual screen {self.screen_width}x{self.screen_height}")
 
     def setup_window(self):
-        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
-        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        self.sink.open(self.screen_width, self.screen_height)
+
+    def is_window_open(self):
+        """האם חלון התצוגה עדיין פתוח (תמיד True ביעדים ללא מסך)"""
+        return self.sink.is_open()
+
+    def poll_key(self):
+        """קריאת מקש שנלחץ (-1 אם אין, או ביעדים ללא מסך)"""
+        return self.sink.poll_key()
+
+    def toggle_fullscreen(self):
+        self.sink.toggle_fullscreen()
+
+    def close(self):
+        self.sink.close()
 
     def toggle_json_overlay(self):
         self.show_json_overlay = not self.show_json_overlay
         print(f"JSON overlay toggled: {'ON' if self.show_json_overlay else 'OFF'}")
 
-    def show_frame(self, frame, json_data_path, behavioral_data_path, active_persons=None):
-        """הצגת פריים עם נתוני JSON ונתונים התנהגותיים"""
+    def show_frame(self, frame, json_data_path, behavioral_data_path, active_persons=None, ai_usage=None,
+                   ai_status=None):
+        """הצגת פריים עם נתוני JSON ונתונים התנהגותיים
+        (ai_usage - סיכום הבקשות והעלות של ה-AI, ai_status - מצב שירות ה-AI)"""
 
         self.frame_count += 1
         # שמירת רשימת האנשים הפעילים
@@ -399,6 +427,15 @@ class DisplayManager:
             else:
                 info_lines.append(f"Persons in frame: 0")
 
+            # שימוש ב-AI: בקשות, טוקנים (נכנסים/יוצאים) ועלות משוערת
+            if ai_usage:
+                for label, key in (("AI scene", "scene"), ("AI hour", "hour")):
+                    totals = ai_usage.get(key)
+                    if totals:
+                        info_lines.append(f"{label}: {totals['requests']} req, "
+                                          f"{totals['prompt_tokens']}/{totals['output_tokens']} tok, "
+                                          f"${totals['cost_usd']:.4f}")
+
             # הצג את המידע
             y_offset = 100
             for line in info_lines:
@@ -414,7 +451,15 @@ class DisplayManager:
                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 1)
                 y_offset += 35
 
-        cv2.imshow(self.window_name, full_screen_frame)
+        # מצב מוגבל של ה-AI - חיווי שקט בפינה, הנתונים המוצגים הם האחרונים שהתקבלו
+        if ai_status and ai_status.get("state", "closed") != "closed":
+            status_text = "AI offline - last results" if ai_status["state"] == "open" else "AI reconnecting..."
+            cv2.circle(full_screen_frame, (20, self.screen_height - 24), 5, (0, 140, 255), -1)
+            cv2.putText(full_screen_frame, status_text, (32, self.screen_height - 18),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (110, 110, 110), 1)
+
+        with metrics.time("display.sink"):
+            self.sink.write(full_screen_frame)
 
     def _get_visual_data_lines(self, json_data_path):
         """קבלת נתונים חזותיים מהמאגר הראשון"""
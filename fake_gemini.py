@@ -0,0 +1,245 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from google.api_core import exceptions as google_exceptions
+
+
+# מאגרי תיאורים לתשובות מדומות - באותו סגנון שהפרומפטים מבקשים
+VISUAL_DESCRIPTIONS = {
+    "age": ["בערך בגיל שבין 20 ל-30", "בערך בגיל שבין 30 ל-40", "בערך בגיל שבין 40 ל-50", "נראה בשנות העשרה המאוחרות"],
+    "gender": ["זכר", "נקבה"],
+    "height": ["הגובה המשוער הוא 165 ס\"מ", "הגובה המשוער הוא 175 ס\"מ", "הגובה המשוער הוא 182 ס\"מ"],
+    "body": ["מבנה גוף רזה", "מבנה גוף אתלטי", "מבנה גוף מלא"],
+    "skin": ["גוון עור בהיר", "גוון עור זית", "גוון עור כהה"],
+    "hair": ["שיער חום כהה, גלי, באורך בינוני", "שיער שחור קצר", "שיער בלונד ארוך ואסוף בקוקו", "שיער אפור קצר"],
+    "facial_hair": ["זקן קצר ומטופח", "שפם דק", "זיפים קלים על הסנטר"],
+    "upper": ["חולצה כחולה עם צווארון", "סווטשירט אפור עם כובע", "טישרט לבנה", "ז'קט ג'ינס"],
+    "lower": ["מכנסי ג'ינס כהים", "מכנסיים שחורים", "חצאית ירוקה"],
+    "accessories": ["משקפיים עם מסגרת שחורה", "שעון חכם על יד שמאל", "שרשרת כסופה דקה", "עגילים קטנים", "כובע מצחייה"],
+    "held": ["טלפון נייד ביד ימין", "כוס קפה ביד שמאל", "תיק גב שחור על הכתפיים"],
+}
+
+BEHAVIORAL_INSIGHTS = [
+    "מבט מסוקרן לכיוון המצלמה", "עמידה זקופה מעידה על ביטחון עצמי", "חיוך קל בזווית הפה",
+    "ידיים שלובות על החזה, אולי חוסר נוחות", "נטייה קלה של הראש הצידה", "מבט ממוקד ורציני",
+    "כתפיים רפויות, נראה עייף", "תנועות ידיים ערניות בזמן דיבור", "מבט חטוף לעבר הטלפון",
+    "עומד קרוב לאדם השני, ככל הנראה מכרים", "לבוש מוקפד מרמז על יום עבודה", "שעון יוקרתי מרמז על מצב כלכלי טוב",
+    "מחייך למראה, נראה משועשע", "גבות מורמות בהפתעה קלה", "משעין משקל על רגל אחת בנינוחות",
+    "מסדר את השיער, מודע למראה", "עונד טבעת על האצבע, ככל הנראה נשוי", "נשימה רגועה ותנוחה פתוחה",
+]
+
+_PERSON_ID_PATTERN = re.compile(r"person_id (\d+)")
+_MOSAIC_IDS_PATTERN = re.compile(r"left to right: ([\d, ]+)\.")
+TOKENS_PER_IMAGE = 258  # כמו חיוב Gemini על תמונה
+
+
+class FakeProfile:
+    """פרופיל ההתנהגות של השרת המדומה: זמני תגובה, שיעורי שגיאות ו-JSON שבור, חלוקה לחתיכות בהזרמה
+    ועלות פתיחת חיבור (DNS + TLS) בקריאה הראשונה של כל ערוץ"""
+
+    def __init__(self, latency_ms=1200.0, latency_sigma=0.4, error_rate=0.0, quota_error_share=0.3,
+                 malformed_rate=0.0, chunk_chars=40, first_chunk_share=0.35, connect_ms=150.0, seed=0):
+        self.latency_ms = latency_ms  # חציון זמן התשובה המלאה
+        self.latency_sigma = latency_sigma  # פיזור לוג-נורמלי (0 = זמן קבוע)
+        self.error_rate = error_rate  # שיעור הבקשות שנכשלות
+        self.quota_error_share = quota_error_share  # מתוך הכישלונות - כמה הם 429 ולא 503
+        self.malformed_rate = malformed_rate  # שיעור התשובות עם JSON שבור
+        self.chunk_chars = chunk_chars  # גודל חתיכה בהזרמה
+        self.first_chunk_share = first_chunk_share  # החלק מזמן התשובה עד החתיכה הראשונה
+        self.connect_ms = connect_ms  # תוספת לקריאה הראשונה בכל ערוץ (sync / async)
+        self.connected = set()  # ערוצים שכבר נפתחו - משותף לכל המודלים עם אותו פרופיל, כמו ערוץ ה-SDK
+        self.random = random.Random(seed or None)
+
+    def connect_latency(self, transport):
+        """עלות פתיחת החיבור בשניות - רק בקריאה הראשונה בערוץ"""
+        if transport in self.connected:
+            return 0.0
+        self.connected.add(transport)
+        return self.connect_ms / 1000.0
+
+    def sample_latency(self):
+        """זמן תשובה בשניות מהתפלגות לוג-נורמלית סביב החציון"""
+        if self.latency_sigma <= 0:
+            return self.latency_ms / 1000.0
+        return self.latency_ms / 1000.0 * math.exp(self.random.gauss(0.0, self.latency_sigma))
+
+
+class _UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class _TokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeResponse:
+    """תשובה מלאה - אותו ממשק כמו GenerateContentResponse (text, resolve, usage_metadata)"""
+
+    def __init__(self, text, usage_metadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+    def resolve(self):
+        pass
+
+
+class FakeStreamResponse:
+    """תשובה בהזרמה - חתיכות טקסט בהשהיות, ו-usage_metadata בסוף כמו ב-Gemini"""
+
+    def __init__(self, chunks, delays, usage_metadata):
+        self._chunks = chunks
+        self._delays = delays
+        self._final_usage = usage_metadata
+        self.usage_metadata = None
+        self.text = None
+
+    async def __aiter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            await asyncio.sleep(delay)
+            yield _Chunk(chunk)
+        self.text = "".join(self._chunks)
+        self.usage_metadata = self._final_usage
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            time.sleep(delay)
+            yield _Chunk(chunk)
+        self.text = "".join(self._chunks)
+        self.usage_metadata = self._final_usage
+
+    def resolve(self):
+        for _ in self:
+            pass
+
+
+class FakeGenerativeModel:
+    """תחליף מקומי ל-genai.GenerativeModel: מחזיר JSON עברי מציאותי לניתוח חזותי, התנהגותי או משולב,
+    לפי הפרומפט והסכמה שבבקשה, בזמני תגובה ובשיעורי כישלון של הפרופיל. לא פונה לרשת."""
+
+    def __init__(self, model_name="gemini-2.0-flash", profile=None):
+        self.model_name = model_name
+        self.profile = profile or FakeProfile()
+
+    def count_tokens(self, contents):
+        time.sleep(self.profile.connect_latency("sync") + 0.02)
+        return _TokenCount(self._count_prompt_tokens(contents))
+
+    async def count_tokens_async(self, contents):
+        await asyncio.sleep(self.profile.connect_latency("async") + 0.02)
+        return _TokenCount(self._count_prompt_tokens(contents))
+
+    @staticmethod
+    def _count_prompt_tokens(contents):
+        contents = contents if isinstance(contents, list) else [contents]
+        texts = [part for part in contents if isinstance(part, str)]
+        return sum(len(t) for t in texts) // 4 + (len(contents) - len(texts)) * TOKENS_PER_IMAGE
+
+    def generate_content(self, contents, stream=False, generation_config=None, request_options=None):
+        text, usage, latency = self._prepare(contents, generation_config, "sync")
+        if stream:
+            chunks, delays = self._chunk(text, latency)
+            time.sleep(delays[0])  # כמו ב-SDK: הקריאה חוזרת אחרי החתיכה הראשונה
+            return FakeStreamResponse(chunks, [0.0] + delays[1:], usage)
+        time.sleep(latency)
+        return FakeResponse(text, usage)
+
+    async def generate_content_async(self, contents, stream=False, generation_config=None, request_options=None):
+        text, usage, latency = self._prepare(contents, generation_config, "async")
+        if stream:
+            chunks, delays = self._chunk(text, latency)
+            await asyncio.sleep(delays[0])
+            return FakeStreamResponse(chunks, [0.0] + delays[1:], usage)
+        await asyncio.sleep(latency)
+        return FakeResponse(text, usage)
+
+    def _prepare(self, contents, generation_config, transport):
+        """טקסט התשובה, נתוני טוקנים וזמן תגובה. שגיאה מדומה נזרקת כאן - לפני שמתחילים לענות"""
+        profile = self.profile
+        rng = profile.random
+        connect = profile.connect_latency(transport)
+        if rng.random() < profile.error_rate:
+            if rng.random() < profile.quota_error_share:
+                raise google_exceptions.ResourceExhausted("Fake backend: quota exceeded")
+            raise google_exceptions.ServiceUnavailable("Fake backend: service unavailable")
+
+        texts = [part for part in contents if isinstance(part, str)]
+        prompt = texts[0] if texts else ""
+        person_ids = self._person_ids(texts[1:])
+        known_ids = {int(person_id) for person_id in _PERSON_ID_PATTERN.findall(
+            "\n".join(text for text in texts[1:] if text.startswith("ALREADY KNOWN")))}
+
+        if generation_config and "response_schema" in generation_config:
+            document = self._combined_document(person_ids)
+        elif '"behavioral_analysis"' in prompt:
+            document = {"behavioral_analysis": self._insights()}
+        else:
+            document = self._visual_document(person_ids, known_ids)
+        text = json.dumps(document, ensure_ascii=False, indent=2)
+        if rng.random() < profile.malformed_rate:
+            text = self._malform(text)
+
+        usage = _UsageMetadata(self._count_prompt_tokens(contents), max(1, len(text) // 2))
+        return text, usage, connect + profile.sample_latency()
+
+    @staticmethod
+    def _person_ids(texts):
+        """מזהי האנשים מהנחיית החיתוכים / הפסיפס או מרשימת הידועים; אחרת אדם אחד עם מזהה אקראי"""
+        joined = "\n".join(texts)
+        ids = [int(person_id) for person_id in _PERSON_ID_PATTERN.findall(joined)]
+        for match in _MOSAIC_IDS_PATTERN.findall(joined):
+            ids.extend(int(person_id) for person_id in match.replace(" ", "").split(",") if person_id)
+        return list(dict.fromkeys(ids))
+
+    def _descriptions(self, count):
+        rng = self.profile.random
+        categories = rng.sample(list(VISUAL_DESCRIPTIONS), min(count, len(VISUAL_DESCRIPTIONS)))
+        return [rng.choice(VISUAL_DESCRIPTIONS[category]) for category in categories]
+
+    def _visual_document(self, person_ids, known_ids):
+        rng = self.profile.random
+        person_ids = person_ids or [rng.randint(1000, 9999)]
+        session = []
+        for person_id in person_ids:
+            # על מי שכבר מוכר - רק תוספות מעטות (לפעמים כלום), כמו בפרומפט הדלתא
+            count = rng.randint(0, 2) if person_id in known_ids else rng.randint(6, 10)
+            session.append({"person_id": person_id, "descriptions": self._descriptions(count)})
+        return {"session_id": f"{rng.randint(1, 999):03d}", "session": session}
+
+    def _insights(self):
+        rng = self.profile.random
+        return rng.sample(BEHAVIORAL_INSIGHTS, rng.randint(8, len(BEHAVIORAL_INSIGHTS)))
+
+    def _combined_document(self, person_ids):
+        people = [{"person_index": index, "descriptions": self._descriptions(self.profile.random.randint(6, 10))}
+                  for index in range(max(1, len(person_ids)))]
+        return {"people": people, "behavioral_analysis": self._insights()}
+
+    def _malform(self, text):
+        """JSON שבור בכמה צורות שראינו מהמודל: קטוע, עם טקסט מסביב או עם פסיק מיותר"""
+        rng = self.profile.random
+        kind = rng.choice(("truncated", "prose", "trailing_comma"))
+        if kind == "truncated":
+            return text[:rng.randint(1, max(1, len(text) - 1))]
+        if kind == "prose":
+            return f"Here is the analysis you asked for:\n{text}\nLet me know if you need more."
+        return text.replace("]", ",]", 1)
+
+    def _chunk(self, text, latency):
+        """חלוקה לחתיכות: הראשונה אחרי first_chunk_share מזמן התשובה, השאר בפיזור שווה"""
+        size = max(1, self.profile.chunk_chars)
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        first = latency * self.profile.first_chunk_share
+        rest = (latency - first) / max(1, len(chunks) - 1)
+        return chunks, [first] + [rest] * (len(chunks) - 1)
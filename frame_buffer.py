@@ -0,0 +1,165 @@
+import threading
+import time
+import numpy as np
+
+
+class FrameSlot:
+    """תא בודד בטבעת - מערך מוקצה מראש עם מונה הפניות"""
+
+    def __init__(self, index):
+        self.index = index
+        self.array = None  # המערך המוקצה מראש
+        self.seq = 0  # המספר הסידורי של הפריים שבתא (0 = ריק)
+        self.capture_time = 0.0  # זמן הלכידה של הפריים
+        self.refcount = 0  # כמה צרכנים מחזיקים כרגע את התא
+        self.writing = False  # האם הכותב ממלא כרגע את התא
+        self.was_read = False  # האם מישהו השאיל את הפריים שבתא
+
+
+class FrameLease:
+    """השאלה של תא מהטבעת - הפריים לא יידרס עד לשחרור"""
+
+    def __init__(self, ring, slot):
+        self._ring = ring
+        self._slot = slot
+        self.frame = slot.array
+        self.seq = slot.seq
+        self.capture_time = slot.capture_time
+        self._released = False
+
+    def release(self):
+        """מחזיר את התא לטבעת"""
+        if not self._released:
+            self._released = True
+            self._ring._release(self._slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class FrameRingBuffer:
+    """טבעת של מאגרי פריימים מוקצים מראש עם ספירת הפניות.
+
+    הכותב (לולאת הלכידה) ממלא תא פנוי ומפרסם אותו כפריים האחרון.
+    צרכנים (המנתח, התצוגה) שואלים את הפריים האחרון ללא העתקה,
+    ותא מושאל לעולם לא נבחר לכתיבה עד שכל השואלים משחררים אותו."""
+
+    def __init__(self, num_slots=5):
+        if num_slots < 3:
+            raise ValueError("FrameRingBuffer needs at least 3 slots (writer, newest, borrower).")
+        self._condition = threading.Condition()
+        self._slots = [FrameSlot(i) for i in range(num_slots)]
+        self._latest = None  # התא עם הפריים האחרון שפורסם
+        self._seq = 0
+        self.shape = None
+        self.dtype = None
+
+        # מונים לניטור
+        self.published = 0  # פריימים שפורסמו
+        self.dropped = 0  # פריימים שנדרסו בלי שאף צרכן השאיל אותם
+        self.borrowed = 0  # השאלות של פריים חדש
+        self.writer_blocked = 0  # פעמים שלא נמצא תא פנוי לכתיבה
+        self.allocations = 0  # הקצאות מערכים (רק באתחול או בשינוי רזולוציה)
+        self.allocated_bytes = 0
+        self.copied_bytes = 0  # בתים שהועתקו לתוך הטבעת
+
+    def _ensure_allocated(self, shape, dtype):
+        """מקצה את כל התאים מראש לפי גודל הפריים (פעם אחת בלבד)"""
+        dtype = np.dtype(dtype)
+        if self.shape == tuple(shape) and self.dtype == dtype:
+            return
+        if self.shape is not None:
+            print(f"FrameRingBuffer: frame shape changed {self.shape} -> {tuple(shape)}, reallocating")
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        for slot in self._slots:
+            # תא מושאל שומר על המערך הישן דרך ההשאלה, כך שמותר להחליף כאן
+            slot.array = self._allocate_array(slot.index, self.shape, self.dtype)
+            slot.seq = 0
+            self.allocations += 1
+            self.allocated_bytes += slot.array.nbytes
+        self._latest = None
+
+    def _allocate_array(self, index, shape, dtype):
+        """הקצאת מערך לתא - נקודת הרחבה לאחסון חלופי"""
+        return np.empty(shape, dtype=dtype)
+
+    def begin_write(self, shape, dtype=np.uint8):
+        """מחזיר תא פנוי לכתיבה ישירה (למשל cap.read לתוכו), או None אם הכל תפוס"""
+        with self._condition:
+            self._ensure_allocated(shape, dtype)
+            candidates = [slot for slot in self._slots
+                          if slot.refcount == 0 and not slot.writing and slot is not self._latest]
+            if not candidates:
+                self.writer_blocked += 1
+                return None
+            slot = min(candidates, key=lambda s: s.seq)  # התא הישן ביותר
+            if slot.seq and not slot.was_read:
+                self.dropped += 1
+            slot.writing = True
+            return slot
+
+    def commit(self, slot, capture_time=None):
+        """מפרסם את התא שנכתב כפריים האחרון"""
+        with self._condition:
+            slot.writing = False
+            self._seq += 1
+            slot.seq = self._seq
+            slot.capture_time = capture_time if capture_time is not None else time.time()
+            slot.was_read = False
+            self._latest = slot
+            self.published += 1
+            self._condition.notify_all()
+            return slot.seq
+
+    def abort(self, slot):
+        """מבטל כתיבה שנכשלה - התא חוזר להיות פנוי"""
+        with self._condition:
+            slot.writing = False
+            slot.seq = 0
+
+    def publish(self, frame, capture_time=None):
+        """מעתיק פריים חיצוני לתא פנוי (ללא הקצאה) ומפרסם אותו. מחזיר seq או None"""
+        slot = self.begin_write(frame.shape, frame.dtype)
+        if slot is None:
+            return None
+        np.copyto(slot.array, frame)
+        self.copied_bytes += frame.nbytes
+        return self.commit(slot, capture_time)
+
+    def borrow_latest(self, newer_than=0, timeout=None):
+        """משאיל את הפריים האחרון ללא העתקה.
+        מחזיר None אם אין פריים חדש מ-newer_than (אחרי המתנה של עד timeout שניות)"""
+        with self._condition:
+            if timeout is not None:
+                self._condition.wait_for(
+                    lambda: self._latest is not None and self._latest.seq > newer_than, timeout)
+            slot = self._latest
+            if slot is None or slot.seq <= newer_than:
+                return None
+            slot.refcount += 1
+            if not slot.was_read:
+                slot.was_read = True
+                self.borrowed += 1
+            return FrameLease(self, slot)
+
+    def _release(self, slot):
+        with self._condition:
+            slot.refcount -= 1
+
+    def get_stats(self):
+        """מחזיר את מוני הטבעת"""
+        with self._condition:
+            return {
+                "published": self.published,
+                "dropped": self.dropped,
+                "borrowed": self.borrowed,
+                "writer_blocked": self.writer_blocked,
+                "allocations": self.allocations,
+                "allocated_bytes": self.allocated_bytes,
+                "copied_bytes": self.copied_bytes,
+                "leased_slots": sum(1 for slot in self._slots if slot.refcount > 0),
+            }
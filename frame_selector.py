@@ -0,0 +1,116 @@
+import math
+import time
+from collections import deque
+import cv2
+from metrics import metrics
+
+
+def sharpness(frame, width=320):
+    """חדות התמונה: השונות של ה-Laplacian על תמונה מוקטנת באפור (טשטוש תנועה - ערך נמוך)"""
+    height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+    gray = cv2.cvtColor(cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class _Candidate:
+    def __init__(self, frame, capture_time, detected_persons, boxes, sharpness_value, face_size):
+        self.frame = frame  # העתק מוקטן ל-long_edge
+        self.capture_time = capture_time
+        self.detected_persons = detected_persons
+        self.person_ids = frozenset(person_id for person_id, _ in detected_persons)
+        self.boxes = boxes  # [(person_id, (x, y, w, h))] לכל זיהוי, בקואורדינטות של frame
+        self.sharpness = sharpness_value
+        self.face_size = face_size  # שורש שטח התיבה הגדולה ביותר מתוך שטח הפריים (0-1)
+        self.score = 0.0
+
+    @property
+    def face_count(self):
+        return len(self.detected_persons)
+
+
+class FrameSelector:
+    """בוחר את הפריים הטוב ביותר לשליחה ל-AI מתוך הפריימים האחרונים (window_seconds).
+
+    כל פריים עם אנשים מקבל ציון: חדות (Laplacian), גודל הפנים הגדולות ביותר ומספר הפנים שזוהו
+    (מצמוץ או סיבוב ראש מפילים פנים מהזיהוי). נבחר רק פריים שיש בו לפחות כל האנשים שבפריים
+    הנוכחי ולפחות אותו מספר פנים, כך שהתוצאה עדיין שייכת לאנשים שהמתזמן והשומרים מכירים.
+    הפריימים נשמרים מוקטנים ל-long_edge - ממילא כך הם מוקטנים לפני ההעלאה."""
+
+    SHARPNESS_WEIGHT = 0.5
+    FACE_SIZE_WEIGHT = 0.3
+    FACE_COUNT_WEIGHT = 0.2
+
+    def __init__(self, window_seconds=1.5, long_edge=1024, sharpness_reference=100.0, max_candidates=8):
+        self.window_seconds = window_seconds
+        self.long_edge = long_edge  # 0 = ללא הקטנה
+        self.sharpness_reference = sharpness_reference  # שונות Laplacian שנחשבת "חדה למחצה"
+        self._candidates = deque(maxlen=max_candidates)
+
+        # מונים
+        self.selections = 0
+        self.replaced = 0  # נבחר פריים קודם במקום הנוכחי
+        self.sharpness_gain = 0.0  # סכום החדות הנוספת לעומת הפריים הנוכחי
+
+    def _shrink(self, frame):
+        """העתק מוקטן ל-long_edge, והיחס שבו הוקטן"""
+        height, width = frame.shape[:2]
+        if not self.long_edge or max(width, height) <= self.long_edge:
+            return frame.copy(), 1.0
+        scale = self.long_edge / max(width, height)
+        # עד פי 2 - ליניארי כמעט זהה ל-INTER_AREA ומהיר ממנו בהרבה (זה רץ על כל פריים עם אנשים)
+        interpolation = cv2.INTER_LINEAR if scale >= 0.5 else cv2.INTER_AREA
+        image = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=interpolation)
+        return image, scale
+
+    def add(self, frame, capture_time, detected_persons, boxes):
+        """מוסיף פריים עם אנשים לחלון (העתק מוקטן - ההשאלה מהמאגר משתחררת אחר כך).
+        boxes - [(person_id, (x, y, w, h))] בקואורדינטות של frame"""
+        started = time.perf_counter()
+        image, scale = self._shrink(frame)
+        boxes = [(person_id, tuple(round(v * scale) for v in bbox)) for person_id, bbox in boxes]
+        frame_area = image.shape[0] * image.shape[1]
+        largest = max((bbox[2] * bbox[3] for _, bbox in boxes), default=0)
+        candidate = _Candidate(image, capture_time, list(detected_persons), boxes,
+                               sharpness(image), math.sqrt(min(1.0, largest / frame_area)))
+        self._candidates.append(candidate)
+        while self._candidates and capture_time - self._candidates[0].capture_time > self.window_seconds:
+            self._candidates.popleft()
+        metrics.observe("ai.select.add", time.perf_counter() - started)
+        return candidate
+
+    def _score(self, candidate, max_faces):
+        sharp = candidate.sharpness / (candidate.sharpness + self.sharpness_reference)
+        return (self.SHARPNESS_WEIGHT * sharp + self.FACE_SIZE_WEIGHT * candidate.face_size
+                + self.FACE_COUNT_WEIGHT * candidate.face_count / max(1, max_faces))
+
+    def select(self, current):
+        """הפריים הטוב ביותר בחלון שיש בו כל האנשים של current (המועמד של הפריים הנוכחי) ולפחות כמותם"""
+        candidates = [c for c in self._candidates
+                      if c.person_ids >= current.person_ids and c.face_count >= current.face_count] or [current]
+        max_faces = max(c.face_count for c in candidates)
+        for candidate in candidates:
+            candidate.score = self._score(candidate, max_faces)
+        best = max(candidates, key=lambda c: (c.score, c.capture_time))
+        self.selections += 1
+        if best is not current:
+            self.replaced += 1
+            metrics.inc("ai.select.replaced")
+        self.sharpness_gain += best.sharpness - current.sharpness
+        metrics.set_gauge("ai.select.sharpness", best.sharpness)
+        # הפריים שנבחר נשלח - פריים ישן ממנו לא ייבחר שוב בסבב הבא
+        while self._candidates and self._candidates[0].capture_time <= best.capture_time:
+            self._candidates.popleft()
+        return best
+
+    def reset(self):
+        self._candidates.clear()
+
+    def get_stats(self):
+        return {
+            "window_s": self.window_seconds,
+            "candidates": len(self._candidates),
+            "selections": self.selections,
+            "replaced_current": self.replaced,
+            "avg_sharpness_gain": self.sharpness_gain / self.selections if self.selections else 0.0,
+        }
@@ -0,0 +1,106 @@
+import os
+import cv2
+
+
+class WindowSink:
+    """יעד התצוגה הרגיל - חלון OpenCV במסך מלא"""
+
+    name = "window"
+
+    def __init__(self, window_name):
+        self.window_name = window_name
+        self.fullscreen = True
+        self.frames_written = 0
+
+    def open(self, width, height):
+        cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+    def write(self, frame):
+        cv2.imshow(self.window_name, frame)
+        self.frames_written += 1
+
+    def is_open(self):
+        return cv2.getWindowProperty(self.window_name, cv2.WND_PROP_VISIBLE) >= 1
+
+    def poll_key(self):
+        return cv2.waitKey(1)
+
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        mode = cv2.WINDOW_FULLSCREEN if self.fullscreen else cv2.WINDOW_NORMAL
+        cv2.setWindowProperty(self.window_name, cv2.WND_PROP_FULLSCREEN, mode)
+        print(f"Fullscreen: {'ON' if self.fullscreen else 'OFF'}")
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class NullSink:
+    """יעד ריק - זורק את הפריימים המורכבים, למדידת תפוקה טהורה ללא מסך"""
+
+    name = "null"
+
+    def __init__(self):
+        self.frames_written = 0
+
+    def open(self, width, height):
+        pass
+
+    def write(self, frame):
+        self.frames_written += 1
+
+    def is_open(self):
+        return True
+
+    def poll_key(self):
+        return -1
+
+    def toggle_fullscreen(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class VideoFileSink(NullSink):
+    """יעד קובץ וידאו - כותב את הפריימים המורכבים לקובץ (ללא מסך)"""
+
+    name = "video"
+
+    def __init__(self, path, fps=30.0, fourcc="mp4v"):
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.writer = None
+
+    def open(self, width, height):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {self.path}")
+        print(f"Writing composed frames to {self.path} ({width}x{height} @ {self.fps:g} fps)")
+
+    def write(self, frame):
+        self.writer.write(frame)
+        self.frames_written += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            print(f"Video file closed: {self.path} ({self.frames_written} frames)")
+
+
+def create_frame_sink(spec, window_name, fps=30.0):
+    """יוצר יעד פריימים: "window" (ברירת מחדל), "null", או "video:out.mp4" """
+    spec = (spec or "window").strip()
+    kind, _, argument = spec.partition(":")
+    if kind == "window":
+        return WindowSink(window_name)
+    if kind == "null":
+        return NullSink()
+    if kind == "video":
+        return VideoFileSink(argument or "output/mirror.mp4", fps=fps)
+    raise ValueError(f"Unknown frame sink: {spec!r}")
@@ -0,0 +1,293 @@
+import math
+import os
+import time
+import cv2
+import numpy as np
+
+
+class FrameSource:
+    """ממשק בסיס למקור פריימים - מחקה את cv2.VideoCapture כך ש-Camera לא צריכה לדעת מה מאחוריו"""
+
+    name = "source"
+
+    def open(self):
+        """פותח את המקור. מחזיר True בהצלחה"""
+        raise NotImplementedError
+
+    def is_opened(self):
+        raise NotImplementedError
+
+    def read(self, image=None):
+        """מחזיר (ret, frame). אם הועבר image בגודל המתאים - הפריים נכתב לתוכו"""
+        raise NotImplementedError
+
+    def grab(self):
+        """מדלג על פריים אחד בלי להחזיר אותו"""
+        ret, _ = self.read()
+        return ret
+
+    def release(self):
+        pass
+
+    def _copy_into(self, frame, image):
+        """כותב את הפריים לתוך image אם הגודל מתאים (ללא הקצאה), אחרת מחזיר את הפריים עצמו"""
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return image
+        return frame
+
+
+class FramePacer:
+    """שומר על קצב פריימים של זמן אמת, או מוותר על ההמתנה במצב 'מהר ככל האפשר'"""
+
+    def __init__(self, fps, realtime=True):
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.realtime = realtime
+        self._next_time = None
+
+    def wait(self):
+        if not self.realtime or self.frame_interval <= 0:
+            return
+        now = time.perf_counter()
+        if self._next_time is None or now - self._next_time > self.frame_interval:
+            # התחלה, או שהצרכן פיגר ביותר מפריים - לא מנסים להשלים פער
+            self._next_time = now
+        elif self._next_time > now:
+            time.sleep(self._next_time - now)
+        self._next_time += self.frame_interval
+
+
+class LiveDeviceSource(FrameSource):
+    """מצלמה חיה לפי אינדקס התקן"""
+
+    name = "device"
+
+    def __init__(self, device_index=0, negotiator=None):
+        self.device_index = device_index
+        self.negotiator = negotiator  # CameraModeNegotiator - בחירת רזולוציה/FPS/FOURCC לפי מדידה
+        self.mode = None  # המצב שנבחר (None = ברירת המחדל של הדרייבר)
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.device_index)
+        if not self.cap.isOpened():
+            return False
+        if self.negotiator is not None:
+            self.mode = self.negotiator.negotiate(self.cap, self.device_index)
+        return True
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image=None):
+        if image is not None:
+            return self.cap.read(image)
+        return self.cap.read()
+
+    def grab(self):
+        return self.cap.grab()
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+    def __str__(self):
+        return f"camera {self.device_index}"
+
+
+class VideoFileSource(FrameSource):
+    """קובץ וידאו - בקצב זמן אמת (לפי ה-FPS של הקובץ) או מהר ככל האפשר"""
+
+    name = "video"
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.cap = None
+        self.pacer = None
+
+    def open(self):
+        if not os.path.exists(self.path):
+            print(f"Error: video file not found: {self.path}")
+            return False
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pacer = FramePacer(fps, self.realtime)
+        print(f"Video source {self.path}: {fps:.1f} fps, {'real-time' if self.realtime else 'as fast as possible'}")
+        return True
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self, image=None):
+        self.pacer.wait()
+        ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        if not ret and self.loop:  # חזרה לתחילת הקובץ
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        return ret, frame
+
+    def release(self):
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+    def __str__(self):
+        return f"video file {self.path}"
+
+
+class ImageDirectorySource(FrameSource):
+    """תיקיית תמונות - כל תמונה היא פריים, לפי סדר שמות הקבצים"""
+
+    name = "images"
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, directory, fps=30.0, realtime=True, loop=True):
+        self.directory = directory
+        self.loop = loop
+        self.pacer = FramePacer(fps, realtime)
+        self.files = []
+        self.position = 0
+        self._opened = False
+
+    def open(self):
+        if not os.path.isdir(self.directory):
+            print(f"Error: image directory not found: {self.directory}")
+            return False
+        self.files = sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.lower().endswith(self.IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+        self._opened = len(self.files) > 0
+        if not self._opened:
+            print(f"Error: no images in {self.directory}")
+        return self._opened
+
+    def is_opened(self):
+        return self._opened
+
+    def read(self, image=None):
+        if self.position >= len(self.files):
+            if not self.loop:
+                return False, None
+            self.position = 0
+        self.pacer.wait()
+        frame = cv2.imread(self.files[self.position])
+        self.position += 1
+        if frame is None:
+            print(f"Error: could not read image {self.files[self.position - 1]}")
+            return False, None
+        return True, self._copy_into(frame, image)
+
+    def release(self):
+        self._opened = False
+
+    def __str__(self):
+        return f"image directory {self.directory}"
+
+
+class SyntheticFaceSource(FrameSource):
+    """מחולל פריימים סינתטי שמצייר פנים נעות (מזוהות ע"י גלאי Haar) - למדידות ללא מצלמה"""
+
+    name = "synthetic"
+    BACKGROUND_COLOR = (90, 100, 110)
+
+    def __init__(self, width=1280, height=720, fps=30.0, num_faces=1, realtime=True, seed=0):
+        self.width = width
+        self.height = height
+        self.num_faces = num_faces
+        self.pacer = FramePacer(fps, realtime)
+        self.frame_interval = 1.0 / fps if fps > 0 else 1.0 / 30.0
+        self.frame_index = 0
+        self.random = np.random.default_rng(seed)
+        self.faces = []
+        self.background = None
+        self._opened = False
+
+    def open(self):
+        # רקע קבוע עם רעש קל כדי שהפריים לא יהיה אחיד לגמרי
+        noise = self.random.integers(-8, 9, size=(self.height, self.width, 1), dtype=np.int16)
+        background = np.array(self.BACKGROUND_COLOR, dtype=np.int16) + noise
+        self.background = np.clip(background, 0, 255).astype(np.uint8)
+        # לכל פנים: מסלול ליסז'ו משלו (מרכז, משרעת, תדר ופאזה) וגודל
+        self.faces = []
+        for i in range(self.num_faces):
+            self.faces.append({
+                "center": ((i + 1) * self.width / (self.num_faces + 1), self.height * 0.5),
+                "amplitude": (self.width * 0.08, self.height * 0.08),
+                "frequency": (self.random.uniform(0.1, 0.3), self.random.uniform(0.1, 0.3)),
+                "phase": self.random.uniform(0, 2 * math.pi),
+                "size": int(min(self.width / (self.num_faces + 1), self.height) * 0.35),
+            })
+        self.frame_index = 0
+        self._opened = True
+        return True
+
+    def is_opened(self):
+        return self._opened
+
+    def read(self, image=None):
+        self.pacer.wait()
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+
+        t = self.frame_index * self.frame_interval  # זמן סינתטי - דטרמיניסטי גם במצב מהיר
+        for face in self.faces:
+            cx = int(face["center"][0] + face["amplitude"][0] * math.sin(2 * math.pi * face["frequency"][0] * t + face["phase"]))
+            cy = int(face["center"][1] + face["amplitude"][1] * math.sin(2 * math.pi * face["frequency"][1] * t))
+            self._draw_face(image, cx, cy, face["size"])
+
+        self.frame_index += 1
+        return True, image
+
+    def _draw_face(self, image, cx, cy, size):
+        """ציור פנים פשוטות: אליפסת עור, שיער, גבות, עיניים, אף ופה"""
+        def scaled(value):
+            return int(size * value)
+
+        cv2.ellipse(image, (cx, cy), (scaled(0.42), scaled(0.55)), 0, 0, 360, (150, 175, 210), -1, cv2.LINE_AA)
+        cv2.ellipse(image, (cx, cy - scaled(0.38)), (scaled(0.44), scaled(0.22)), 0, 180, 360, (40, 40, 60), -1, cv2.LINE_AA)
+        for side in (-1, 1):
+            eye_x = cx + side * scaled(0.17)
+            cv2.line(image, (cx + side * scaled(0.08), cy - scaled(0.17)), (cx + side * scaled(0.26), cy - scaled(0.17)),
+                     (40, 40, 60), max(2, size // 30))
+            cv2.ellipse(image, (eye_x, cy - scaled(0.07)), (scaled(0.08), scaled(0.045)), 0, 0, 360, (255, 255, 255), -1)
+            cv2.circle(image, (eye_x, cy - scaled(0.07)), max(2, scaled(0.035)), (30, 30, 30), -1)
+        cv2.line(image, (cx, cy - scaled(0.05)), (cx - scaled(0.03), cy + scaled(0.12)), (110, 130, 170), max(2, size // 40))
+        cv2.ellipse(image, (cx, cy + scaled(0.27)), (scaled(0.14), scaled(0.05)), 0, 0, 360, (70, 70, 150), -1)
+
+    def release(self):
+        self._opened = False
+
+    def __str__(self):
+        return f"synthetic source ({self.num_faces} face(s), {self.width}x{self.height})"
+
+
+def create_frame_source(spec, realtime=True, negotiator=None):
+    """יוצר מקור פריימים ממחרוזת הגדרה:
+    "0" / "device:0"          - מצלמה חיה
+    "video:path/to/file.mp4"  - קובץ וידאו
+    "images:path/to/dir"      - תיקיית תמונות
+    "synthetic" / "synthetic:2" - מחולל סינתטי עם מספר פנים
+    realtime=False מריץ קבצים ומחולל מהר ככל האפשר.
+    negotiator (CameraModeNegotiator) משמש רק למצלמה חיה"""
+    spec = str(spec).strip()
+    kind, _, argument = spec.partition(":")
+
+    if spec.isdigit():
+        return LiveDeviceSource(int(spec), negotiator)
+    if kind == "device":
+        return LiveDeviceSource(int(argument or 0), negotiator)
+    if kind == "video":
+        return VideoFileSource(argument, realtime=realtime)
+    if kind == "images":
+        return ImageDirectorySource(argument, realtime=realtime)
+    if kind == "synthetic":
+        return SyntheticFaceSource(num_faces=int(argument or 1), realtime=realtime)
+    raise ValueError(f"Unknown frame source: {spec!r}")
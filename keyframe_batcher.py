@@ -0,0 +1,71 @@
+from collections import deque
+import cv2
+from metrics import metrics
+from response_cache import dhash
+
+
+class KeyframeBatcher:
+    """אוסף פריימים מפתח לניתוח ההתנהגותי: עד count פריימים, במרווחים שווים לאורך window_seconds.
+
+    הפריימים נשמרים כהעתק מוקטן (אפשר לשחרר את ההשאלה מהמאגר מיד), והחלון נע - כשיש כבר
+    count פריימים, הישן ביותר נזרק. take מחזיר את כל מה שנאסף כבקשה אחת ומתחיל חלון חדש."""
+
+    def __init__(self, count=4, window_seconds=4.0, long_edge=1024):
+        self.count = count
+        self.window_seconds = window_seconds
+        self.spacing = window_seconds / count if count > 1 else 0.0  # מרווח מינימלי בין פריימים מפתח
+        self.long_edge = long_edge
+        self._keyframes = deque(maxlen=count)  # (capture_time, תמונה מוקטנת)
+
+        # מונים
+        self.added = 0
+        self.batches = 0
+        self.batched_frames = 0
+
+    def add(self, frame, capture_time):
+        """שומר את הפריים אם עבר מספיק זמן מהפריים המפתח הקודם. מחזיר True אם נשמר"""
+        # 10% סבולת - פריים שהגיע מעט לפני הזמן (רעידות בקצב הניתוח) עדיין נשמר
+        if self._keyframes and capture_time - self._keyframes[-1][0] < self.spacing * 0.9:
+            return False
+        self._keyframes.append((capture_time, self._shrink(frame)))
+        self.added += 1
+        return True
+
+    def _shrink(self, frame):
+        height, width = frame.shape[:2]
+        if not self.long_edge or max(width, height) <= self.long_edge:
+            return frame.copy()
+        scale = self.long_edge / max(width, height)
+        return cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def ready(self, urgent=False):
+        """החלון מלא; urgent (למשל אדם חדש) - מספיק פריים אחד"""
+        return len(self._keyframes) >= (1 if urgent else self.count)
+
+    def peek_hashes(self):
+        """hash תפיסתי לכל פריים שנאסף (כמו ב-prepare_keyframes), בלי לרוקן את החלון - לבדיקת המטמון"""
+        return [dhash(image) for _, image in self._keyframes]
+
+    def take(self):
+        """כל הפריימים שנאספו, מהישן לחדש - ומתחיל חלון חדש"""
+        keyframes = list(self._keyframes)
+        self._keyframes.clear()
+        if keyframes:
+            self.batches += 1
+            self.batched_frames += len(keyframes)
+            metrics.observe("ai.behavioral.keyframe_window", keyframes[-1][0] - keyframes[0][0])
+        return keyframes
+
+    def reset(self):
+        self._keyframes.clear()
+
+    def get_stats(self):
+        return {
+            "count": self.count,
+            "window_s": self.window_seconds,
+            "collected": len(self._keyframes),
+            "added": self.added,
+            "batches": self.batches,
+            "frames_per_batch": self.batched_frames / self.batches if self.batches else 0.0,
+        }
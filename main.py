@@ -1,32 +1,56 @@
-import queue
-import cv2
+import time
+import config
 from data_saver import DataSaver
 from behavioral_data_saver import BehavioralDataSaver
 from ai_background_analyzer import AIBackgroundAnalyzer
+from ai_process_analyzer import AIProcessAnalyzer
 from camera_utils import Camera
+from camera_modes import CameraModeNegotiator, CameraTarget
 from display_utils import DisplayManager
+from frame_buffer import FrameRingBuffer
+from frame_sources import create_frame_source
+from frame_sinks import create_frame_sink
+from metrics import metrics
+from render_scheduler import RenderScheduler
 
 
 def run_mirror_app():
     # יצירת אובייקטים
-    camera = Camera()
-    display_manager = DisplayManager()
+    # טבעת פריימים משותפת: המצלמה לוכדת ישירות לתוכה, המנתח שואל ממנה ללא העתקה
+    frame_buffer = FrameRingBuffer(num_slots=config.FRAME_BUFFER_SLOTS)
+    negotiator = None
+    if config.CAMERA_TARGET:
+        negotiator = CameraModeNegotiator(CameraTarget.parse(config.CAMERA_TARGET), force_probe=config.CAMERA_REPROBE)
+    source = create_frame_source(config.FRAME_SOURCE or config.CAMERA_INDEX, realtime=config.FRAME_SOURCE_REALTIME,
+                                 negotiator=negotiator)
+    camera = Camera(config.CAMERA_INDEX, threaded=config.CAMERA_THREADED, frame_buffer=frame_buffer, source=source)
+    if config.HEADLESS:
+        # מצב ללא מסך: מסך וירטואלי בגודל מוגדר, הפריימים נזרקים או נכתבים לקובץ
+        # קובץ וידאו צריך קצב - ברינדור ללא הגבלה נרשם בקצב ברירת המחדל
+        sink = create_frame_sink(config.FRAME_SINK or "null", 'Mirror on the Wall',
+                                 fps=config.RENDER_FPS if config.RENDER_FPS > 0 else 30.0)
+        display_manager = DisplayManager(sink=sink, screen_size=config.VIRTUAL_SCREEN_SIZE)
+    else:
+        display_manager = DisplayManager()
     data_saver = DataSaver()
     behavioral_data_saver = BehavioralDataSaver()
-    frame_queue = queue.Queue(maxsize=10)
 
     # הגדרת חלון התצוגה
     display_manager.setup_window()
 
-    # יצירת והפעלת thread לניתוח AI ברקע (כולל ניתוח התנהגותי)
-    ai_analyzer = AIBackgroundAnalyzer(frame_queue, data_saver, behavioral_data_saver, interval_seconds=0.5)
-    ai_analyzer.start()
-
-    # פתיחת המצלמה
+    # פתיחת המצלמה - לפני הפעלת המנתח, כך שכישלון לא משאיר תהליך עבודה, זיכרון משותף או לולאת asyncio
     if not camera.open():
         print("Failed to open camera. Exiting.")
+        display_manager.close()
         return
 
+    # יצירת והפעלת ניתוח AI ברקע (כולל ניתוח התנהגותי) - ב-thread או בתהליך נפרד
+    if config.ANALYZER_MODE == "process":
+        ai_analyzer = AIProcessAnalyzer(frame_buffer, data_saver, behavioral_data_saver, interval_seconds=0.5)
+    else:
+        ai_analyzer = AIBackgroundAnalyzer(frame_buffer, data_saver, behavioral_data_saver, interval_seconds=0.5)
+    ai_analyzer.start()
+
     print("Mirror app started. Press 'Esc' to exit.")
     print("Press 'D' to toggle JSON data overlay.")
     print("Press 'G' to toggle grid display.")
@@ -40,27 +64,54 @@ def run_mirror_app():
 
 
 
+    # מתזמן רינדור בקצב קבוע - המצלמה קוראת ב-thread משלה, והתצוגה לוקחת את הפריים האחרון בכל טיק
+    scheduler = RenderScheduler(target_fps=config.RENDER_FPS)
+    last_stats_print = time.time()
+
+    run_start = time.time()
+
     # לולאה ראשית להרצת האפליקציה
     while True:
-        if cv2.getWindowProperty(display_manager.window_name, cv2.WND_PROP_VISIBLE) < 1:
+        # יציאה אוטומטית אחרי מספר פריימים או שניות (לריצות מדידה)
+        if config.RUN_MAX_FRAMES and scheduler.frames >= config.RUN_MAX_FRAMES:
+            print(f"Reached {config.RUN_MAX_FRAMES} frames. Exiting.")
+            break
+        if config.RUN_MAX_SECONDS and time.time() - run_start >= config.RUN_MAX_SECONDS:
+            print(f"Reached {config.RUN_MAX_SECONDS:g} seconds. Exiting.")
+            break
+
+        with metrics.time("loop.wait"):
+            scheduler.wait_for_next_frame()
+
+        if not display_manager.is_window_open():
             print("Window was closed. Exiting.")
             break
         # קריאת פריים מהמצלמה
-        ret, frame = camera.read_frame()
+        with metrics.time("loop.capture"):
+            ret, frame = camera.read_frame()
         if not ret or frame is None:
             print("Failed to read frame from camera.")
             break
 
-        # .AI-ניסה להכניס פריים לתור עבור ה
-        try:
-            frame_queue.put_nowait(frame.copy())
-        except queue.Full:
-            pass
+        # אם המצלמה מאחרת - מציגים שוב את הפריים האחרון במקום לחכות לה
+        scheduler.frame_source_update(camera.last_frame_is_new)
+
+        # הפריים כבר נמצא בטבעת - ה-AI שואל ממנה את האחרון בלי העתקה
 
         # הצגת פריים על המסך (כולל נתוני שני המאגרים)
-        display_manager.show_frame(frame, data_saver.file_path, behavioral_data_saver.get_file_path(),
-                                   ai_analyzer.person_tracker.get_active_persons())        # בדיקת מקשים
-        key = cv2.waitKey(1)
+        with metrics.time("loop.render"):
+            display_manager.show_frame(frame, data_saver.file_path, behavioral_data_saver.get_file_path(),
+                                       ai_analyzer.person_tracker.get_active_persons(),
+                                       ai_analyzer.get_usage_summary(), ai_analyzer.get_ai_status())
+        # בדיקת מקשים
+        with metrics.time("loop.input"):
+            key = display_manager.poll_key()
+
+        # הדפסת סטטיסטיקות רינדור מדי פעם
+        if config.RENDER_STATS_INTERVAL > 0 and time.time() - last_stats_print >= config.RENDER_STATS_INTERVAL:
+            print(scheduler.format_stats())
+            last_stats_print = time.time()
+
         if key == 27:  # מקש Esc
             print("Esc key pressed. Exiting.")
             break
@@ -80,17 +131,15 @@ def run_mirror_app():
             # בדיקה אם המקש הוא 'c' או 'C' - התחלת סצנה חדשה
             elif key == ord('c') or key == ord('C'):
                 print("Starting new scene!")
-                data_saver.start_new_scene()
-                behavioral_data_saver.start_new_scene()
-                # איפוס person tracker
-                ai_analyzer.person_tracker.reset()
+                # סגירת הסשנים ואיפוס person tracker (בתהליך הניתוח, אם הוא רץ בנפרד)
+                ai_analyzer.start_new_scene()
                 # טריגר למעבר הדרגתי בתצוגה
                 if display_manager.show_json_overlay:
                     display_manager.trigger_scene_transition()
             # בדיקה אם המקש הוא 'b' או 'B' - ניקוי נתונים התנהגותיים
             elif key == ord('b') or key == ord('B'):
                 print("Cleaning behavioral data!")
-                behavioral_data_saver.clean_duplicate_sessions()
+                ai_analyzer.clean_behavioral_data()
                 # בדיקה אם המקש הוא 't' או 'T' - הצגת טיימר
             elif key == ord('t') or key == ord('T'):
                 print("Toggle timer display!")
@@ -106,11 +155,27 @@ def run_mirror_app():
     # ניקוי לפני יציאה
     print("Cleaning up...")
     ai_analyzer.stop()
-    ai_analyzer.join()
+    ai_analyzer.join(timeout=5.0)  # ה-thread הוא daemon - לא מחכים לנצח לקריאת AI שתקועה ברשת
+    if ai_analyzer.is_alive():
+        print("AI analyzer still busy with a request - leaving it behind.")
+    _print_run_summary(scheduler, camera, frame_buffer, time.time() - run_start)
     camera.release()
-    cv2.destroyAllWindows()
+    display_manager.close()
     print("Mirror app closed.")
 
 
+def _print_run_summary(scheduler, camera, frame_buffer, elapsed):
+    """סיכום ריצה: קצב פריימים וזמני כל שלב בלולאה"""
+    print("\n=== Run summary ===")
+    frames = scheduler.frames
+    if elapsed > 0:
+        print(f"Frames: {frames} in {elapsed:.1f}s ({frames / elapsed:.1f} fps overall)")
+    print(scheduler.format_stats())
+    print("Stage timings:")
+    print(metrics.format_timings())
+    print(f"Camera stats: {camera.get_stats()}")
+    print(f"Frame buffer stats: {frame_buffer.get_stats()}")
+
+
 if __name__ == "__main__":
     run_mirror_app()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+
+
+class TimingStats:
+    """סטטיסטיקה של זמני ריצה עבור שלב אחד (בשניות)"""
+
+    def __init__(self, window=500):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)  # דגימות אחרונות לחישוב אחוזונים
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self):
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "mean_ms": mean * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": self.max * 1000,
+            "total_s": self.total,
+        }
+
+
+class _TimingContext:
+    def __init__(self, registry, name):
+        self._registry = registry
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._registry.observe(self._name, time.perf_counter() - self._start)
+
+
+class MetricsRegistry:
+    """מאגר מדדים משותף לכל רכיבי המראה: מונים, ערכים נוכחיים וזמני שלבים"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.timings = {}
+
+    def inc(self, name, value=1):
+        """הגדלת מונה"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """קביעת ערך נוכחי (למשל מצב, גודל תור)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, seconds):
+        """רישום זמן ריצה של שלב"""
+        with self._lock:
+            if name not in self.timings:
+                self.timings[name] = TimingStats()
+            self.timings[name].add(seconds)
+
+    def time(self, name):
+        """מנהל הקשר למדידת שלב: with metrics.time("render"): ..."""
+        return _TimingContext(self, name)
+
+    def get_counter(self, name, default=0):
+        with self._lock:
+            return self.counters.get(name, default)
+
+    def snapshot(self):
+        """תמונת מצב של כל המדדים"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": {name: stats.to_dict() for name, stats in self.timings.items()},
+            }
+
+    def format_timings(self, prefix=""):
+        """טבלת זמני שלבים להדפסה"""
+        lines = []
+        with self._lock:
+            for name in sorted(self.timings):
+                if not name.startswith(prefix):
+                    continue
+                stats = self.timings[name].to_dict()
+                lines.append(f"  {name:<28} n={stats['count']:<6} mean={stats['mean_ms']:8.2f} ms  "
+                             f"p95={stats['p95_ms']:8.2f} ms  max={stats['max_ms']:8.2f} ms")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timings.clear()
+
+
+# מאגר ברירת המחדל של התהליך
+metrics = MetricsRegistry()
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import threading
+import time
+from dotenv import load_dotenv
+import google.generativeai as genai
+import config
+from fake_gemini import FakeGenerativeModel, FakeProfile
+from metrics import metrics
+
+
+def fake_profile_from_config():
+    """פרופיל השרת המדומה לפי ההגדרות (MIRROR_FAKE_AI_*)"""
+    return FakeProfile(
+        latency_ms=config.FAKE_AI_LATENCY_MS,
+        latency_sigma=config.FAKE_AI_LATENCY_SIGMA,
+        error_rate=config.FAKE_AI_ERROR_RATE,
+        quota_error_share=config.FAKE_AI_QUOTA_ERROR_SHARE,
+        malformed_rate=config.FAKE_AI_MALFORMED_RATE,
+        chunk_chars=config.FAKE_AI_CHUNK_CHARS,
+        connect_ms=config.FAKE_AI_CONNECT_MS,
+        seed=config.FAKE_AI_SEED,
+    )
+
+
+class ModelClient:
+    """שירות המודל המשותף לכל המנתחים בתהליך.
+
+    מגדיר את Gemini פעם אחת (מפתח, genai.configure), מחזיק מופע GenerativeModel אחד לכל שם
+    מודל, כך שכל הקריאות עוברות באותו ערוץ gRPC של ה-SDK ולא פותחות חיבור משלהן, ומחמם את
+    החיבור (DNS + TLS) בקריאת count_tokens חינמית. כל קריאה נמדדת כ-cold (ראשונה בחיבור, או
+    אחרי idle_reset_seconds בלי קריאות) או כ-warm - כך רואים כמה שימוש חוזר בחיבור חוסך."""
+
+    def __init__(self, backend="gemini", model_name="gemini-2.0-flash", idle_reset_seconds=240.0):
+        self.backend = backend
+        self.model_name = model_name
+        self.idle_reset_seconds = idle_reset_seconds  # חיבור שלא היה בשימוש זמן רב נחשב קר שוב
+        self._models = {}
+        self._last_success = {}  # "sync" / "async" -> זמן הקריאה המוצלחת האחרונה בחיבור
+        self._lock = threading.Lock()
+        self._fake_profile = None
+
+        # מונים
+        self.cold_calls = 0
+        self.warm_calls = 0
+        self.prewarm_seconds = None
+
+        if backend == "fake":
+            self._fake_profile = fake_profile_from_config()
+        elif backend == "gemini":
+            load_dotenv()
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("GOOGLE_API_KEY not found in .env file.")
+            genai.configure(api_key=api_key)
+        else:
+            raise ValueError(f"Unknown AI backend: {backend!r} (expected 'gemini' or 'fake')")
+
+    def get_model(self, model_name=None):
+        """מופע המודל המשותף (נוצר בפעם הראשונה)"""
+        model_name = model_name or self.model_name
+        with self._lock:
+            if model_name not in self._models:
+                if self._fake_profile is not None:
+                    self._models[model_name] = FakeGenerativeModel(model_name, self._fake_profile)
+                else:
+                    self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def _connection_state(self, transport):
+        last = self._last_success.get(transport)
+        if last is None or time.time() - last > self.idle_reset_seconds:
+            return "cold"
+        return "warm"
+
+    def _record_call(self, transport, state, started):
+        """זמן עד התשובה (בהזרמה - עד החתיכה הראשונה), בנפרד לקריאות קרות וחמות"""
+        metrics.observe(f"ai.client.{state}", time.perf_counter() - started)
+        with self._lock:
+            if state == "cold":
+                self.cold_calls += 1
+            else:
+                self.warm_calls += 1
+            self._last_success[transport] = time.time()
+
+    def generate(self, contents, model_name=None, **kwargs):
+        """generate_content דרך החיבור המשותף"""
+        state = self._connection_state("sync")
+        started = time.perf_counter()
+        response = self.get_model(model_name).generate_content(contents, **kwargs)
+        self._record_call("sync", state, started)
+        return response
+
+    async def generate_async(self, contents, model_name=None, **kwargs):
+        """generate_content_async דרך החיבור המשותף"""
+        state = self._connection_state("async")
+        started = time.perf_counter()
+        response = await self.get_model(model_name).generate_content_async(contents, **kwargs)
+        self._record_call("async", state, started)
+        return response
+
+    async def prewarm_async(self):
+        """פתיחת החיבור האסינכרוני מראש (DNS, TLS, HTTP/2) בקריאת count_tokens - בלי עלות ובלי מכסת יצירה"""
+        started = time.perf_counter()
+        try:
+            await self.get_model().count_tokens_async("ping")
+        except Exception as e:
+            print(f"AI connection pre-warm failed: {type(e).__name__}: {e}")
+            return False
+        self.prewarm_seconds = time.perf_counter() - started
+        metrics.observe("ai.client.prewarm", self.prewarm_seconds)
+        with self._lock:
+            self._last_success["async"] = time.time()
+        print(f"AI connection pre-warmed in {self.prewarm_seconds * 1000:.0f} ms")
+        return True
+
+    async def keep_alive_async(self, prewarm=True, interval=120.0):
+        """מחמם את החיבור בהתחלה, ואחר כך שולח count_tokens כשהחיבור לא היה בשימוש interval שניות.
+        רץ ברקע בלולאת מנוע הבקשות (0 = ללא שמירה על החיבור)"""
+        if prewarm:
+            await self.prewarm_async()
+        if not interval:
+            return
+        while True:
+            await asyncio.sleep(interval / 4)
+            last = self._last_success.get("async")
+            if last is not None and time.time() - last >= interval:
+                try:
+                    await self.get_model().count_tokens_async("ping")
+                    metrics.inc("ai.client.keepalive")
+                    with self._lock:
+                        self._last_success["async"] = time.time()
+                except Exception as e:
+                    metrics.inc("ai.client.keepalive_failed")
+                    print(f"AI connection keep-alive failed: {type(e).__name__}")
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "models": len(self._models),
+                "cold_calls": self.cold_calls,
+                "warm_calls": self.warm_calls,
+                "prewarm_ms": self.prewarm_seconds * 1000 if self.prewarm_seconds is not None else None,
+            }
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_model_client():
+    """הלקוח המשותף של התהליך (נוצר בקריאה הראשונה, לפי MIRROR_AI_BACKEND)"""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = ModelClient(config.AI_BACKEND)
+        return _shared_client
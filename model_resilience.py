@@ -0,0 +1,211 @@
+import asyncio
+import random
+import threading
+import time
+import config
+from google.api_core import exceptions as google_exceptions
+from metrics import metrics
+from rate_limiter import rate_limiter
+
+
+class CircuitOpenError(Exception):
+    """המפסק פתוח - השירות נחשב לא תקין ולא שולחים אליו בקשות"""
+
+
+# סוגי שגיאות: quota - חריגה ממכסה (429), transient - תקלה זמנית שכדאי לנסות שוב,
+# fatal - שגיאה שלא תיפתר בניסיון חוזר (מפתח שגוי, בקשה לא תקינה)
+_QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+_TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.BadGateway,
+    google_exceptions.Aborted,
+    google_exceptions.RetryError,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+def classify_error(error):
+    """"quota" / "transient" / "fatal" """
+    if isinstance(error, _QUOTA_ERRORS):
+        return "quota"
+    if isinstance(error, _TRANSIENT_ERRORS):
+        return "transient"
+    if isinstance(error, google_exceptions.GoogleAPICallError):
+        code = getattr(error, "code", None)
+        if code == 429:
+            return "quota"
+        if code is not None and int(code) >= 500:
+            return "transient"
+    return "fatal"
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=15.0):
+    """השהיה אקספוננציאלית עם jitter מלא: אקראית בין 0 ל-base*2^(attempt-1), עד max_delay"""
+    return random.uniform(0.0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+class CircuitBreaker:
+    """מפסק זרם לשירות המודל.
+
+    closed - הכול תקין. אחרי failure_threshold כשלים זמניים רצופים, או מיד בחריגה
+    ממכסה / שגיאה קבועה, עוברים ל-open: אין בקשות במשך reset_seconds. אחר כך half_open -
+    בקשת בדיקה אחת; הצלחה סוגרת את המפסק, וכישלון פותח אותו שוב לזמן כפול (עד פי 8)."""
+
+    STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.open_count = 0  # פתיחות רצופות בלי הצלחה - מאריך את זמן ההמתנה
+        self.last_error = None
+        self._probe_started = None  # בקשת הבדיקה של half_open (בקשה שבוטלה משתחררת אחרי reset_seconds)
+        self._lock = threading.Lock()
+
+        # מונים
+        self.transitions = {}
+
+    def _set_state(self, state, reason=""):
+        if state == self.state:
+            return
+        print(f"AI circuit breaker: {self.state} -> {state}{f' ({reason})' if reason else ''}")
+        self.state = state
+        self.transitions[state] = self.transitions.get(state, 0) + 1
+        metrics.inc(f"ai.breaker.to_{state}")
+        metrics.set_gauge("ai.breaker.state", self.STATE_VALUES[state])
+
+    def _open(self, now, reason):
+        self.open_count += 1
+        self.open_until = now + self.reset_seconds * min(8, 2 ** (self.open_count - 1))
+        self._probe_started = None
+        self._set_state("open", reason)
+
+    def allow(self, now=None):
+        """האם מותר לשלוח בקשה עכשיו (ב-half_open - רק בקשת בדיקה אחת)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            if self.state == "open":
+                if now < self.open_until:
+                    return False
+                self._set_state("half_open")
+            if self.state == "half_open":
+                if self._probe_started is not None and now - self._probe_started < self.reset_seconds:
+                    return False
+                self._probe_started = now
+            return True
+
+    def is_open(self, now=None):
+        """פתוח ועדיין לא הגיע זמן לבדיקה - לא כדאי אפילו להכין בקשה"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            return self.state == "open" and now < self.open_until
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.open_count = 0
+            self._probe_started = None
+            self._set_state("closed")
+
+    def record_failure(self, error_class, error=None, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = f"{error_class}: {type(error).__name__}" if error is not None else error_class
+            if self.state == "half_open":
+                self._open(now, f"probe failed, {self.last_error}")
+            elif self.state == "closed" and (error_class in ("quota", "fatal")
+                                             or self.consecutive_failures >= self.failure_threshold):
+                self._open(now, self.last_error)
+
+    def get_status(self, now=None):
+        """מצב לתצוגה: state, retry_in (שניות עד הבדיקה הבאה) ו-last_error"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            return {
+                "state": self.state,
+                "retry_in": max(0.0, self.open_until - now) if self.state == "open" else 0.0,
+                "last_error": self.last_error,
+            }
+
+    def get_stats(self):
+        return {**self.get_status(), "consecutive_failures": self.consecutive_failures,
+                "transitions": dict(self.transitions)}
+
+
+# המפסק של התהליך - משותף לכל המנתחים, כמו מגביל הקצב
+circuit_breaker = CircuitBreaker(config.AI_BREAKER_FAILURE_THRESHOLD, config.AI_BREAKER_RESET_SECONDS)
+
+
+def _before_attempt(kind):
+    if not circuit_breaker.allow():
+        metrics.inc(f"ai.{kind}.rejected_open")
+        raise CircuitOpenError(f"{kind} request skipped: AI service unavailable (circuit open)")
+
+
+def _remaining(deadline):
+    """הזמן שנותר לכל הניסיונות יחד (None - ללא מגבלה)"""
+    return max(0.001, deadline - time.monotonic()) if deadline is not None else None
+
+
+def _after_failure(kind, error, attempt, deadline):
+    """רישום הכישלון; מחזיר כמה לחכות לפני הניסיון הבא, או None אם לא מנסים שוב"""
+    error_class = classify_error(error)
+    metrics.inc(f"ai.{kind}.errors.{error_class}")
+    circuit_breaker.record_failure(error_class, error)
+    if error_class == "fatal" or attempt >= config.AI_RETRY_MAX_ATTEMPTS or circuit_breaker.is_open():
+        return None
+    delay = backoff_delay(attempt, config.AI_RETRY_BASE_DELAY, config.AI_RETRY_MAX_DELAY)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    metrics.inc(f"ai.{kind}.retries")
+    print(f"{kind.capitalize()} AI call failed ({error_class}: {type(error).__name__}), "
+          f"retry {attempt}/{config.AI_RETRY_MAX_ATTEMPTS - 1} in {delay:.1f}s")
+    return delay
+
+
+def resilient_call(kind, make_call, priority="normal", timeout=None):
+    """קריאה למודל דרך המפסק, מגביל הקצב וניסיונות חוזרים. make_call - פונקציה ללא ארגומנטים"""
+    deadline = time.monotonic() + timeout if timeout else None
+    attempt = 0
+    while True:
+        attempt += 1
+        _before_attempt(kind)
+        rate_limiter.acquire(kind, priority, _remaining(deadline))
+        try:
+            response = make_call()
+        except Exception as e:
+            delay = _after_failure(kind, e, attempt, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        return response
+
+
+async def resilient_call_async(kind, make_call, priority="normal", timeout=None):
+    """כמו resilient_call, כש-make_call מחזירה coroutine"""
+    deadline = time.monotonic() + timeout if timeout else None
+    attempt = 0
+    while True:
+        attempt += 1
+        _before_attempt(kind)
+        await rate_limiter.acquire_async(kind, priority, _remaining(deadline))
+        try:
+            response = await make_call()
+        except Exception as e:
+            delay = _after_failure(kind, e, attempt, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        return response
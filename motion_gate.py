@@ -0,0 +1,75 @@
+import time
+import cv2
+import numpy as np
+from metrics import metrics
+
+
+class MotionGate:
+    """שער תנועה זול לפני זיהוי אנשים וקריאות AI.
+
+    הפריים מוקטן לתמונת אפור קטנה ומושווה לפריים האחרון שעבר את השער.
+    היסטרזיס: במצב "שקט" צריך שינוי של enter_threshold כדי לעבור, ובמצב "תנועה"
+    כל פריים עובר עד שהשינוי יורד מתחת ל-exit_threshold. כך תנודות קטנות סביב
+    סף יחיד לא גורמות להבהוב בין ניתוח לדילוג."""
+
+    def __init__(self, enter_threshold=4.0, exit_threshold=2.0, max_skip_seconds=15.0, size=(64, 36)):
+        self.enter_threshold = enter_threshold  # ממוצע הפרש פיקסלים (0-255) ליציאה ממצב שקט
+        self.exit_threshold = exit_threshold  # מתחת לזה - חזרה למצב שקט
+        self.max_skip_seconds = max_skip_seconds  # מעבר כפוי מדי פעם גם בלי שינוי (0 = ללא)
+        self.size = size
+        self.reference = None  # תמונה מוקטנת של הפריים האחרון שעבר
+        self.last_pass_time = 0.0
+        self.moving = True  # מתחילים במצב תנועה כדי שהפריים הראשון ינותח
+        self.last_score = 0.0
+
+        # מונים
+        self.passed = 0
+        self.skipped = 0
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (3, 3), 0).astype(np.int16)  # טשטוש קל נגד רעש חיישן
+
+    def should_analyze(self, frame, now=None):
+        """מחזיר True אם הפריים השתנה מספיק מאז הפריים האחרון שעבר"""
+        now = now if now is not None else time.time()
+        thumbnail = self._thumbnail(frame)
+
+        if self.reference is None:
+            passed = True
+            self.last_score = 0.0
+        else:
+            self.last_score = float(np.mean(np.abs(thumbnail - self.reference)))
+            if self.moving:
+                if self.last_score < self.exit_threshold:
+                    self.moving = False
+            elif self.last_score >= self.enter_threshold:
+                self.moving = True
+            passed = self.moving or (self.max_skip_seconds and now - self.last_pass_time >= self.max_skip_seconds)
+
+        if passed:
+            self.reference = thumbnail
+            self.last_pass_time = now
+            self.passed += 1
+            metrics.inc("motion_gate.passed")
+        else:
+            self.skipped += 1
+            metrics.inc("motion_gate.skipped")
+        metrics.set_gauge("motion_gate.score", self.last_score)
+        return bool(passed)
+
+    def reset(self):
+        """איפוס (למשל בסצנה חדשה) - הפריים הבא תמיד עובר"""
+        self.reference = None
+        self.moving = True
+
+    def get_stats(self):
+        total = self.passed + self.skipped
+        return {
+            "passed": self.passed,
+            "skipped": self.skipped,
+            "skip_ratio": self.skipped / total if total else 0.0,
+            "moving": self.moving,
+            "last_score": self.last_score,
+        }
@@ -13,7 +13,9 @@ class PersonTracker:
         # מעקב אחרי מספר אנשים
         self.tracked_persons = {}  # מילון: person_id -> {bbox, last_seen}
         self.person_timeout = 1.0
-        #        self.iou_threshold = 0.3  # סף לקביעה שזה אותו אדם
+        self.iou_threshold = 0.3  # סף לקביעה שזה אותו אדם
+        self.max_center_jump = 1.0  # תזוזת מרכז מרבית ללא חפיפה, ביחס לאלכסון התיבה
+        self.last_detection_time = None  # מתי רץ הזיהוי האחרון
 
         # מונה אנשים
         self.person_counter = 1000  # מתחיל מ-1000 כדי להיות 4 ספרות
@@ -35,20 +37,57 @@ class PersonTracker:
 
         print(f"\n=== PersonTracker: {len(faces)} face(s) detected ===")
 
-        # עבור כל פנים שזוהו
-        for face_bbox in faces:
-            x, y, w, h = face_bbox
-
-            # הרחב את התיבה התוחמת לכלול יותר מהגוף
-            person_bbox = (
+        # התיבות המורחבות של כל הפנים - כדי לכלול יותר מהגוף
+        person_bboxes = []
+        for x, y, w, h in faces:
+            person_bboxes.append((
                 max(0, x - w // 2),
                 max(0, y - h // 2),
                 min(frame.shape[1], w * 2),
                 min(frame.shape[0], h * 3)
-            )
+            ))
+
+        # קודם מנקים אנשים שלא נראו זמן רב - פנים חדשות לא יקבלו מזהה (ותיאורים) של מי שכבר עזב
+        self.remove_timed_out(current_time)
+        self.last_detection_time = current_time
+
+        # התאמה אחד-לאחד: כל פנים מקבלות מזהה אחר בפריים.
+        # קודם הזוגות עם החפיפה (IoU) הגבוהה ביותר מעל הסף
+        assignments = {}  # אינדקס פנים -> person_id
+        pairs = []
+        for face_index, person_bbox in enumerate(person_bboxes):
+            for person_id, person_data in self.tracked_persons.items():
+                iou = self._calculate_iou(person_bbox, person_data['bbox'])
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, face_index, person_id))
+        for iou, face_index, person_id in sorted(pairs, reverse=True):
+            if face_index not in assignments and person_id not in matched_person_ids:
+                assignments[face_index] = person_id
+                matched_person_ids.add(person_id)
+
+        # פנים שלא נמצאה להן חפיפה - לאדם הקרוב ביותר שעוד לא הותאם (תנועה מהירה בין פריימים),
+        # רק אם המרכז זז פחות מ-max_center_jump אלכסונים; רחוק מזה - אדם חדש
+        pairs = []
+        for face_index, person_bbox in enumerate(person_bboxes):
+            if face_index in assignments:
+                continue
+            for person_id, person_data in self.tracked_persons.items():
+                if person_id in matched_person_ids:
+                    continue
+                _, _, w, h = person_data['bbox']
+                distance = self._center_distance(person_bbox, person_data['bbox'])
+                if distance <= self.max_center_jump * (w * w + h * h) ** 0.5:
+                    pairs.append((distance, face_index, person_id))
+        for distance, face_index, person_id in sorted(pairs):
+            if face_index not in assignments and person_id not in matched_person_ids:
+                assignments[face_index] = person_id
+                matched_person_ids.add(person_id)
 
-            # אם אין אף אדם במעקב - צור חדש
-            if len(self.tracked_persons) == 0:
+        # עבור כל פנים שזוהו
+        for face_index, person_bbox in enumerate(person_bboxes):
+            person_id = assignments.get(face_index)
+            if person_id is None:
+                # פנים חדשות - מזהה חדש
                 self.person_counter += 1
                 new_id = self.person_counter
                 self.tracked_persons[new_id] = {
@@ -57,29 +96,32 @@ class PersonTracker:
                 }
                 matched_person_ids.add(new_id)
                 detected_persons.append((new_id, True))  # True = חדש
-                print(f"  Person {new_id}: NEW (first person)")
+                print(f"  Person {new_id}: NEW")
             else:
-                # יש כבר אדם - השתמש במזהה הקיים
-                existing_id = list(self.tracked_persons.keys())[0]
-                self.tracked_persons[existing_id]['bbox'] = person_bbox
-                self.tracked_persons[existing_id]['last_seen'] = current_time
-                matched_person_ids.add(existing_id)
-                detected_persons.append((existing_id, False))  # False = לא חדש
-                print(f"  Person {existing_id}: SAME (reusing existing ID)")
-
-        # נקה אנשים שלא נראו זמן רב
+                self.tracked_persons[person_id]['bbox'] = person_bbox
+                self.tracked_persons[person_id]['last_seen'] = current_time
+                detected_persons.append((person_id, False))  # False = לא חדש
+                print(f"  Person {person_id}: SAME (reusing existing ID)")
+
+        return detected_persons
+
+    def remove_timed_out(self, current_time=None):
+        """מסיר אנשים שלא נראו יותר מ-person_timeout שניות. מחזיר את המזהים שהוסרו.
+        רק מי שהזיהוי הקודם כבר לא מצא - הפסקה בזיהוי עצמו (פריים איטי) לא מוציאה אנשים"""
+        if current_time is None:
+            current_time = time.time()
         persons_to_remove = []
         for person_id, person_data in self.tracked_persons.items():
-            if person_id not in matched_person_ids:
-                time_since_seen = current_time - person_data['last_seen']
-                if time_since_seen > self.person_timeout:
-                    persons_to_remove.append(person_id)
-                    print(f"  Person {person_id}: LEFT (timeout: {time_since_seen:.1f}s)")
+            time_since_seen = current_time - person_data['last_seen']
+            missed = self.last_detection_time is not None and person_data['last_seen'] < self.last_detection_time
+            if missed and time_since_seen > self.person_timeout:
+                persons_to_remove.append(person_id)
+                print(f"  Person {person_id}: LEFT (timeout: {time_since_seen:.1f}s)")
 
         for person_id in persons_to_remove:
             del self.tracked_persons[person_id]
+        return persons_to_remove
 
-        return detected_persons
     def _calculate_iou(self, box1, box2):
         """חישוב Intersection over Union בין שתי תיבות"""
         x1, y1, w1, h1 = box1
@@ -103,6 +145,17 @@ class PersonTracker:
 
         return intersection_area / union_area if union_area > 0 else 0
 
+    def _center_distance(self, box1, box2):
+        """המרחק בין מרכזי שתי תיבות"""
+        x1, y1, w1, h1 = box1
+        x2, y2, w2, h2 = box2
+        return (((x1 + w1 / 2) - (x2 + w2 / 2)) ** 2 + ((y1 + h1 / 2) - (y2 + h2 / 2)) ** 2) ** 0.5
+
+    def get_person_bbox(self, person_id):
+        """התיבה התוחמת המורחבת (x, y, w, h) האחרונה של אדם, או None"""
+        person_data = self.tracked_persons.get(person_id)
+        return person_data['bbox'] if person_data else None
+
     def get_active_persons(self):
         """מחזיר רשימה של כל האנשים הפעילים"""
         return list(self.tracked_persons.keys())
@@ -110,4 +163,5 @@ class PersonTracker:
     def reset(self):
         """איפוס המעקב"""
         self.tracked_persons.clear()
+        self.last_detection_time = None
         print("PersonTracker reset - all persons cleared")
\ No newline at end of file
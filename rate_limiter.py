@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+import config
+from metrics import metrics
+
+
+class RateLimitTimeout(Exception):
+    """הבקשה לא קיבלה אישור ממגביל הקצב בזמן שהוקצב לה"""
+
+
+class TokenBucket:
+    """דלי אסימונים: מתמלא בקצב קבוע עד capacity, וכל בקשה מורידה ממנו"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.last_refill = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_per_second)
+        self.last_refill = now
+
+    def wait_time(self, amount, reserve, now):
+        """כמה שניות עד שאפשר לקחת amount ועדיין להשאיר reserve (0 = אפשר עכשיו)"""
+        self.refill(now)
+        reserve = min(reserve, max(0.0, self.capacity - amount))  # דלי קטן - השמורה לא חוסמת לתמיד
+        missing = amount + reserve - self.tokens
+        return max(0.0, missing / self.refill_per_second) if self.refill_per_second else 0.0
+
+
+class RateLimiter:
+    """מגביל קצב משותף לכל הקריאות ל-Gemini: בקשות לדקה (RPM) וטוקנים לדקה (TPM).
+
+    סוגי עדיפות: "high" (אדם חדש) יכול לרוקן את הדלי, "normal" משאיר 20% ו-"low"
+    (רענון של מבקר יציב) משאיר 50% - כך קהל גדול לא חוסם ניתוח של מי שרק הגיע.
+    כמות הטוקנים לא ידועה לפני הקריאה, ולכן לוקחים הערכה (ממוצע נע לכל סוג קריאה)
+    ומתקנים לפי הכמות האמיתית ב-record."""
+
+    PRIORITY_RESERVE = {"high": 0.0, "normal": 0.2, "low": 0.5}
+
+    def __init__(self, requests_per_minute=15, tokens_per_minute=1_000_000, default_tokens=2000):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.default_tokens = default_tokens
+        self.estimates = {}  # kind -> ממוצע נע של טוקנים לקריאה
+        self._lock = threading.Lock()
+
+        # מונים
+        self.granted = {}
+        self.timeouts = {}
+        self.wait_seconds = 0.0
+
+    def estimate_tokens(self, kind):
+        return self.estimates.get(kind, self.default_tokens)
+
+    def _try_take(self, kind, priority):
+        """מנסה לקחת מקום לבקשה. מחזיר 0 אם אושרה, אחרת כמה שניות לחכות"""
+        reserve = self.PRIORITY_RESERVE.get(priority, self.PRIORITY_RESERVE["normal"])
+        estimate = self.estimate_tokens(kind)
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, reserve * self.requests.capacity, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(estimate, reserve * self.tokens.capacity, now))
+            if wait > 0:
+                return wait
+            if self.requests is not None:
+                self.requests.tokens -= 1
+            if self.tokens is not None:
+                self.tokens.tokens -= estimate
+            self.granted[priority] = self.granted.get(priority, 0) + 1
+        metrics.inc(f"ai.limiter.{priority}.granted")
+        return 0.0
+
+    def _on_wait_done(self, kind, priority, started, granted):
+        waited = time.monotonic() - started
+        self.wait_seconds += waited
+        if waited > 0:
+            metrics.observe("ai.limiter.wait", waited)
+        if not granted:
+            self.timeouts[priority] = self.timeouts.get(priority, 0) + 1
+            metrics.inc(f"ai.limiter.{priority}.timeouts")
+            raise RateLimitTimeout(f"{kind} request ({priority} priority) not admitted by the rate limiter")
+
+    def acquire(self, kind, priority="normal", timeout=None):
+        """ממתין (חוסם) עד שהבקשה מאושרת. זורק RateLimitTimeout אחרי timeout שניות"""
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+        while True:
+            wait = self._try_take(kind, priority)
+            if wait == 0:
+                return self._on_wait_done(kind, priority, started, True)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return self._on_wait_done(kind, priority, started, False)
+            time.sleep(min(wait, 1.0))
+
+    async def acquire_async(self, kind, priority="normal", timeout=None):
+        """כמו acquire, בלי לחסום את לולאת asyncio"""
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+        while True:
+            wait = self._try_take(kind, priority)
+            if wait == 0:
+                return self._on_wait_done(kind, priority, started, True)
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return self._on_wait_done(kind, priority, started, False)
+            await asyncio.sleep(min(wait, 1.0))
+
+    def record(self, kind, actual_tokens):
+        """תיקון הדלי לפי כמות הטוקנים האמיתית ועדכון ההערכה לסוג הקריאה"""
+        with self._lock:
+            estimate = self.estimate_tokens(kind)
+            if self.tokens is not None:
+                self.tokens.tokens -= actual_tokens - estimate  # יכול לרדת מתחת לאפס - "חוב" שמחזירים בהמתנה
+            self.estimates[kind] = estimate + 0.3 * (actual_tokens - estimate)
+
+    def get_stats(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.requests is not None:
+                self.requests.refill(now)
+            if self.tokens is not None:
+                self.tokens.refill(now)
+            return {
+                "requests_available": self.requests.tokens if self.requests is not None else None,
+                "tokens_available": self.tokens.tokens if self.tokens is not None else None,
+                "granted": dict(self.granted),
+                "timeouts": dict(self.timeouts),
+                "wait_seconds": self.wait_seconds,
+                "token_estimates": dict(self.estimates),
+            }
+
+
+# מגביל ברירת המחדל של התהליך - משותף לכל המנתחים
+rate_limiter = RateLimiter(config.AI_RPM_BUDGET, config.AI_LIMIT_TPM)
@@ -0,0 +1,88 @@
+import math
+import time
+from collections import deque
+
+
+class RenderScheduler:
+    """מתזמן רינדור בקצב קבוע, מנותק מקצב המצלמה.
+
+    כל פריים מקבל מועד יעד (deadline). אם הרינדור מאחר ביותר מפריים שלם,
+    המועדים שהוחמצו נספרים ונזרקים - לא מנסים "להשלים" פריימים ישנים.
+    target_fps <= 0 - ללא הגבלת קצב (רינדור מהיר ככל האפשר)."""
+
+    def __init__(self, target_fps=30.0, stats_window=120):
+        self.target_fps = target_fps
+        self.frame_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self._next_deadline = None
+        self._last_frame_start = None
+        self._intervals = deque(maxlen=stats_window)  # מרווחים בין תחילות פריימים אחרונים
+
+        # מונים
+        self.frames = 0
+        self.missed_deadlines = 0  # מועדים שעברו בלי רינדור
+        self.late_frames = 0  # פריימים שהתחילו אחרי המועד שלהם
+        self.reused_frames = 0  # פריימים שהוצגו שוב כי המצלמה לא סיפקה חדש
+        self.new_frames = 0
+
+    def wait_for_next_frame(self):
+        """ממתין למועד הפריים הבא ומחזיר את זמן ההתחלה שלו"""
+        now = time.perf_counter()
+        if self.frame_interval <= 0:
+            pass  # ללא הגבלת קצב - אין מועדים להמתין להם או להחמיץ
+        elif self._next_deadline is None:
+            self._next_deadline = now
+        elif now < self._next_deadline:
+            time.sleep(self._next_deadline - now)
+            now = time.perf_counter()
+        else:
+            lateness = now - self._next_deadline
+            if lateness > self.frame_interval:
+                # החמצנו מועד אחד או יותר - מדלגים עליהם ומתיישרים מחדש
+                skipped = int(lateness / self.frame_interval)
+                self.missed_deadlines += skipped
+                self._next_deadline += skipped * self.frame_interval
+            if lateness > 0.001:
+                self.late_frames += 1
+
+        if self._last_frame_start is not None:
+            self._intervals.append(now - self._last_frame_start)
+        self._last_frame_start = now
+        if self.frame_interval > 0:
+            self._next_deadline += self.frame_interval
+        self.frames += 1
+        return now
+
+    def frame_source_update(self, is_new):
+        """מדווח האם הפריים שהוצג חדש או פריים קודם שהוצג שוב"""
+        if is_new:
+            self.new_frames += 1
+        else:
+            self.reused_frames += 1
+
+    def get_stats(self):
+        """קצב אפקטיבי, ריצוד (סטיית תקן של זמן פריים) ומועדים שהוחמצו"""
+        if self._intervals:
+            mean_interval = sum(self._intervals) / len(self._intervals)
+            variance = sum((i - mean_interval) ** 2 for i in self._intervals) / len(self._intervals)
+            effective_fps = 1.0 / mean_interval if mean_interval > 0 else 0.0
+            jitter_ms = math.sqrt(variance) * 1000
+            worst_ms = max(self._intervals) * 1000
+        else:
+            effective_fps = jitter_ms = worst_ms = 0.0
+        return {
+            "target_fps": self.target_fps,
+            "effective_fps": effective_fps,
+            "jitter_ms": jitter_ms,
+            "worst_frame_ms": worst_ms,
+            "frames": self.frames,
+            "missed_deadlines": self.missed_deadlines,
+            "late_frames": self.late_frames,
+            "new_frames": self.new_frames,
+            "reused_frames": self.reused_frames,
+        }
+
+    def format_stats(self):
+        stats = self.get_stats()
+        return (f"Render: {stats['effective_fps']:.1f}/{stats['target_fps']:g} fps, "
+                f"jitter {stats['jitter_ms']:.1f} ms, worst {stats['worst_frame_ms']:.1f} ms, "
+                f"missed {stats['missed_deadlines']}, reused {stats['reused_frames']}/{stats['frames']}")
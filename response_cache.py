@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from metrics import metrics
+
+
+def dhash(image, hash_size=8):
+    """difference hash: 64 ביטים שמתארים את מבנה הבהירות של התמונה, עמידים לרעש ולשינויי דחיסה"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(hash_a, hash_b):
+    return (hash_a ^ hash_b).bit_count()
+
+
+class _CacheEntry:
+    def __init__(self, kind, person_ids, hashes, value, latency, created):
+        self.kind = kind
+        self.person_ids = person_ids
+        self.hashes = hashes
+        self.value = value
+        self.latency = latency  # זמן הקריאה המקורית - נחסך בכל פגיעה
+        self.created = created
+        self.hits = 0
+
+
+class ResponseCache:
+    """מטמון תשובות AI לפי hash תפיסתי של הפריים (או של חיתוכי האנשים).
+
+    פגיעה: אותו סוג ניתוח, אותם מזהי אנשים (במצב ROI), וכל ה-hash-ים במרחק Hamming
+    של עד max_distance ביטים. פריטים פגי תוקף (ttl_seconds) נמחקים, ומעבר ל-max_entries
+    נמחק הפריט שהשתמשו בו הכי פחות לאחרונה (LRU)."""
+
+    def __init__(self, max_entries=64, ttl_seconds=60.0, max_distance=6):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # מפתח רץ -> _CacheEntry, מהישן לחדש בשימוש
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+        # מונים
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.saved_seconds = 0.0
+
+    def _distance(self, entry, hashes):
+        if len(entry.hashes) != len(hashes):
+            return None
+        return max(hamming_distance(a, b) for a, b in zip(entry.hashes, hashes))
+
+    def get(self, kind, person_ids, hashes, now=None):
+        """מחזיר את התשובה השמורה הקרובה ביותר, או None"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            best_key = None
+            best_distance = None
+            for key, entry in list(self._entries.items()):
+                if now - entry.created > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expired += 1
+                    continue
+                if entry.kind != kind or entry.person_ids != person_ids:
+                    continue
+                distance = self._distance(entry, hashes)
+                if distance is not None and distance <= self.max_distance and (
+                        best_distance is None or distance < best_distance):
+                    best_key, best_distance = key, distance
+
+            if best_key is None:
+                self.misses += 1
+                metrics.inc(f"ai.cache.{kind}.misses")
+                self._update_hit_rate()
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            entry.hits += 1
+            self.hits += 1
+            self.saved_seconds += entry.latency
+        metrics.inc(f"ai.cache.{kind}.hits")
+        metrics.inc("ai.cache.saved_calls")
+        metrics.inc("ai.cache.saved_seconds", entry.latency)
+        self._update_hit_rate()
+        return entry.value
+
+    def put(self, kind, person_ids, hashes, value, latency, now=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._next_key += 1
+            self._entries[self._next_key] = _CacheEntry(kind, person_ids, hashes, value, latency, now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            metrics.set_gauge("ai.cache.entries", len(self._entries))
+
+    def _update_hit_rate(self):
+        total = self.hits + self.misses
+        metrics.set_gauge("ai.cache.hit_rate", self.hits / total if total else 0.0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_calls": self.hits,
+            "saved_seconds": self.saved_seconds,
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
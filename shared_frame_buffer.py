@@ -0,0 +1,156 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedFrameLease:
+    """השאלה של תא מהטבעת המשותפת - תצוגה ישירה לזיכרון המשותף, ללא העתקה"""
+
+    def __init__(self, ring, index, seq, capture_time):
+        self._ring = ring
+        self._index = index
+        self.frame = ring._views[index]
+        self.seq = seq
+        self.capture_time = capture_time
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._ring._release(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class SharedFrameRingBuffer:
+    """טבעת פריימים ב-multiprocessing.shared_memory, עם אותו ממשק כמו FrameRingBuffer.
+
+    תהליך אחד כותב (publish) ותהליך אחר שואל (borrow_latest) - הפריים לא עובר
+    דרך pickle או pipe. כשהקורא מבקש פריים ואין חדש, הוא מדליק את הדגל wanted
+    כדי שהכותב יעתיק פריים רק כשיש מי שצריך אותו."""
+
+    def __init__(self, shape, dtype=np.uint8, num_slots=3, context=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.num_slots = num_slots
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * num_slots)
+        self._owner = True
+
+        # מטא-דאטה משותף: מספר סידורי, זמן לכידה ומונה השאלות לכל תא
+        ctx = context if context is not None else mp.get_context()  # חייב להתאים להקשר של התהליך הקורא
+        self._condition = ctx.Condition()
+        self._seqs = ctx.Array('q', num_slots, lock=False)
+        self._capture_times = ctx.Array('d', num_slots, lock=False)
+        self._refcounts = ctx.Array('i', num_slots, lock=False)
+        self._latest = ctx.Value('i', -1, lock=False)
+        self._next_seq = ctx.Value('q', 0, lock=False)
+        self.wanted = ctx.Event()  # הקורא מחכה לפריים חדש
+        self._init_views()
+
+        self.published = 0
+        self.writer_blocked = 0
+        self.copied_bytes = 0
+
+    def _init_views(self):
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._views = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, offset=i * frame_bytes)
+            for i in range(self.num_slots)
+        ]
+
+    def attach_args(self):
+        """ארגומנטים להעברה לתהליך הקורא (ראה attach)"""
+        return (self._shm.name, self.shape, self.dtype.str, self.num_slots, self._condition,
+                self._seqs, self._capture_times, self._refcounts, self._latest, self._next_seq, self.wanted)
+
+    @classmethod
+    def attach(cls, shm_name, shape, dtype, num_slots, condition, seqs, capture_times, refcounts,
+               latest, next_seq, wanted):
+        """התחברות לטבעת קיימת מתוך תהליך אחר"""
+        ring = cls.__new__(cls)
+        ring.shape = tuple(shape)
+        ring.dtype = np.dtype(dtype)
+        ring.num_slots = num_slots
+        ring._shm = shared_memory.SharedMemory(name=shm_name)
+        ring._owner = False
+        ring._condition = condition
+        ring._seqs = seqs
+        ring._capture_times = capture_times
+        ring._refcounts = refcounts
+        ring._latest = latest
+        ring._next_seq = next_seq
+        ring.wanted = wanted
+        ring.published = 0
+        ring.writer_blocked = 0
+        ring.copied_bytes = 0
+        ring._init_views()
+        return ring
+
+    def publish(self, frame, capture_time=None):
+        """מעתיק פריים לתא פנוי ומפרסם אותו. מחזיר seq או None אם אין תא פנוי"""
+        if frame.shape != self.shape or frame.dtype != self.dtype:
+            raise ValueError(f"Frame {frame.shape}/{frame.dtype} does not match shared ring {self.shape}/{self.dtype}")
+        with self._condition:
+            candidates = [i for i in range(self.num_slots)
+                          if self._refcounts[i] == 0 and i != self._latest.value]
+            if not candidates:
+                self.writer_blocked += 1
+                return None
+            index = min(candidates, key=lambda i: self._seqs[i])
+            self._seqs[index] = -1  # התא בכתיבה - לא יושאל
+        np.copyto(self._views[index], frame)  # ההעתקה מחוץ לנעילה
+        with self._condition:
+            self._next_seq.value += 1
+            seq = self._next_seq.value  # אחרי שחרור הנעילה התא כבר יכול להיכתב מחדש
+            self._seqs[index] = seq
+            self._capture_times[index] = capture_time if capture_time is not None else time.time()
+            self._latest.value = index
+            self.wanted.clear()
+            self._condition.notify_all()
+        self.published += 1
+        self.copied_bytes += frame.nbytes
+        return seq
+
+    def borrow_latest(self, newer_than=0, timeout=None):
+        """משאיל את הפריים האחרון. אם אין חדש מ-newer_than - מבקש מהכותב וממתין עד timeout"""
+        def has_newer():
+            index = self._latest.value
+            return index >= 0 and self._seqs[index] > newer_than
+
+        with self._condition:
+            if not has_newer():
+                self.wanted.set()
+                if timeout is not None:
+                    self._condition.wait_for(has_newer, timeout)
+            if not has_newer():
+                return None
+            index = self._latest.value
+            self._refcounts[index] += 1
+            return SharedFrameLease(self, index, self._seqs[index], self._capture_times[index])
+
+    def _release(self, index):
+        with self._condition:
+            self._refcounts[index] -= 1
+
+    def get_stats(self):
+        return {
+            "published": self.published,
+            "writer_blocked": self.writer_blocked,
+            "copied_bytes": self.copied_bytes,
+        }
+
+    def close(self):
+        """שחרור הזיכרון המשותף (והסרתו, בתהליך שיצר אותו)"""
+        self._views = []
+        try:
+            self._shm.close()
+        except BufferError:
+            pass  # השאלה עדיין מחזיקה תצוגה לזיכרון
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,179 @@
+import json
+import time
+from metrics import metrics
+
+
+_SCALAR_CHARS = set("0123456789+-.eEtrufalsn")
+
+
+class IncrementalJsonParser:
+    """מפרק JSON שמקבל את הטקסט בחתיכות (כמו בתשובה בהזרמה) ומחזיר כל ערך פשוט
+    (מחרוזת, מספר, true/false/null) ברגע שהוא נסגר, יחד עם הנתיב שלו במסמך.
+
+    הנתיב הוא tuple של מפתחות ואינדקסים, למשל ("behavioral_analysis", 3) או (0, "descriptions", 2).
+    טקסט לפני האובייקט הראשון (למשל ```json) ואחרי סגירתו מדולג. המפרק לא זורק שגיאות על
+    JSON שבור - הבדיקה המלאה נעשית על הטקסט השלם בסוף התשובה."""
+
+    def __init__(self):
+        self._stack = []  # לכל מיכל פתוח: [is_object, המיקום הנוכחי (מפתח/אינדקס), מצפה למפתח]
+        self._started = False
+        self.done = False
+        self._string = None  # תווים גולמיים של המחרוזת הנוכחית
+        self._escape = False
+        self._scalar = None  # תווים של המספר / הליטרל הנוכחי
+
+    def feed(self, text):
+        """מעבד חתיכת טקסט ומחזיר רשימת (path, value) של הערכים שנסגרו בה"""
+        events = []
+        for char in text:
+            if self.done:
+                break
+            if self._string is not None:
+                self._feed_string_char(char, events)
+                continue
+            if self._scalar is not None:
+                if char in _SCALAR_CHARS:
+                    self._scalar.append(char)
+                    continue
+                self._finish_value(self._decode(self._scalar, json.loads), events)
+                self._scalar = None
+            if not self._started:
+                if char in "[{":
+                    self._started = True
+                    self._open(char)
+                continue
+            self._feed_structural(char, events)
+        return events
+
+    def _open(self, char):
+        is_object = char == "{"
+        self._stack.append([is_object, None if is_object else 0, is_object])
+
+    def _feed_structural(self, char, events):
+        if char in " \t\r\n":
+            return
+        if char in "[{":
+            self._open(char)
+        elif char in "]}":
+            if self._stack:
+                self._stack.pop()
+            if not self._stack:
+                self.done = True
+        elif char == '"':
+            self._string = []
+        elif char == ",":
+            if self._stack:
+                frame = self._stack[-1]
+                if frame[0]:
+                    frame[2] = True
+                else:
+                    frame[1] += 1
+        elif char == ":":
+            pass
+        else:
+            self._scalar = [char]
+
+    def _feed_string_char(self, char, events):
+        if self._escape:
+            self._string.append(char)
+            self._escape = False
+        elif char == "\\":
+            self._string.append(char)
+            self._escape = True
+        elif char == '"':
+            value = self._decode(['"', *self._string, '"'], json.loads, fallback="".join(self._string))
+            self._string = None
+            self._finish_value(value, events)
+        else:
+            self._string.append(char)
+
+    @staticmethod
+    def _decode(chars, loads, fallback=None):
+        token = "".join(chars)
+        try:
+            return loads(token)
+        except ValueError:
+            return fallback if fallback is not None else token
+
+    def _finish_value(self, value, events):
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        if frame[0] and frame[2]:
+            frame[1] = str(value)  # מפתח של אובייקט
+            frame[2] = False
+            return
+        events.append((tuple(entry[1] for entry in self._stack), value))
+
+
+class StreamingDocument:
+    """בונה מתוך אירועי המפרק מסמך חלקי באותו מבנה כמו התשובה המלאה, רק עם מה שחדש:
+    המחרוזות שנוספו לרשימות מאז הפעם הקודמת, וכל ערכי השדות (כמו person_id) כדי
+    שהשומרים יוכלו לשייך אותן. כך אותו קוד שמטפל בתשובה מלאה מטפל גם בחלקית."""
+
+    def __init__(self):
+        self.parser = IncrementalJsonParser()
+        self._fields = []  # (path, value) של שדות באובייקטים - נכללים בכל מסמך חלקי
+
+    def feed(self, text):
+        """מחזיר מסמך חלקי אם נסגרו מחרוזות חדשות ברשימות, אחרת None"""
+        new_items = []
+        for path, value in self.parser.feed(text):
+            if isinstance(path[-1], int):
+                new_items.append((path, value))
+            else:
+                self._fields.append((path, value))
+        if not new_items:
+            return None
+        document = None
+        for path, value in self._fields + new_items:
+            document = self._insert(document, path, value)
+        return document
+
+    @staticmethod
+    def _new_container(key):
+        return [] if isinstance(key, int) else {}
+
+    def _insert(self, document, path, value):
+        if document is None:
+            document = self._new_container(path[0])
+        node = document
+        for key, next_key in zip(path, path[1:]):
+            if isinstance(key, int):
+                while len(node) <= key:
+                    node.append(self._new_container(next_key))
+                node = node[key]
+            else:
+                node = node.setdefault(key, self._new_container(next_key))
+        last = path[-1]
+        if isinstance(last, int):
+            node.append(value)  # פריט חדש ברשימה - האינדקסים הקודמים כבר טופלו
+        else:
+            node[last] = value
+        return document
+
+
+async def read_stream(kind, response, on_partial, started):
+    """קורא תשובת Gemini בהזרמה ומעביר ל-on_partial מסמך חלקי בכל פעם שנסגרים תיאורים חדשים.
+    מודד זמן עד התובנה הראשונה ועד התשובה המלאה (מ-started, perf_counter). מחזיר את הטקסט המלא"""
+    document = StreamingDocument()
+    chunks = []
+    first_insight = None
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            continue  # חתיכה בלי טקסט (למשל רק סיבת סיום)
+        chunks.append(text)
+        partial = document.feed(text)
+        if partial is not None:
+            if first_insight is None:
+                first_insight = time.perf_counter() - started
+                metrics.observe(f"ai.{kind}.first_insight", first_insight)
+            on_partial(partial)
+    complete = time.perf_counter() - started
+    metrics.observe(f"ai.{kind}.complete", complete)
+    if first_insight is not None:
+        print(f"{kind.capitalize()} stream: first insight after {first_insight * 1000:.0f} ms, "
+              f"complete after {complete * 1000:.0f} ms")
+    return "".join(chunks)
@@ -0,0 +1,234 @@
+import math
+import time
+import cv2
+import numpy as np
+from metrics import metrics
+from response_cache import dhash
+
+
+class UploadPayload:
+    """תמונה מוכנה להעלאה: בתים של JPEG שמשותפים לכל המנתחים של אותו פריים"""
+
+    def __init__(self, data, width, height, source_shape, encode_seconds, mime_type="image/jpeg"):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.source_shape = source_shape  # גודל הפריים המקורי (לפני הקטנה)
+        self.encode_seconds = encode_seconds
+        self.mime_type = mime_type
+        self.person_ids = None  # פריים מלא - לא ממופה לאנשים
+        self.hashes = []  # hash תפיסתי של התמונה (למטמון התשובות)
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    def to_part(self):
+        """חלק תמונה בפורמט ש-generate_content מקבל - נשלח כמו שהוא, ללא קידוד נוסף"""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+    def to_parts(self):
+        return [self.to_part()]
+
+
+class RegionPayload:
+    """אזורי אנשים (ROI) מתוך פריים: חיתוך נפרד לכל אדם, או פסיפס אחד של כל החיתוכים.
+    כל חיתוך מסומן במזהה האדם של PersonTracker, כך שהתשובה ממופה לאנשים לפי הבנייה ולא לפי סדר."""
+
+    def __init__(self, person_ids, images, mosaic, hashes):
+        self.person_ids = person_ids  # לפי סדר החיתוכים / האריחים משמאל לימין
+        self.images = images  # UploadPayload לכל חיתוך, או אחד לפסיפס
+        self.mosaic = mosaic
+        self.hashes = hashes  # hash תפיסתי לכל חיתוך
+
+    @property
+    def nbytes(self):
+        return sum(image.nbytes for image in self.images)
+
+    def to_parts(self):
+        """הנחיה קצרה + התמונות, בפורמט של generate_content"""
+        ids = ", ".join(str(person_id) for person_id in self.person_ids)
+        if self.mosaic:
+            parts = [f"The image is a mosaic of {len(self.person_ids)} tile(s) from left to right, "
+                     f"each tile shows one person. Tile person_id values from left to right: {ids}. "
+                     f"Use exactly these person_id values, one entry per tile, in the same order."]
+            parts.append(self.images[0].to_part())
+            return parts
+        parts = [f"Each of the following {len(self.person_ids)} image(s) is a crop of one person, "
+                 f"labelled with its person_id. Use exactly these person_id values ({ids}), one entry per image."]
+        for person_id, image in zip(self.person_ids, self.images):
+            parts.append(f"person_id {person_id}:")
+            parts.append(image.to_part())
+        return parts
+
+
+class KeyframeBatch:
+    """כמה פריימים מפתח מחלון זמן קצר לבקשה אחת: תמונה לכל פריים (sequence), או גיליון
+    אחד שבו הפריימים מסודרים ברשת וממוספרים (sheet). הסדר תמיד מהישן לחדש."""
+
+    def __init__(self, images, offsets, sheet, hashes, columns=None):
+        self.images = images  # UploadPayload לכל פריים, או אחד לגיליון
+        self.offsets = offsets  # שניות מהפריים הראשון, לכל פריים
+        self.sheet = sheet
+        self.columns = columns
+        self.hashes = hashes
+        self.person_ids = None  # פריימים מלאים - לא ממופים לאנשים
+
+    @property
+    def frame_count(self):
+        return len(self.offsets)
+
+    @property
+    def nbytes(self):
+        return sum(image.nbytes for image in self.images)
+
+    def to_parts(self):
+        """הנחיה קצרה + התמונות, בפורמט של generate_content"""
+        count = self.frame_count
+        if count == 1:
+            return [self.images[0].to_part()]  # פריים בודד (למשל אדם חדש) - בלי הנחיית רצף
+        times = ", ".join(f"+{offset:.1f}s" for offset in self.offsets)
+        if self.sheet:
+            return [f"The image is a contact sheet of {count} numbered frames of the same scene, taken over "
+                    f"{self.offsets[-1]:.1f} seconds ({times}), in a grid of {self.columns} column(s), "
+                    f"read left to right and top to bottom, oldest first. Use the changes between the frames - "
+                    f"movement, gestures, gaze direction, interactions - as well as what is visible in each one. "
+                    f"Return a single analysis for the whole sequence.",
+                    self.images[0].to_part()]
+        parts = [f"The following {count} images are consecutive frames of the same scene, taken over "
+                 f"{self.offsets[-1]:.1f} seconds, oldest first. Use the changes between the frames - movement, "
+                 f"gestures, gaze direction, interactions - as well as what is visible in each one. "
+                 f"Return a single analysis for the whole sequence."]
+        for offset, image in zip(self.offsets, self.images):
+            parts.append(f"frame at +{offset:.1f}s:")
+            parts.append(image.to_part())
+        return parts
+
+
+class UploadPreparer:
+    """מכין כל פריים להעלאה פעם אחת: הקטנה לצלע ארוכה קבועה וקידוד JPEG באיכות נתונה.
+    OpenCV מקודד ישירות מ-BGR, כך שאין צורך ב-cvtColor או ב-PIL על הפריים המלא."""
+
+    def __init__(self, long_edge=1024, jpeg_quality=85):
+        self.long_edge = long_edge  # 0 = ללא הקטנה
+        self.jpeg_quality = jpeg_quality
+
+        # מונים
+        self.prepared = 0
+        self.total_bytes = 0
+        self.total_encode_seconds = 0.0
+
+    def _resize_to_long_edge(self, image, long_edge):
+        height, width = image.shape[:2]
+        if not long_edge or max(width, height) <= long_edge:
+            return image
+        scale = long_edge / max(width, height)
+        return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def _encode(self, frame, source_shape=None):
+        """הקטנה וקידוד בלבד - בלי מונים (בקשה עם כמה תמונות נספרת פעם אחת ב-_record)"""
+        start = time.perf_counter()
+        image = self._resize_to_long_edge(frame, self.long_edge)
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        encode_seconds = time.perf_counter() - start
+
+        payload = UploadPayload(encoded.tobytes(), image.shape[1], image.shape[0],
+                                source_shape or frame.shape, encode_seconds)
+        payload.hashes = [dhash(image)]
+        return payload
+
+    def _record(self, nbytes, encode_seconds):
+        """סופר מטען אחד לבקשה - גודל וזמן הקידוד של כל התמונות בה יחד"""
+        self.prepared += 1
+        self.total_bytes += nbytes
+        self.total_encode_seconds += encode_seconds
+        metrics.observe("upload.encode", encode_seconds)
+        metrics.inc("upload.bytes", nbytes)
+        metrics.set_gauge("upload.last_bytes", nbytes)
+
+    def prepare(self, frame, source_shape=None):
+        payload = self._encode(frame, source_shape)
+        self._record(payload.nbytes, payload.encode_seconds)
+        return payload
+
+    def prepare_regions(self, frame, regions, mosaic=False, padding=0.15):
+        """חיתוך אזור של כל אדם (regions: רשימת (person_id, (x, y, w, h))) עם שוליים.
+        mosaic=True - כל החיתוכים באותו גובה, זה לצד זה, בתמונה אחת"""
+        frame_height, frame_width = frame.shape[:2]
+        # החיתוכים מוקטנים באותו יחס כמו הפריים המלא - כך הם תמיד קטנים ממנו
+        scale = 1.0
+        if self.long_edge and max(frame_width, frame_height) > self.long_edge:
+            scale = self.long_edge / max(frame_width, frame_height)
+        person_ids = []
+        crops = []
+        for person_id, (x, y, w, h) in regions:
+            pad_x, pad_y = int(w * padding), int(h * padding)
+            left, top = max(0, x - pad_x), max(0, y - pad_y)
+            right, bottom = min(frame_width, x + w + pad_x), min(frame_height, y + h + pad_y)
+            if right - left < 2 or bottom - top < 2:
+                continue
+            person_ids.append(person_id)
+            crops.append(frame[top:bottom, left:right])
+        if not crops:
+            return None
+
+        if mosaic:
+            tile_height = max(1, round(max(crop.shape[0] for crop in crops) * scale))
+            tiles = [cv2.resize(crop, (max(1, round(crop.shape[1] * tile_height / crop.shape[0])), tile_height),
+                                interpolation=cv2.INTER_AREA) for crop in crops]
+            images = [self._encode(cv2.hconcat(tiles), source_shape=frame.shape)]
+        else:
+            images = [self._encode(self._resize_to_long_edge(crop, round(max(crop.shape[:2]) * scale)),
+                                   source_shape=frame.shape) for crop in crops]
+        payload = RegionPayload(person_ids, images, mosaic, [dhash(crop) for crop in crops])
+        self._record(payload.nbytes, sum(image.encode_seconds for image in images))
+        metrics.inc("upload.roi_payloads")
+        return payload
+
+    def keyframe_long_edge(self, count, sheet):
+        """הצלע הארוכה של כל פריים מפתח: בגיליון - כך שכל הגיליון נכנס ב-long_edge"""
+        if not sheet or not self.long_edge:
+            return self.long_edge
+        return max(64, self.long_edge // math.ceil(math.sqrt(count)))
+
+    def prepare_keyframes(self, keyframes, sheet=False):
+        """keyframes - רשימת (capture_time, image) מהישן לחדש, כבר מוקטנים (keyframe_long_edge)"""
+        if not keyframes:
+            return None
+        first_time = keyframes[0][0]
+        offsets = [capture_time - first_time for capture_time, _ in keyframes]
+        hashes = [dhash(image) for _, image in keyframes]
+        if not sheet:
+            images = [self._encode(image) for _, image in keyframes]
+            batch = KeyframeBatch(images, offsets, False, hashes)
+            self._record(batch.nbytes, sum(image.encode_seconds for image in images))
+            metrics.inc("upload.keyframe_payloads")
+            return batch
+
+        columns = math.ceil(math.sqrt(len(keyframes)))
+        rows = math.ceil(len(keyframes) / columns)
+        tile_height, tile_width = keyframes[-1][1].shape[:2]
+        sheet_image = np.zeros((rows * tile_height, columns * tile_width, 3), dtype=np.uint8)
+        for i, (_, image) in enumerate(keyframes):
+            if image.shape[:2] != (tile_height, tile_width):
+                image = cv2.resize(image, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+            top, left = (i // columns) * tile_height, (i % columns) * tile_width
+            sheet_image[top:top + tile_height, left:left + tile_width] = image
+            cv2.putText(sheet_image, str(i + 1), (left + 6, top + 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                        (255, 255, 255), 2, cv2.LINE_AA)
+        images = [self.prepare(sheet_image)]
+        metrics.inc("upload.keyframe_payloads")
+        return KeyframeBatch(images, offsets, True, hashes, columns)
+
+    def get_stats(self):
+        count = max(1, self.prepared)
+        return {
+            "prepared": self.prepared,
+            "long_edge": self.long_edge,
+            "jpeg_quality": self.jpeg_quality,
+            "avg_bytes": self.total_bytes / count,
+            "avg_encode_ms": self.total_encode_seconds * 1000 / count,
+        }